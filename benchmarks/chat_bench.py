@@ -0,0 +1,270 @@
+"""
+End-to-end offline benchmark of `/chat` and `doc_search_tool`.
+
+Everything runs locally: a synthetic knowledge base is embedded with
+FakeEmbeddings, the MCP server runs with EMBEDDING_BACKEND=fake, and the
+FastAPI app talks to the fake chat-completions server in benchmarks/fakes.py
+instead of Gemini. Each target is driven at every concurrency level and
+p50/p95/p99 latency, throughput and server memory are reported.
+
+Run from the repository root:
+
+    python -m benchmarks.chat_bench --concurrency 1 8 32 --requests 200
+    python -m benchmarks.chat_bench --target doc_search --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.chat_bench --target chat --mcp-transport inprocess
+
+Compare two runs by diffing their --output files.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MCP_DIR = os.path.join(ROOT_DIR, "mcp")
+sys.path.insert(0, MCP_DIR)
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from benchmarks.session_store_bench import percentile  # noqa: E402
+from benchmarks.synthetic_kb import sample_questions, write_knowledge_base  # noqa: E402
+from utils import build_vector_store  # noqa: E402
+
+COLLECTION = "langchain"
+
+
+# ======================
+# Local services
+# ======================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Service:
+    """A uvicorn app in its own process, so its memory can be measured separately."""
+
+    def __init__(self, name: str, app: str, cwd: str, env: dict, log_dir: str):
+        self.name = name
+        self.port = free_port()
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--port", str(self.port), "--log-level", "warning"],
+            cwd=cwd,
+            env={**os.environ, **env},
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def wait_ready(self, path: str, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if httpx.get(self.url + path, timeout=1.0).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        with open(self.log_path) as f:
+            log_tail = f.read()[-3000:]
+        raise RuntimeError(f"{self.name} did not become ready on port {self.port}:\n{log_tail}")
+
+    def memory(self) -> dict:
+        """Current and peak resident memory in MB (Linux /proc; empty elsewhere)."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            return {}
+        return {
+            "rss_mb": round(int(status["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(status["VmHWM"].split()[0]) / 1024, 1),
+        }
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+# ======================
+# Load generation
+# ======================
+async def run_load(call, questions: list[str], concurrency: int, requests: int) -> dict:
+    """Issue `requests` calls from `concurrency` workers; `call(worker, question)` does one request."""
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker(worker_id: int):
+        nonlocal next_index, errors
+        while next_index < requests:
+            question = questions[next_index % len(questions)]
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                await call(worker_id, question)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ms = [value * 1000 for value in latencies]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "max_ms": round(max(ms), 1) if ms else 0.0,
+    }
+
+
+async def bench_doc_search(mcp_url: str, questions: list[str], concurrency: int, requests: int) -> dict:
+    async with AsyncExitStack() as stack:
+        sessions = []
+        for _ in range(concurrency):
+            read, write, _ = await stack.enter_async_context(streamablehttp_client(mcp_url))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            sessions.append(session)
+
+        async def call(worker_id: int, question: str):
+            result = await sessions[worker_id].call_tool("doc_search_tool", {"query": question})
+            if result.isError:
+                raise RuntimeError(result.content)
+
+        return await run_load(call, questions, concurrency, requests)
+
+
+async def bench_chat(app_url: str, questions: list[str], concurrency: int, requests: int) -> dict:
+    async with httpx.AsyncClient(base_url=app_url, timeout=120.0) as client:
+        async def call(worker_id: int, question: str):
+            response = await client.post("/chat", json={"query": question, "session_id": f"bench-{uuid.uuid4().hex}"})
+            response.raise_for_status()
+
+        return await run_load(call, questions, concurrency, requests)
+
+
+def print_result(target: str, result: dict, memory: dict):
+    print(
+        f"  {target:<10} c={result['concurrency']:<4} {result['throughput_rps']:8.1f} req/s  "
+        f"p50={result['p50_ms']:8.1f}ms  p95={result['p95_ms']:8.1f}ms  p99={result['p99_ms']:8.1f}ms  "
+        f"errors={result['errors']}  " + "  ".join(f"{name}={mem.get('peak_rss_mb', '?')}MB" for name, mem in memory.items())
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("all", "chat", "doc_search"), default="all")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--topics", type=int, default=50, help="Synthetic knowledge-base documents")
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake model seconds per completion")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Fake seconds per embedding call")
+    parser.add_argument("--mcp-transport", choices=("http", "inprocess"), default="http",
+                        help="How the app reaches the MCP server (MCP_TRANSPORT)")
+    parser.add_argument("--output", help="Write results as JSON, for comparison across commits")
+    args = parser.parse_args()
+
+    questions = sample_questions(args.topics, max(args.requests, 200))
+    results = {"commit": git_commit(), "args": vars(args), "runs": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "knowledge-base")
+        store = os.path.join(tmp, "vector_store")
+        write_knowledge_base(corpus, args.topics, args.paragraphs)
+        build_vector_store(input_dir=corpus, persist_dir=store, collection_name=COLLECTION,
+                           embeddings=FakeEmbeddings(), requests_per_minute=None)
+
+        offline_env = {"GEMINI_API_KEY": "offline-benchmark", "OPENAI_AGENTS_DISABLE_TRACING": "1"}
+        mcp_env = {
+            "EMBEDDING_BACKEND": "fake",
+            "FAKE_EMBEDDING_LATENCY": str(args.embedding_latency),
+            "VECTOR_STORE_DIR": store,
+            "VECTOR_STORE_COLLECTION": COLLECTION,
+            "EMBEDDING_CACHE_DIR": "",
+        }
+        services: dict[str, Service] = {}
+        try:
+            services["mcp"] = Service("mcp", "server:mcp_app", MCP_DIR, {**offline_env, **mcp_env}, tmp)
+            services["mcp"].wait_ready("/metrics")
+            mcp_url = services["mcp"].url + "/mcp"
+
+            if args.target in ("all", "chat"):
+                services["llm"] = Service("llm", "benchmarks.fakes:fake_chat_app", ROOT_DIR, {
+                    "FAKE_LLM_LATENCY": str(args.llm_latency),
+                }, tmp)
+                services["llm"].wait_ready("/")
+                services["app"] = Service("app", "main:app", ROOT_DIR, {
+                    **offline_env,
+                    **mcp_env,
+                    "MODEL_BASE_URL": services["llm"].url + "/v1/",
+                    "MCP_TRANSPORT": args.mcp_transport,
+                    "MCP_SERVER_URL": mcp_url,
+                    "SESSION_DB_PATH": os.path.join(tmp, "sessions.db"),
+                }, tmp)
+                services["app"].wait_ready("/")
+
+            targets = []
+            if args.target in ("all", "doc_search"):
+                targets.append(("doc_search", lambda c: bench_doc_search(mcp_url, questions, c, args.requests)))
+            if args.target in ("all", "chat"):
+                targets.append(("chat", lambda c: bench_chat(services["app"].url, questions, c, args.requests)))
+
+            print(f"\n[INFO] {args.topics} documents, {args.requests} requests per level")
+            for target, bench in targets:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(bench(concurrency))
+                    memory = {name: service.memory() for name, service in services.items()}
+                    print_result(target, result, memory)
+                    results["runs"].append({"target": target, **result, "memory": memory})
+        finally:
+            for service in services.values():
+                service.stop()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
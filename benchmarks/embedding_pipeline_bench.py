@@ -0,0 +1,54 @@
+"""
+Offline throughput of the index-build embedding pipeline against a fake
+embedding function with configurable latency and failure rate.
+
+Run from the repository root:
+
+    python -m benchmarks.embedding_pipeline_bench --files 200 --concurrency 1 2 4 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp"))
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from benchmarks.synthetic_kb import write_knowledge_base  # noqa: E402
+from utils import build_vector_store  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake seconds per embedding request")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Share of requests that fail")
+    parser.add_argument("--rpm", type=float, default=0, help="Requests per minute limit (0 = unlimited)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "knowledge-base")
+        write_knowledge_base(corpus, args.files, args.paragraphs)
+
+        for concurrency in args.concurrency:
+            store = os.path.join(tmp, f"store-{concurrency}")
+            embeddings = FakeEmbeddings(latency=args.latency, failure_rate=args.failure_rate)
+            report = build_vector_store(
+                input_dir=corpus,
+                persist_dir=store,
+                embeddings=embeddings,
+                batch_size=args.batch_size,
+                max_concurrency=concurrency,
+                requests_per_minute=args.rpm or None,
+            )
+            print(f"==> concurrency={concurrency}: {report['chunks_added']} chunks, "
+                  f"{embeddings.calls} embedding requests\n")
+            shutil.rmtree(store, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
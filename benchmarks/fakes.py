@@ -0,0 +1,143 @@
+"""
+Local stand-ins for remote services, so performance can be measured offline.
+
+- FakeEmbeddings: deterministic embeddings (lives in mcp/ so the MCP server
+  can use it with EMBEDDING_BACKEND=fake).
+- fake_chat_app: an OpenAI-compatible chat-completions server to point
+  MODEL_BASE_URL at instead of Gemini (also serves /embeddings). Run it with
+
+      FAKE_LLM_LATENCY=0.3 uvicorn benchmarks.fakes:fake_chat_app --port 6000
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp"))
+
+from fake_embeddings import FakeEmbeddings  # noqa: E402,F401
+
+# Seconds before the first token of every completion, and between streamed words
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.005"))
+
+FAKE_ANSWER = (
+    "Great question! Based on your study material, here is a short explanation. "
+    "Try to restate the key idea in your own words, then check yourself with a quick question."
+)
+
+
+# ======================
+# Fake OpenAI-compatible chat completions
+# ======================
+def plan_reply(body: dict) -> dict:
+    """
+    Decide what the fake model does for one request:
+    - structured output (FormattingAgent): a valid AgentResponse JSON,
+    - a fresh user message with doc_search_tool available: call the tool,
+    - otherwise: a plain text answer.
+    """
+    messages = body.get("messages", [])
+    tools = [tool["function"]["name"] for tool in body.get("tools") or []]
+    last = messages[-1] if messages else {}
+
+    if body.get("response_format"):
+        content = json.dumps({"content": FAKE_ANSWER, "parts": [{"type": "text", "text": FAKE_ANSWER, "resource": None}]})
+        return {"content": content}
+    if last.get("role") == "user" and "doc_search_tool" in tools:
+        return {"tool": ("doc_search_tool", {"query": str(last.get("content", ""))[:200]})}
+    return {"content": FAKE_ANSWER}
+
+
+def usage_for(body: dict, reply: dict) -> dict:
+    prompt_tokens = sum(len(str(message.get("content") or "")) for message in body.get("messages", [])) // 4
+    completion_tokens = len(reply.get("content") or "") // 4 + (20 if "tool" in reply else 0)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def tool_call(reply: dict, index: int | None = None) -> dict:
+    name, arguments = reply["tool"]
+    call = {"id": "call_" + uuid.uuid4().hex[:12], "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)}}
+    if index is not None:
+        call["index"] = index
+    return call
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    reply = plan_reply(body)
+    usage = usage_for(body, reply)
+    completion_id = "chatcmpl-" + uuid.uuid4().hex
+    created = int(time.time())
+    await asyncio.sleep(FAKE_LLM_LATENCY)
+
+    if not body.get("stream"):
+        if "tool" in reply:
+            message = {"role": "assistant", "content": None, "tool_calls": [tool_call(reply)]}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": reply["content"]}
+            finish_reason = "stop"
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": body.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+    def chunk(delta: dict | None, finish_reason: str | None = None, final_usage: dict | None = None) -> str:
+        data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                "choices": [] if final_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        if final_usage:
+            data["usage"] = final_usage
+        return "data: " + json.dumps(data) + "\n\n"
+
+    async def stream():
+        if "tool" in reply:
+            yield chunk({"role": "assistant", "tool_calls": [tool_call(reply, index=0)]})
+            yield chunk({}, "tool_calls")
+        else:
+            for word in reply["content"].split(" "):
+                yield chunk({"role": "assistant", "content": word + " "})
+                await asyncio.sleep(FAKE_LLM_TOKEN_DELAY)
+            yield chunk({}, "stop")
+        yield chunk(None, final_usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+# ======================
+# Fake OpenAI-compatible embeddings (for RESPONSE_CACHE_SIMILARITY)
+# ======================
+_fake_embeddings = FakeEmbeddings(latency=0.0)
+
+
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = [
+        {"object": "embedding", "index": index, "embedding": vector}
+        for index, vector in enumerate(_fake_embeddings.embed_documents(inputs))
+    ]
+    tokens = sum(len(text) for text in inputs) // 4
+    return JSONResponse({"object": "list", "data": data, "model": body.get("model"),
+                         "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+
+fake_chat_app = Starlette(routes=[
+    Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    Route("/chat/completions", chat_completions, methods=["POST"]),
+    Route("/v1/embeddings", embeddings, methods=["POST"]),
+    Route("/embeddings", embeddings, methods=["POST"]),
+])
@@ -0,0 +1,120 @@
+"""
+Import-time profile of the API app and the MCP server: how long importing
+each entry point takes (what every cold start and `reload=True` restart
+pays before serving), and which top-level packages that time goes to.
+
+Each target is imported in a fresh interpreter with `-X importtime`, and
+the fastest of `--repeat` runs is reported. Save a report with `--output`
+and compare a later run against it with `--baseline` to track startup cost
+over time.
+
+Run from the repository root:
+
+    python -m benchmarks.import_profile --output import_profile.json
+    python -m benchmarks.import_profile --baseline import_profile.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (working directory, module)
+TARGETS = {
+    "api": (ROOT, "main"),
+    "mcp_server": (os.path.join(ROOT, "mcp"), "server"),
+    "chat_agents.agent": (ROOT, "chat_agents.agent"),
+}
+
+# Background startup threads keep running after the import; exit without waiting for them
+IMPORT_CODE = """
+import os, sys, time
+start = time.perf_counter()
+import {module}
+sys.stdout.write(repr(time.perf_counter() - start))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def parse_importtime(stderr: str, module: str) -> dict[str, float]:
+    """
+    Self time in seconds per top-level package, from `-X importtime` output.
+    The target module itself is left out: imports made by its background
+    startup threads interleave with its own, which skews its self time.
+    """
+    packages: dict[str, float] = {}
+    for line in stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        if name == module:
+            continue
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return packages
+
+
+def profile(directory: str, module: str) -> dict:
+    env = dict(os.environ)
+    # Settings modules refuse to import without a key; no request is made
+    env.setdefault("GEMINI_API_KEY", "import-profile")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_CODE.format(module=module)],
+        cwd=directory, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return {"seconds": float(result.stdout), "packages": parse_importtime(result.stderr, module)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per target; the fastest is reported")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed per target")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["targets"]
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "targets": {},
+    }
+    for name in args.targets:
+        directory, module = TARGETS[name]
+        runs = [profile(directory, module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        report["targets"][name] = best
+
+        previous = baseline.get(name)
+        delta = f"  ({best['seconds'] - previous['seconds']:+.3f}s vs baseline)" if previous else ""
+        print(f"\n{name}: import {module} took {best['seconds']:.3f}s{delta}")
+        for package, seconds in sorted(best["packages"].items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            before = previous["packages"].get(package, 0.0) if previous else None
+            change = f"  {seconds - before:+.3f}s" if before is not None else ""
+            print(f"  {package:<32} {seconds:7.3f}s{change}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[INFO] Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    main()
+    print(f"[INFO] Profiled in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,82 @@
+"""
+Peak memory of an index build as the corpus grows, with fake embeddings.
+
+Each corpus size is built in a fresh process, so the reported peak RSS
+(the builder process; reader processes are reported separately) is not
+inflated by earlier runs. Ingestion itself only buffers a bounded window
+of files and batches; what still grows with --files is the index being
+built (Chroma's HNSW graph and the in-memory BM25 index).
+
+Run from the repository root:
+
+    python -m benchmarks.ingestion_memory_bench --files 200 1000 4000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+MCP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp")
+sys.path.insert(0, MCP_DIR)
+
+from benchmarks.synthetic_kb import write_knowledge_base  # noqa: E402
+
+
+def build(corpus: str, store: str, read_workers: int, batch_size: int, results):
+    from fake_embeddings import FakeEmbeddings
+    from utils import build_vector_store
+
+    start = time.perf_counter()
+    report = build_vector_store(
+        input_dir=corpus,
+        persist_dir=store,
+        embeddings=FakeEmbeddings(latency=0.0),
+        batch_size=batch_size,
+        requests_per_minute=None,
+        read_workers=read_workers,
+    )
+    results.put({
+        "chunks": report["chunks_added"],
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "reader_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[200, 1000, 4000])
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--read-workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for files in args.files:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = os.path.join(tmp, "knowledge-base")
+            write_knowledge_base(corpus, files, args.paragraphs)
+            results = context.Queue()
+            process = context.Process(
+                target=build,
+                args=(corpus, os.path.join(tmp, "store"), args.read_workers, args.batch_size, results),
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            rows.append((files, result))
+
+    print()
+    for files, result in rows:
+        print(
+            f"  files={files:<6} chunks={result['chunks']:<7} {result['seconds']:7.1f}s  "
+            f"builder peak RSS={result['peak_rss_mb']:7.1f}MB  reader peak RSS={result['reader_peak_rss_mb']:6.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
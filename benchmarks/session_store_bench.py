@@ -0,0 +1,93 @@
+"""
+Read/append latency of the session store under thousands of concurrent sessions.
+
+Run from the repository root:
+
+    python -m benchmarks.session_store_bench --sessions 2000 --turns 5
+    python -m benchmarks.session_store_bench --sessions 2000 --compare-sqlite-session
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from agents import SQLiteSession
+from chat_agents.session_store import SessionStore
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, reads: list[float], appends: list[float], elapsed: float):
+    print(f"\n[{name}] {len(reads)} reads, {len(appends)} appends in {elapsed:.2f}s "
+          f"({(len(reads) + len(appends)) / elapsed:.0f} ops/s)")
+    for label, values in (("read", reads), ("append", appends)):
+        ms = [v * 1000 for v in values]
+        print(f"  {label:<6} p50={percentile(ms, 50):7.2f}ms  p95={percentile(ms, 95):7.2f}ms  "
+              f"p99={percentile(ms, 99):7.2f}ms  max={max(ms):7.2f}ms  mean={statistics.mean(ms):7.2f}ms")
+
+
+def fake_turn(session_index: int, turn: int, items_per_turn: int) -> list[dict]:
+    items = [{"role": "user", "content": f"session {session_index} question {turn}"}]
+    for i in range(items_per_turn - 1):
+        items.append({"role": "assistant", "content": f"answer {turn}.{i} " + "lorem ipsum " * 40})
+    return items
+
+
+async def drive(make_session, sessions: int, turns: int, items_per_turn: int):
+    reads: list[float] = []
+    appends: list[float] = []
+
+    async def conversation(index: int):
+        session = make_session(f"bench-{index}")
+        for turn in range(turns):
+            start = time.perf_counter()
+            await session.get_items()
+            reads.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await session.add_items(fake_turn(index, turn, items_per_turn))
+            appends.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(sessions)))
+    return reads, appends, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Read+append turns per session")
+    parser.add_argument("--items-per-turn", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--compare-sqlite-session", action="store_true",
+                        help="Also run the agents SDK SQLiteSession against a file database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "sessions.db"), pool_size=args.pool_size, batch_size=args.batch_size)
+        await store.start()
+        try:
+            reads, appends, elapsed = await drive(store.session, args.sessions, args.turns, args.items_per_turn)
+        finally:
+            await store.close()
+        report(f"SessionStore pool={args.pool_size}", reads, appends, elapsed)
+
+        if args.compare_sqlite_session:
+            db_path = os.path.join(tmp, "sqlite_session.db")
+            reads, appends, elapsed = await drive(
+                lambda session_id: SQLiteSession(session_id, db_path), args.sessions, args.turns, args.items_per_turn
+            )
+            report("agents.SQLiteSession (file)", reads, appends, elapsed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
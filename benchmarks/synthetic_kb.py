@@ -0,0 +1,79 @@
+"""
+Synthetic knowledge base for offline benchmarks: reproducible study notes
+plus matching student questions.
+
+    python -m benchmarks.synthetic_kb --output /tmp/knowledge-base --topics 200
+"""
+import argparse
+import os
+import random
+
+SUBJECTS = {
+    "biology": "cell energy light plant water carbon oxygen enzyme protein membrane nucleus gene".split(),
+    "physics": "force mass motion velocity energy momentum wave field charge current friction gravity".split(),
+    "chemistry": "atom bond acid base molecule reaction electron ion solution catalyst gas salt".split(),
+    "math": "equation graph function limit derivative integral vector matrix proof angle prime series".split(),
+    "history": "empire trade river climate war treaty kingdom revolution colony dynasty migration law".split(),
+}
+FILLER = "the of and is a to in that it as for with this by are be on which can from".split()
+QUESTION_TEMPLATES = (
+    "What is {term} in {title}?",
+    "Explain {term} and {other}",
+    "How does {term} relate to {other}?",
+    "{title} {term}",
+    "Can you summarize {title}?",
+)
+
+
+def topic_titles(topics: int) -> list[tuple[str, str]]:
+    """(subject, title) per topic, e.g. ("physics", "physics_chapter_007")."""
+    subjects = sorted(SUBJECTS)
+    return [(subjects[i % len(subjects)], f"{subjects[i % len(subjects)]}_chapter_{i:03d}") for i in range(topics)]
+
+
+def write_knowledge_base(directory: str, topics: int = 50, paragraphs: int = 10, seed: int = 0) -> list[str]:
+    """Write one .txt file per topic into `directory`; returns the file paths."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for subject, title in topic_titles(topics):
+        vocabulary = SUBJECTS[subject]
+        path = os.path.join(directory, f"{title}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{title.replace('_', ' ').title()}\n\n")
+            for _ in range(paragraphs):
+                words = [rng.choice(vocabulary) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(120)]
+                f.write(" ".join(words).capitalize() + ".\n\n")
+        paths.append(path)
+    return paths
+
+
+def sample_questions(topics: int, count: int, seed: int = 1) -> list[str]:
+    """Student questions about the generated topics, with some repeats like real traffic."""
+    rng = random.Random(seed)
+    titles = topic_titles(topics)
+    questions = []
+    for _ in range(count):
+        if questions and rng.random() < 0.2:
+            questions.append(rng.choice(questions))
+            continue
+        subject, title = rng.choice(titles)
+        term, other = rng.sample(SUBJECTS[subject], 2)
+        template = rng.choice(QUESTION_TEMPLATES)
+        questions.append(template.format(term=term, other=other, title=title.replace("_", " ")))
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="Directory to write the .txt files to")
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = write_knowledge_base(args.output, args.topics, args.paragraphs, args.seed)
+    print(f"[INFO] Wrote {len(paths)} documents to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Chroma vs the memory-mapped vector export (mmap_index.py): open time,
+search latency, recall@k and memory per backend, with fake embeddings.
+
+One index is built, exported as float16 and int8, and every backend is then
+measured in a fresh process so open time and RSS are not shared between
+them. Recall@k is against exact float32 brute force; Chroma's HNSW is
+approximate too. Memory is split into private pages (per worker) and
+shared file pages (one copy per host, whatever the number of workers).
+The vector files are in the OS page cache after the build, so "open" is a
+warm open, as for a second worker on the same host.
+
+Run from the repository root:
+
+    python -m benchmarks.vector_backend_bench --files 2000 --dim 768 --queries 200
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+MCP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp")
+sys.path.insert(0, MCP_DIR)
+
+from benchmarks.synthetic_kb import sample_questions, write_knowledge_base  # noqa: E402
+
+BACKENDS = (
+    ("chroma", None, False),
+    ("mmap float16", "float16", False),
+    ("mmap float16 + rerank", "float16", True),
+    ("mmap int8", "int8", False),
+    ("mmap int8 + rerank", "int8", True),
+)
+
+
+def rss_mb() -> tuple[float, float]:
+    """
+    (private, shared) resident MB on Linux. Pages of memory-mapped files are
+    shared: other workers mapping the same files reuse them.
+    """
+    with open("/proc/self/statm") as f:
+        resident, shared = (int(value) for value in f.read().split()[1:3])
+    page_mb = os.sysconf("SC_PAGE_SIZE") / 2**20
+    return (resident - shared) * page_mb, shared * page_mb
+
+
+def measure(directory: str, index_dir: str, dtype: str | None, rerank: bool, queries, truth, k: int, results):
+    import numpy as np
+    from chromadb.config import Settings
+    from fake_embeddings import FakeEmbeddings
+    from langchain_chroma import Chroma
+    from mmap_index import MmapVectorIndex
+
+    before = rss_mb()
+    start = time.perf_counter()
+    if dtype is None:
+        store = Chroma(persist_directory=index_dir, embedding_function=FakeEmbeddings(dim=len(queries[0])),
+                       collection_name="study_documents", client_settings=Settings(anonymized_telemetry=False))
+        store.similarity_search_by_vector(queries[0], k=1)
+        search = lambda vector: store.similarity_search_by_vector(vector, k=k)  # noqa: E731
+    else:
+        index = MmapVectorIndex(directory, dtype, rerank=rerank)
+        index.warm_up()
+        search = lambda vector: index.search_documents(vector, k)  # noqa: E731
+    open_ms = (time.perf_counter() - start) * 1000
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        docs = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({doc.id for doc in docs} & expected)
+    results.put({
+        "open_ms": open_ms,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "recall": hits / (len(queries) * k),
+        "private_mb": rss_mb()[0] - before[0],
+        "shared_mb": rss_mb()[1] - before[1],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=768, help="Fake embedding dimensions (gemini-embedding-001: 3072)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    import numpy as np
+    from fake_embeddings import FakeEmbeddings
+    from index_versions import release_chroma, resolve_index_dir
+    from langchain_chroma import Chroma
+    from mmap_index import RERANK_FILE, MmapVectorIndex, export_mmap_index
+    from utils import build_vector_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = FakeEmbeddings(dim=args.dim)
+        write_knowledge_base(os.path.join(tmp, "kb"), args.files, args.paragraphs)
+        build_vector_store(
+            input_dir=os.path.join(tmp, "kb"),
+            persist_dir=os.path.join(tmp, "store"),
+            embeddings=embeddings,
+            requests_per_minute=None,
+        )
+        _, index_dir = resolve_index_dir(os.path.join(tmp, "store"))
+        store = Chroma(persist_directory=index_dir, embedding_function=embeddings, collection_name="study_documents")
+        exports = {}
+        for dtype in ("float16", "int8"):
+            exports[dtype] = os.path.join(tmp, dtype)
+            os.makedirs(exports[dtype])
+            rows = export_mmap_index(store._collection, exports[dtype], dtype=dtype)
+        release_chroma(store)
+
+        # Exact float32 top-k as ground truth
+        exact = np.load(os.path.join(exports["float16"], RERANK_FILE))
+        ids = MmapVectorIndex(exports["float16"], "float16").documents(list(range(rows)))
+        queries = embeddings.embed_documents(sample_questions(args.files, args.queries))
+        truth = [
+            {ids[i].id for i in np.argsort(-(exact @ np.asarray(query, dtype=np.float32)))[:args.k]}
+            for query in queries
+        ]
+        sizes = {dtype: sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+                 for dtype, path in exports.items()}
+        sizes[None] = sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(index_dir) for name in names
+        ) / 2**20
+
+        context = multiprocessing.get_context("spawn")
+        rows_out = []
+        for name, dtype, rerank in BACKENDS:
+            results = context.Queue()
+            process = context.Process(
+                target=measure,
+                args=(exports.get(dtype), index_dir, dtype, rerank, queries, truth, args.k, results),
+            )
+            process.start()
+            rows_out.append((name, dtype, results.get()))
+            process.join()
+
+    print(f"\n  {rows} chunks, {args.dim} dims, {args.queries} queries, recall@{args.k} vs exact float32\n")
+    for name, dtype, result in rows_out:
+        print(
+            f"  {name:<24} open={result['open_ms']:7.1f}ms  p50={result['p50_ms']:6.2f}ms  p95={result['p95_ms']:6.2f}ms  "
+            f"recall={result['recall']:.3f}  private +{result['private_mb']:6.1f}MB  shared +{result['shared_mb']:6.1f}MB  "
+            f"on disk={sizes[dtype]:6.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import math
+import time
+import weakref
+from contextlib import asynccontextmanager
+from chat_agents.metrics import Counter, Gauge
+from chat_agents.timing import span
+
+logger = logging.getLogger(__name__)
+
+# Every live controller, so the module-level gauges can report on them
+_CONTROLLERS: "weakref.WeakSet[AdmissionController]" = weakref.WeakSet()
+
+ADMISSION_DECISIONS = Counter(
+    "studymode_admission_requests_total",
+    "Chat requests seen by admission control, by result (admitted, rejected, timeout).",
+    labelnames=("result",),
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "studymode_admission_in_flight",
+    "Chat requests currently running.",
+    lambda: sum(controller.in_flight for controller in _CONTROLLERS),
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "studymode_admission_queue_depth",
+    "Chat requests waiting for a slot or for an earlier request on the same session.",
+    lambda: sum(controller.waiting for controller in _CONTROLLERS),
+)
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Raised when a request cannot be admitted; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _SessionQueue:
+    """FIFO lock for one session, dropped once nobody holds or waits for it."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# ======================
+# Global cap + bounded queue + per-session FIFO
+# ======================
+class AdmissionController:
+    """
+    Admission control for chat requests.
+
+    - At most `max_concurrent` requests run at once (model calls, MCP tools,
+      session reads and writes), so a spike cannot fan out into unbounded
+      provider calls and MCP connections.
+    - Up to `max_queue` more requests wait for a slot, in arrival order. A
+      request that arrives when the queue is full, or waits longer than
+      `queue_timeout`, is rejected with AdmissionRejectedError right away
+      instead of slowing every other request down.
+    - Requests on the same session run one at a time in arrival order, so two
+      turns never read and append the same history concurrently. Waiting for
+      an earlier turn counts towards the queue as well.
+
+    `retry_after` on rejections is estimated from the recent average request
+    duration and the current backlog.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, queue_timeout: float = 30.0):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._sessions: dict[str, _SessionQueue] = {}
+        # Exponentially weighted average of how long admitted requests run
+        self._average_seconds = 1.0
+        _CONTROLLERS.add(self)
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + self.in_flight
+        seconds = self._average_seconds * backlog / self.max_concurrent
+        return max(1, min(60, math.ceil(seconds)))
+
+    def check(self):
+        """Reject now if every slot is taken and the queue is full."""
+        if self.in_flight + self.waiting >= self.max_concurrent + self.max_queue:
+            ADMISSION_DECISIONS.inc(result="rejected")
+            logger.warning(f"Admission queue full ({self.waiting} waiting), rejecting request")
+            raise AdmissionRejectedError("Server is busy, please retry shortly", self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self, session_id: str):
+        """Run the body once a slot is free and earlier requests on `session_id` are done."""
+        self.check()
+        queue = self._sessions.get(session_id)
+        if queue is None:
+            queue = self._sessions[session_id] = _SessionQueue()
+        queue.users += 1
+
+        self.waiting += 1
+        try:
+            with span("admission_wait"):
+                await asyncio.wait_for(self._acquire(queue), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_DECISIONS.inc(result="timeout")
+            self._leave(session_id, queue)
+            raise AdmissionRejectedError("Timed out waiting for a free slot, please retry", self.retry_after())
+        except BaseException:
+            self._leave(session_id, queue)
+            raise
+        finally:
+            self.waiting -= 1
+
+        started_at = time.monotonic()
+        ADMISSION_DECISIONS.inc(result="admitted")
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._average_seconds = 0.8 * self._average_seconds + 0.2 * (time.monotonic() - started_at)
+            self._slots.release()
+            queue.lock.release()
+            self._leave(session_id, queue)
+
+    async def _acquire(self, queue: _SessionQueue):
+        # Session first: a request stuck behind its own session must not hold a global slot
+        await queue.lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            queue.lock.release()
+            raise
+
+    def _leave(self, session_id: str, queue: _SessionQueue):
+        queue.users -= 1
+        if queue.users == 0 and self._sessions.get(session_id) is queue:
+            del self._sessions[session_id]
@@ -1,20 +1,43 @@
-from agents import Agent, OpenAIChatCompletionsModel, AsyncOpenAI, Runner, SQLiteSession, gen_trace_id
+import logging
+from functools import cache
+from typing import AsyncIterator
+from agents import Agent, ItemHelpers, OpenAIChatCompletionsModel, AsyncOpenAI, Runner, Session, gen_trace_id
 from agents.mcp import MCPServer
+from openai.types.responses import ResponseTextDeltaEvent
 from pydantic_schemas.schemas import AgentResponse
-from config.settings import GEMINI_API_KEY
+from chat_agents.formatter import format_final_output
+from chat_agents.history import CompactingSession
+from chat_agents.timing import TimingHooks, span
+from chat_agents.ui_resources import text_part, ui_resource_part, ui_resources_from_tool_output
+from config.settings import GEMINI_API_KEY, FORMATTER_MODE, MODEL_BASE_URL, RESPONSE_CACHE_EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+# The client, model and agents below are built on first use rather than at
+# import, so importing the app (every worker start and reload) stays cheap
+
+
+@cache
+def get_client() -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key=GEMINI_API_KEY,
+        base_url=MODEL_BASE_URL,
+    )
+
+
+# The model wrapper is stateless, so every agent shares one
+@cache
+def get_study_model() -> OpenAIChatCompletionsModel:
+    return OpenAIChatCompletionsModel(
+        model="gemini-2.5-flash",
+        openai_client=get_client(),
+    )
 
-# Initialize OpenAI client
-client = AsyncOpenAI(
-    api_key=GEMINI_API_KEY,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
 
 # ======================
 # Formatting Agent
 # ======================
-formatting_agent = Agent(
-    name="FormattingAgent",
-    instructions="""
+FORMATTING_INSTRUCTIONS = """
 You are a professional **FormattingAgent**. Your task is to **format all outputs strictly according to the AgentResponse schema**.
 
 **Rules you must follow:**
@@ -80,35 +103,154 @@ You are a professional **FormattingAgent**. Your task is to **format all outputs
 
 **Important:** Every output must follow these rules exactly. Never generate extra fields, reasoning, or incorrect structures.
 
-""",
-    model=OpenAIChatCompletionsModel(
-        model="gemini-2.5-flash",
-        openai_client=client,
-    ),
-    output_type=AgentResponse,
-)
+"""
+
+
+@cache
+def get_formatting_agent() -> Agent:
+    return Agent(
+        name="FormattingAgent",
+        instructions=FORMATTING_INSTRUCTIONS,
+        model=OpenAIChatCompletionsModel(
+            model="gemini-2.5-flash",
+            openai_client=get_client(),
+        ),
+        output_type=AgentResponse,
+    )
+
+# In "local" formatter mode the StudyMode agent answers directly and the
+# AgentResponse is built in code (chat_agents/formatter.py), so the prompt's
+# handoff instruction has to be overridden.
+LOCAL_FORMATTING_NOTE = """
+
+---
+
+## Output Delivery (overrides any handoff instruction above)
+
+Formatting is handled automatically. Do NOT hand off to a formatting agent and do NOT output JSON.
+Reply to the student directly in Markdown. Interactive components returned by tools are attached to your reply automatically.
+"""
 
 # ======================
 # Function to create main StudyMode agent
 # ======================
-def create_study_agent(instructions: str, mcp_server: MCPServer, session: SQLiteSession | None = None):
+def create_study_agent(instructions: str, mcp_server: MCPServer, session: Session | None = None):
+    if FORMATTER_MODE == "llm":
+        handoffs = [get_formatting_agent()]
+    else:
+        instructions = instructions + LOCAL_FORMATTING_NOTE
+        handoffs = []
+
     agent = Agent(
         name="StudyMode",
         instructions=instructions,
-        model=OpenAIChatCompletionsModel(
-            model="gemini-2.5-flash",
-            openai_client=client,
-        ),
+        model=get_study_model(),
         mcp_servers=[mcp_server],
-        handoffs=[formatting_agent],
+        handoffs=handoffs,
     )
     return agent
 
+# ======================
+# History summarizer (runs in the background, see chat_agents/history.py)
+# ======================
+SUMMARY_INSTRUCTIONS = """
+You maintain the running memory of a tutoring session between a student and a study assistant.
+Given the previous summary (if any) and the next part of the transcript, write an updated summary in at most 200 words covering:
+- topics and concepts covered, and where the student is in the material;
+- the student's level, goals and preferences;
+- misconceptions, mistakes and quiz results;
+- open questions or next steps that were agreed.
+Write plain prose or short bullet points. Do not address the student.
+"""
+
+
+@cache
+def get_summary_agent() -> Agent:
+    return Agent(
+        name="HistorySummarizer",
+        instructions=SUMMARY_INSTRUCTIONS,
+        model=get_study_model(),
+    )
+
+
+async def summarize_history(transcript: str, previous_summary: str | None = None) -> str:
+    prompt = f"Previous summary:\n{previous_summary or '(none)'}\n\nTranscript:\n{transcript}"
+    result = await Runner.run(get_summary_agent(), prompt)
+    return str(result.final_output)
+
+
+async def embed_query(text: str) -> list[float]:
+    """Query embedding used by the response cache to match paraphrased questions."""
+    with span("embed_query"):
+        result = await get_client().embeddings.create(model=RESPONSE_CACHE_EMBEDDING_MODEL, input=text)
+    return result.data[0].embedding
+
+
 # ======================
 # Runner helper
 # ======================
-async def run_agent(agent: Agent, session: SQLiteSession | None = None,query:str="Hi!") -> dict:
+async def run_agent(agent: Agent, session: Session | None = None,query:str="Hi!") -> dict:
     trace_id = gen_trace_id()
-    print(f"\nView trace: https://platform.openai.com/traces/trace?trace_id={trace_id}\n")
-    result = await Runner.run(agent, query, session=session)
-    return result.final_output.model_dump()
+    logger.debug(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
+    result = await Runner.run(agent, query, session=session, hooks=TimingHooks())
+    if isinstance(session, CompactingSession):
+        session.schedule_compaction()
+    with span("formatting"):
+        response = await format_final_output(result, fallback_agent=get_formatting_agent())
+    return response.model_dump()
+
+
+# ======================
+# Streaming runner helper
+# ======================
+async def run_agent_streamed(agent: Agent, session: Session | None = None, query: str = "Hi!") -> AsyncIterator[dict]:
+    """
+    Run the agent with `Runner.run_streamed` and yield JSON-ready events as they happen.
+
+    Event types:
+        agent_updated: the active agent changed (e.g. handoff to FormattingAgent).
+        text_delta: a chunk of the StudyMode agent's answer.
+        tool_call / tool_output: progress of MCP tool calls.
+        part: a finished `Part` (full text message or `UIResource` from a tool).
+        response: the complete `AgentResponse`; always the last event.
+    """
+    trace_id = gen_trace_id()
+    logger.debug(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
+    result = Runner.run_streamed(agent, query, session=session, hooks=TimingHooks())
+
+    current_agent = agent
+    tool_names: dict[str, str] = {}
+    async for event in result.stream_events():
+        if event.type == "agent_updated_stream_event":
+            current_agent = event.new_agent
+            yield {"type": "agent_updated", "agent": current_agent.name}
+
+        elif event.type == "raw_response_event":
+            # Structured-output agents stream raw JSON, which is not useful to show
+            if current_agent.output_type is None and isinstance(event.data, ResponseTextDeltaEvent):
+                yield {"type": "text_delta", "delta": event.data.delta}
+
+        elif event.type == "run_item_stream_event":
+            item = event.item
+            if event.name == "tool_called":
+                call_id = getattr(item.raw_item, "call_id", None)
+                name = getattr(item.raw_item, "name", "unknown")
+                tool_names[call_id] = name
+                yield {"type": "tool_call", "name": name, "arguments": getattr(item.raw_item, "arguments", None)}
+
+            elif event.name == "tool_output":
+                call_id = item.raw_item.get("call_id") if isinstance(item.raw_item, dict) else None
+                yield {"type": "tool_output", "name": tool_names.get(call_id, "unknown")}
+                for resource in ui_resources_from_tool_output(item.output):
+                    part = ui_resource_part(resource)
+                    yield {"type": "part", "part": part.model_dump(mode="json")}
+
+            elif event.name == "message_output_created" and item.agent.output_type is None:
+                part = text_part(ItemHelpers.text_message_output(item))
+                yield {"type": "part", "part": part.model_dump(mode="json")}
+
+    if isinstance(session, CompactingSession):
+        session.schedule_compaction()
+    with span("formatting"):
+        response = await format_final_output(result, fallback_agent=get_formatting_agent())
+    yield {"type": "response", "response": response.model_dump(mode="json")}
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import date
+from typing import Awaitable, Callable
+from agents import Agent
+from agents.mcp import MCPServer
+from chat_agents.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+AGENT_CACHE_REQUESTS = Counter(
+    "studymode_agent_cache_requests_total",
+    "StudyMode agent lookups, by result (hit, miss).",
+    labelnames=("result",),
+)
+
+
+# ======================
+# Rendered prompt + agent cache
+# ======================
+class StudyAgentCache:
+    """
+    Caches the rendered system prompt and the StudyMode agent built from it,
+    so steady-state requests skip both the `get_prompt` round trip and agent
+    construction.
+
+    The prompt is keyed by (prompt name, today's date, MCP pool generation):
+    - the prompt embeds the current date, so it is refetched on rollover;
+    - the pool generation changes whenever an MCP connection is re-established
+      (e.g. the server was redeployed with a new prompt);
+    - `ttl_seconds` bounds staleness for any other change, and `invalidate()`
+      drops everything immediately.
+
+    Agents only hold configuration, so one agent per pooled MCP connection is
+    shared by all concurrent requests on that connection. An agent references
+    its connection, so the per-connection agents are dropped whenever the pool
+    generation changes; otherwise every replaced connection would stay alive.
+    """
+
+    def __init__(
+        self,
+        fetch_instructions: Callable[[MCPServer, str], Awaitable[str]],
+        build_agent: Callable[[str, MCPServer], Agent],
+        prompt_name: str = "prompt-v1",
+        ttl_seconds: float = 3600.0,
+        generation: Callable[[], int] = lambda: 0,
+    ):
+        self.prompt_name = prompt_name
+        self.ttl_seconds = ttl_seconds
+        self._fetch_instructions = fetch_instructions
+        self._build_agent = build_agent
+        self._generation = generation
+        self._instructions: str | None = None
+        self._prompt_version: str | None = None
+        self._key: tuple | None = None
+        self._fetched_at = 0.0
+        self._agents: dict[MCPServer, Agent] = {}
+        self._agents_generation: int | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def prompt_version(self) -> str | None:
+        """Prompt name plus a hash of the rendered instructions, or None before the first fetch."""
+        return self._prompt_version
+
+    def _current_key(self) -> tuple:
+        return (self.prompt_name, date.today().isoformat(), self._generation())
+
+    def _is_fresh(self, key: tuple) -> bool:
+        return (
+            self._instructions is not None
+            and self._key == key
+            and time.monotonic() - self._fetched_at < self.ttl_seconds
+        )
+
+    async def get_agent(self, mcp_server: MCPServer) -> Agent:
+        key = self._current_key()
+        if not self._is_fresh(key):
+            # One fetch per change, however many requests arrive at once
+            async with self._lock:
+                if not self._is_fresh(key):
+                    instructions = await self._fetch_instructions(mcp_server, self.prompt_name)
+                    if instructions != self._instructions:
+                        self._agents = {}
+                    self._instructions = instructions
+                    digest = hashlib.sha256(instructions.encode("utf-8")).hexdigest()[:12]
+                    self._prompt_version = f"{self.prompt_name}:{digest}"
+                    self._key = key
+                    self._fetched_at = time.monotonic()
+                    logger.info(f"Prompt '{self.prompt_name}' (re)loaded for {key[1]}, pool generation {key[2]}")
+
+        # A reconnect replaced a connection: release the agents of the old ones
+        generation = self._generation()
+        if generation != self._agents_generation:
+            self._agents = {}
+            self._agents_generation = generation
+        agent = self._agents.get(mcp_server)
+        if agent is None:
+            AGENT_CACHE_REQUESTS.inc(result="miss")
+            agent = self._build_agent(self._instructions, mcp_server)
+            self._agents[mcp_server] = agent
+        else:
+            AGENT_CACHE_REQUESTS.inc(result="hit")
+        return agent
+
+    def invalidate(self):
+        """Drop the cached prompt and agents; the next request refetches the prompt."""
+        self._instructions = None
+        self._prompt_version = None
+        self._key = None
+        self._agents = {}
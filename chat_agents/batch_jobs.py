@@ -0,0 +1,460 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable
+from chat_agents.metrics import Counter, Gauge
+from chat_agents.response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Every live runner, so the module-level gauge can report on them
+_RUNNERS: "weakref.WeakSet[BatchJobRunner]" = weakref.WeakSet()
+
+BATCH_ITEMS = Counter(
+    "studymode_batch_items_total",
+    "Batch queries by result (ok, error, duplicate: answered by an identical query of the same job).",
+    labelnames=("result",),
+)
+BATCH_JOBS_RUNNING = Gauge(
+    "studymode_batch_jobs_running",
+    "Batch jobs currently running in this process.",
+    lambda: sum(len(runner.running) for runner in _RUNNERS),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    job_id       TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    total        INTEGER NOT NULL,
+    unique_count INTEGER NOT NULL,
+    completed    INTEGER NOT NULL DEFAULT 0,
+    failed       INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_updated_at ON batch_jobs (updated_at);
+
+CREATE TABLE IF NOT EXISTS batch_items (
+    job_id    TEXT NOT NULL,
+    item      INTEGER NOT NULL,
+    query     TEXT NOT NULL,
+    positions TEXT NOT NULL,
+    status    TEXT NOT NULL,
+    response  TEXT,
+    error     TEXT,
+    seq       INTEGER,
+    PRIMARY KEY (job_id, item)
+);
+CREATE INDEX IF NOT EXISTS idx_batch_items_seq ON batch_items (job_id, seq);
+"""
+
+
+def dedupe_queries(queries: list[str]) -> list[tuple[str, list[int]]]:
+    """(query, positions in `queries`) per distinct normalized query, in first-seen order."""
+    unique: dict[str, tuple[str, list[int]]] = {}
+    for position, query in enumerate(queries):
+        unique.setdefault(normalize_query(query), (query, []))[1].append(position)
+    return list(unique.values())
+
+
+# ======================
+# Job state shared by all workers using the same file
+# ======================
+class BatchJobStore:
+    """
+    Batch jobs and their per-query results in a SQLite file (WAL), so a
+    client can read or resume a job's results from any worker, after a
+    dropped connection, until the job expires.
+
+    Distinct queries of a job are stored once, with the input positions they
+    answer. A finished query gets the job's next `seq`, so "everything after
+    seq N" is a cheap resume point. One thread serializes the writes.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 24 * 3600, expire_interval: float = 300):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._expire_interval = expire_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-jobs")
+        self._conn: sqlite3.Connection | None = None
+        self._expire_task: asyncio.Task | None = None
+
+    async def start(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        await self._run(self._init_schema)
+        self._expire_task = asyncio.create_task(self._expire_loop(), name="batch-jobs-expire")
+
+    async def close(self):
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+            await asyncio.gather(self._expire_task, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+        return self._conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    # ----------------------
+    # Writes (by the worker running the job)
+    # ----------------------
+    async def create(self, job_id: str, total: int, items: list[tuple[str, list[int]]]):
+        await self._run(self._create_sync, job_id, total, items)
+
+    def _create_sync(self, job_id: str, total: int, items: list[tuple[str, list[int]]]):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO batch_jobs (job_id, status, total, unique_count, created_at, updated_at, heartbeat_at) "
+                "VALUES (?, 'running', ?, ?, ?, ?, ?)",
+                (job_id, total, len(items), now, now, now),
+            )
+            conn.executemany(
+                "INSERT INTO batch_items (job_id, item, query, positions, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, item, query, json.dumps(positions)) for item, (query, positions) in enumerate(items)],
+            )
+
+    async def finish_item(self, job_id: str, item: int, response: dict | None, error: str | None):
+        await self._run(self._finish_item_sync, job_id, item, response, error)
+
+    def _finish_item_sync(self, job_id: str, item: int, response: dict | None, error: str | None):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            (positions,) = conn.execute(
+                "SELECT positions FROM batch_items WHERE job_id = ? AND item = ?", (job_id, item),
+            ).fetchone()
+            count = len(json.loads(positions))
+            (seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM batch_items WHERE job_id = ?", (job_id,),
+            ).fetchone()
+            conn.execute(
+                "UPDATE batch_items SET status = ?, response = ?, error = ?, seq = ? WHERE job_id = ? AND item = ?",
+                ("error" if error is not None else "ok", json.dumps(response) if response is not None else None,
+                 error, seq, job_id, item),
+            )
+            column = "failed" if error is not None else "completed"
+            conn.execute(
+                f"UPDATE batch_jobs SET {column} = {column} + ?, updated_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (count, now, now, job_id),
+            )
+
+    async def set_status(self, job_id: str, status: str):
+        await self._run(self._set_status_sync, job_id, status)
+
+    def _set_status_sync(self, job_id: str, status: str):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE batch_jobs SET status = ?, updated_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (status, now, now, job_id),
+            )
+
+    async def claim(self, job_id: str, stale_before: float) -> bool:
+        """Mark an interrupted (or stale running) job as running again; False if another worker got it first."""
+        return await self._run(self._claim_sync, job_id, stale_before)
+
+    def _claim_sync(self, job_id: str, stale_before: float) -> bool:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            return conn.execute(
+                "UPDATE batch_jobs SET status = 'running', updated_at = ?, heartbeat_at = ? WHERE job_id = ? "
+                "AND (status = 'interrupted' OR (status = 'running' AND heartbeat_at < ?))",
+                (now, now, job_id, stale_before),
+            ).rowcount == 1
+
+    async def heartbeat(self, job_ids: list[str]):
+        await self._run(self._heartbeat_sync, job_ids)
+
+    def _heartbeat_sync(self, job_ids: list[str]):
+        conn = self._connection()
+        with conn:
+            conn.executemany("UPDATE batch_jobs SET heartbeat_at = ? WHERE job_id = ?",
+                             [(time.time(), job_id) for job_id in job_ids])
+
+    # ----------------------
+    # Reads
+    # ----------------------
+    async def get_job(self, job_id: str) -> dict | None:
+        return await self._run(self._get_job_sync, job_id)
+
+    def _get_job_sync(self, job_id: str) -> dict | None:
+        cursor = self._connection().execute("SELECT * FROM batch_jobs WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip((column[0] for column in cursor.description), row))
+
+    async def results_after(self, job_id: str, after: int) -> list[dict]:
+        """Finished queries with seq > `after`, in completion order."""
+        return await self._run(self._results_after_sync, job_id, after)
+
+    def _results_after_sync(self, job_id: str, after: int) -> list[dict]:
+        rows = self._connection().execute(
+            "SELECT seq, positions, query, status, response, error FROM batch_items "
+            "WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after),
+        ).fetchall()
+        results = []
+        for seq, positions, query, status, response, error in rows:
+            result = {"seq": seq, "positions": json.loads(positions), "query": query, "status": status}
+            if status == "ok":
+                result["response"] = json.loads(response)
+            else:
+                result["error"] = error
+            results.append(result)
+        return results
+
+    async def pending_items(self, job_id: str) -> list[tuple[int, str]]:
+        return await self._run(self._pending_items_sync, job_id)
+
+    def _pending_items_sync(self, job_id: str) -> list[tuple[int, str]]:
+        return self._connection().execute(
+            "SELECT item, query FROM batch_items WHERE job_id = ? AND status = 'pending' ORDER BY item", (job_id,),
+        ).fetchall()
+
+    # ----------------------
+    # Expiry
+    # ----------------------
+    async def _expire_loop(self):
+        while True:
+            try:
+                deleted = await self._run(self._expire_sync)
+                if deleted:
+                    logger.info(f"Expired {deleted} batch jobs")
+            except Exception as e:
+                logger.warning(f"Batch job expiry failed: {str(e)}")
+            await asyncio.sleep(self._expire_interval)
+
+    def _expire_sync(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM batch_items WHERE job_id IN "
+                "(SELECT job_id FROM batch_jobs WHERE updated_at < ? AND status != 'running')",
+                (cutoff,),
+            )
+            return conn.execute(
+                "DELETE FROM batch_jobs WHERE updated_at < ? AND status != 'running'", (cutoff,),
+            ).rowcount
+
+
+# ======================
+# Bounded-concurrency execution
+# ======================
+class BatchJobRunner:
+    """
+    Runs batch jobs in the background of this worker and streams their
+    results.
+
+    - Identical queries (after normalization) in a job run once; the result
+      answers every position they appear at.
+    - At most `max_concurrency` queries run at once across all jobs of this
+      worker, and each job can ask for fewer. Queries still go through
+      `run_query`, so admission control and the shared MCP pool and model
+      client apply as for /chat.
+    - A job does not depend on the request that submitted it: results are
+      written to the store as they finish, and any worker can stream them
+      from a given `seq` on.
+    - A running job whose heartbeat is older than `stale_after` (its worker
+      stopped) is reported as "interrupted" and can be resumed: only the
+      queries without a result run again.
+    """
+
+    def __init__(
+        self,
+        store: BatchJobStore,
+        run_query: Callable[[str], Awaitable[dict]],
+        max_concurrency: int = 4,
+        max_queries: int = 200,
+        heartbeat_interval: float = 10.0,
+        stale_after: float = 60.0,
+        poll_interval: float = 0.5,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.max_queries = max_queries
+        self.stale_after = stale_after
+        self._run_query = run_query
+        self._heartbeat_interval = heartbeat_interval
+        self._poll_interval = poll_interval
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # job_id -> task, and an event set whenever one of its queries finishes
+        self.running: dict[str, asyncio.Task] = {}
+        self._progress: dict[str, asyncio.Event] = {}
+        self._heartbeat_task: asyncio.Task | None = None
+        _RUNNERS.add(self)
+
+    async def start(self):
+        await self.store.start()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop(), name="batch-jobs-heartbeat")
+
+    async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        jobs = dict(self.running)
+        for task in jobs.values():
+            task.cancel()
+        await asyncio.gather(*jobs.values(), *filter(None, [self._heartbeat_task]), return_exceptions=True)
+        # Left for another worker (or a restart) to resume
+        for job_id in jobs:
+            await self.store.set_status(job_id, "interrupted")
+        await self.store.close()
+
+    async def submit(self, queries: list[str], max_concurrency: int | None = None) -> dict:
+        """Create a job and start running it; returns its status."""
+        if not queries:
+            raise ValueError("A batch needs at least one query")
+        if len(queries) > self.max_queries:
+            raise ValueError(f"A batch can have at most {self.max_queries} queries, got {len(queries)}")
+        items = dedupe_queries(queries)
+        BATCH_ITEMS.inc(len(queries) - len(items), result="duplicate")
+        job_id = uuid.uuid4().hex
+        await self.store.create(job_id, len(queries), items)
+        self._start(job_id, [(item, query) for item, (query, _) in enumerate(items)], max_concurrency)
+        return await self.status(job_id)
+
+    async def resume(self, job_id: str, max_concurrency: int | None = None) -> dict | None:
+        """Re-run the unfinished queries of an interrupted job; None if there is no such job."""
+        status = await self.status(job_id)
+        if status is None:
+            return None
+        claimed = status["status"] == "interrupted" and await self.store.claim(job_id, time.time() - self.stale_after)
+        if not claimed:
+            status = await self.status(job_id)
+            raise ValueError(f"Job {job_id} is {status['status']}, only interrupted jobs can be resumed")
+        self._start(job_id, await self.store.pending_items(job_id), max_concurrency)
+        return await self.status(job_id)
+
+    async def status(self, job_id: str) -> dict | None:
+        job = await self.store.get_job(job_id)
+        if job is None:
+            return None
+        stale = job["heartbeat_at"] < time.time() - self.stale_after
+        if job["status"] == "running" and job_id not in self.running and stale:
+            job["status"] = "interrupted"
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "total": job["total"],
+            "unique": job["unique_count"],
+            "completed": job["completed"],
+            "failed": job["failed"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    async def events(self, job_id: str, after: int = 0) -> AsyncIterator[dict]:
+        """
+        The job's status, then one "result" event per finished query with
+        seq > `after` as they finish, then a final "done" status. Waits on the
+        local job if it runs here, polls the store otherwise.
+        """
+        status = await self.status(job_id)
+        if status is None:
+            return
+        yield {"type": "job", **status}
+        while True:
+            progress = self._progress.get(job_id)
+            if progress is not None:
+                progress.clear()
+            for result in await self.store.results_after(job_id, after):
+                after = result["seq"]
+                yield {"type": "result", **result}
+            status = await self.status(job_id)
+            if status["status"] != "running":
+                yield {"type": "done", **status}
+                return
+            if progress is not None:
+                try:
+                    await asyncio.wait_for(progress.wait(), timeout=self._poll_interval * 10)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(self._poll_interval)
+
+    # ----------------------
+    # Execution
+    # ----------------------
+    def _start(self, job_id: str, items: list[tuple[int, str]], max_concurrency: int | None):
+        self._progress[job_id] = asyncio.Event()
+        # Own context: the job outlives the request that submitted it, so its spans must not go to that request
+        self.running[job_id] = asyncio.create_task(
+            self._run_job(job_id, items, max_concurrency), name=f"batch-job-{job_id}", context=contextvars.Context(),
+        )
+
+    async def _run_job(self, job_id: str, items: list[tuple[int, str]], max_concurrency: int | None):
+        job_slots = asyncio.Semaphore(min(max_concurrency or self.max_concurrency, self.max_concurrency))
+
+        async def run_item(item: int, query: str):
+            async with job_slots, self._slots:
+                try:
+                    response, error = await self._run_query(query), None
+                    BATCH_ITEMS.inc(result="ok")
+                except Exception as e:
+                    logger.warning(f"Batch job {job_id} query {item} failed: {str(e)}")
+                    response, error = None, str(e) or type(e).__name__
+                    BATCH_ITEMS.inc(result="error")
+            await self.store.finish_item(job_id, item, response, error)
+            progress = self._progress.get(job_id)
+            if progress is not None:
+                progress.set()
+
+        tasks = [asyncio.create_task(run_item(item, query)) for item, query in items]
+        try:
+            await asyncio.gather(*tasks)
+            await self.store.set_status(job_id, "completed")
+            logger.info(f"Batch job {job_id} completed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Stop the other queries first, so a resume cannot run them a second time
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.error(f"Batch job {job_id} failed: {str(e)}")
+            await self.store.set_status(job_id, "interrupted")
+        finally:
+            self.running.pop(job_id, None)
+            progress = self._progress.pop(job_id, None)
+            if progress is not None:
+                progress.set()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            if self.running:
+                try:
+                    await self.store.heartbeat(list(self.running))
+                except Exception as e:
+                    logger.warning(f"Batch job heartbeat failed: {str(e)}")
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+from agents import SessionABC
+from agents.items import TResponseInputItem
+from chat_agents.metrics import Counter
+from chat_agents.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COMPACTIONS = Counter(
+    "studymode_history_compactions_total",
+    "Background history compactions, by result (ok, error).",
+    labelnames=("result",),
+)
+
+SUMMARY_PREFIX = "[Summary of the earlier study session]"
+
+# What the model sees instead of a large, stale tool output
+TOOL_OUTPUT_PLACEHOLDERS = {
+    "mcq_quiz_component": "[An interactive quiz was shown to the student here; its HTML is omitted.]",
+    "mcq_quiz_set_component": "[An interactive multi-question quiz was shown to the student here; its HTML is omitted.]",
+    "doc_search_tool": "[Earlier search results omitted; call doc_search_tool again if they are needed.]",
+    "doc_search_batch_tool": "[Earlier search results omitted; call doc_search_batch_tool again if they are needed.]",
+}
+
+
+# ======================
+# Item helpers
+# ======================
+def is_summary(item: TResponseInputItem) -> bool:
+    return item.get("role") == "system" and str(item.get("content", "")).startswith(SUMMARY_PREFIX)
+
+
+def summary_item(summary: str) -> TResponseInputItem:
+    return {"role": "system", "content": f"{SUMMARY_PREFIX}\n{summary}"}
+
+
+def is_user_message(item: TResponseInputItem) -> bool:
+    return item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def split_turns(items: list) -> list[list]:
+    """Group items into turns, each starting at a user message. `items` may be (id, item) pairs."""
+    turns: list[list] = []
+    for entry in items:
+        item = entry[1] if isinstance(entry, tuple) else entry
+        if is_user_message(item) or not turns:
+            turns.append([])
+        turns[-1].append(entry)
+    return turns
+
+
+def strip_tool_outputs(items: list[TResponseInputItem], max_chars: int) -> list[TResponseInputItem]:
+    """Replace tool outputs longer than `max_chars` with a short placeholder."""
+    tool_names = {
+        item.get("call_id"): item.get("name")
+        for item in items
+        if item.get("type") == "function_call"
+    }
+    stripped = []
+    for item in items:
+        output = item.get("output") if item.get("type") == "function_call_output" else None
+        if isinstance(output, str) and len(output) > max_chars:
+            name = tool_names.get(item.get("call_id"), "tool")
+            placeholder = TOOL_OUTPUT_PLACEHOLDERS.get(name, f"[Output of {name} omitted ({len(output)} characters).]")
+            item = {**item, "output": placeholder}
+        stripped.append(item)
+    return stripped
+
+
+def render_transcript(items: list[TResponseInputItem]) -> str:
+    """Plain-text transcript of user and assistant messages, for the summarizer."""
+    lines = []
+    for item in items:
+        if item.get("type") == "function_call":
+            lines.append(f"(tutor used {item.get('name')})")
+            continue
+        role = item.get("role")
+        if role not in ("user", "assistant"):
+            continue
+        content = item.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        if content:
+            lines.append(f"{'Student' if role == 'user' else 'Tutor'}: {content}")
+    return "\n".join(lines)
+
+
+# ======================
+# Compaction policy, shared by every session
+# ======================
+class HistoryCompactor:
+    """
+    Keeps replayed history short for long study sessions.
+
+    Every run sees at most: the rolling summary, plus the last `window_turns`
+    turns, with large tool outputs (quiz HTML, search results) replaced by
+    placeholders except in the most recent `keep_tool_output_turns` turns.
+
+    Once a session has more than `compact_after_turns` turns, the turns before
+    the window are summarized (together with the previous summary) by
+    `summarize` in a background task, and replaced in the store by a single
+    summary item. Users never wait on it: until it finishes, older turns are
+    simply left out of the window.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        summarize: Callable[[str, str | None], Awaitable[str]],
+        window_turns: int = 6,
+        compact_after_turns: int = 12,
+        max_tool_output_chars: int = 1000,
+        keep_tool_output_turns: int = 1,
+        max_concurrent_compactions: int = 2,
+    ):
+        if compact_after_turns < window_turns:
+            raise ValueError("compact_after_turns must be at least window_turns")
+        self.store = store
+        self.summarize = summarize
+        self.window_turns = window_turns
+        self.compact_after_turns = compact_after_turns
+        self.max_tool_output_chars = max_tool_output_chars
+        self.keep_tool_output_turns = keep_tool_output_turns
+        self._semaphore = asyncio.Semaphore(max_concurrent_compactions)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def session(self, session_id: str) -> "CompactingSession":
+        return CompactingSession(session_id, self)
+
+    def prepare(self, items: list[TResponseInputItem]) -> tuple[list[TResponseInputItem], int]:
+        """History to replay for the next run, and the number of stored turns."""
+        summaries = [item for item in items if is_summary(item)]
+        turns = split_turns([item for item in items if not is_summary(item)])
+        window = turns[-self.window_turns:] if self.window_turns else []
+        keep = self.keep_tool_output_turns
+        older, recent = (window[:-keep], window[-keep:]) if keep else (window, [])
+        replay = summaries[-1:]
+        replay += strip_tool_outputs([item for turn in older for item in turn], self.max_tool_output_chars)
+        replay += [item for turn in recent for item in turn]
+        return replay, len(turns)
+
+    def schedule(self, session_id: str, turns: int):
+        """Start a background compaction if the session has outgrown the threshold."""
+        if turns <= self.compact_after_turns:
+            return
+        task = self._tasks.get(session_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._compact_in_background(session_id), name=f"compact-{session_id}")
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda done: self._forget(session_id, done))
+
+    def _forget(self, session_id: str, task: asyncio.Task):
+        if self._tasks.get(session_id) is task:
+            del self._tasks[session_id]
+
+    async def _compact_in_background(self, session_id: str):
+        async with self._semaphore:
+            try:
+                await self.compact(session_id)
+                HISTORY_COMPACTIONS.inc(result="ok")
+            except Exception as e:
+                HISTORY_COMPACTIONS.inc(result="error")
+                logger.error(f"History compaction failed for session {session_id}: {e}")
+
+    async def compact(self, session_id: str) -> bool:
+        """Summarize everything before the window into one stored summary item."""
+        rows = await self.store.get_items_with_ids(session_id)
+        summaries = [(row_id, item) for row_id, item in rows if is_summary(item)]
+        turns = split_turns([(row_id, item) for row_id, item in rows if not is_summary(item)])
+        if len(turns) <= self.compact_after_turns:
+            return False
+
+        old_turns = turns[:-self.window_turns] if self.window_turns else turns
+        old_rows = [row for turn in old_turns for row in turn] + summaries
+        previous = summaries[-1][1]["content"][len(SUMMARY_PREFIX):].strip() if summaries else None
+        transcript = render_transcript([item for turn in old_turns for _, item in turn])
+        summary = await self.summarize(transcript, previous)
+
+        upto_id = max(row_id for row_id, _ in old_rows)
+        await self.store.replace_items(session_id, upto_id, [summary_item(summary.strip())])
+        logger.info(f"Compacted {len(old_turns)} turns of session {session_id} into a summary")
+        return True
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ======================
+# Session view passed to Runner.run
+# ======================
+class CompactingSession(SessionABC):
+    """A stored session whose replayed history is windowed, summarized and stripped."""
+
+    def __init__(self, session_id: str, compactor: HistoryCompactor):
+        self.session_id = session_id
+        self.compactor = compactor
+        self._stored_turns = 0
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        # The window is counted in turns, so the whole history is read; use has_items() for emptiness checks
+        items = await self.compactor.store.get_items(self.session_id)
+        replay, self._stored_turns = self.compactor.prepare(items)
+        return replay[-limit:] if limit else replay
+
+    async def has_items(self) -> bool:
+        """Whether anything is stored, without reading the history."""
+        return await self.compactor.store.has_items(self.session_id)
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        await self.compactor.store.add_items(self.session_id, items)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        return await self.compactor.store.pop_item(self.session_id)
+
+    async def clear_session(self) -> None:
+        await self.compactor.store.clear_session(self.session_id)
+
+    def schedule_compaction(self):
+        """Call after a run has saved its items; counts the turn just added."""
+        self.compactor.schedule(self.session_id, self._stored_turns + 1)
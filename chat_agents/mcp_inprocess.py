@@ -0,0 +1,122 @@
+import importlib.abc
+import importlib.util
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from types import ModuleType
+
+import anyio
+# Private base class of the SDK's MCP servers: it implements the ClientSession
+# plumbing (initialize, list_tools, call_tool, get_prompt, cleanup) around
+# create_streams(). It is not exported, so openai-agents is pinned to the
+# minor version this was written against (pyproject.toml); recheck on upgrade.
+from agents.mcp.server import _MCPServerWithClientSession
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+
+logger = logging.getLogger(__name__)
+
+
+# ======================
+# Embedded StudyMode MCP server
+# ======================
+# Module name of the embedded server; "server" is too generic to claim in sys.modules
+SERVER_MODULE = "studymode_mcp_server"
+
+
+class _ServerSiblingFinder(importlib.abc.MetaPathFinder):
+    """
+    Resolves the server's top-level imports of its sibling modules
+    (embedding_cache, vector_store_manager, ...) to the .py files in its
+    directory, and nothing else, so sys.path is left alone.
+    """
+
+    def __init__(self, server_dir: str):
+        self.server_dir = server_dir
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or fullname == "server":
+            return None
+        location = os.path.join(self.server_dir, f"{fullname}.py")
+        if not os.path.isfile(location):
+            return None
+        return importlib.util.spec_from_file_location(fullname, location)
+
+
+def load_mcp_server_module(server_dir: str) -> ModuleType:
+    """
+    Import mcp/server.py into this process as `studymode_mcp_server`.
+
+    Sibling modules are found by a finder scoped to `server_dir`, installed
+    for the life of the process because the server also imports some of them
+    lazily. Loading the server starts opening the vector store and the
+    embeddings client in background threads, exactly as starting the
+    standalone server does; the module's `readiness` reports when they are
+    done. Loading is done once; later calls return the same module.
+    """
+    server_dir = os.path.abspath(server_dir)
+    module = sys.modules.get(SERVER_MODULE)
+    if module is None:
+        if not any(isinstance(finder, _ServerSiblingFinder) for finder in sys.meta_path):
+            sys.meta_path.append(_ServerSiblingFinder(server_dir))
+        spec = importlib.util.spec_from_file_location(SERVER_MODULE, os.path.join(server_dir, "server.py"))
+        if spec is None:
+            raise ImportError(f"No MCP server module in {server_dir}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[SERVER_MODULE] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[SERVER_MODULE]
+            raise
+    if not isinstance(getattr(module, "mcp", None), FastMCP):
+        raise ImportError(f"No FastMCP instance named 'mcp' in {module.__file__}")
+    logger.info(f"Embedded MCP server '{module.mcp.name}' from {module.__file__}")
+    return module
+
+
+class MCPServerInProcess(_MCPServerWithClientSession):
+    """
+    An MCP client session connected to a FastMCP server in this process.
+
+    Requests and responses are passed as message objects over in-memory
+    streams to the FastMCP server loop, which runs in the connection's task
+    group. That skips the HTTP request, the streamable-HTTP/SSE framing and
+    the JSON encoding. Otherwise everything goes through the same
+    ClientSession and server handlers as the HTTP transport: initialization,
+    list_tools, call_tool (including isError results), get_prompt and ping.
+    So the pool, the agent cache and the agents cannot tell the difference.
+    """
+
+    def __init__(
+        self,
+        server: FastMCP,
+        name: str | None = None,
+        cache_tools_list: bool = False,
+        client_session_timeout_seconds: float | None = 5,
+    ):
+        super().__init__(cache_tools_list, client_session_timeout_seconds)
+        self._server = server
+        self._name = name or f"in_process: {server.name}"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @asynccontextmanager
+    async def create_streams(self):
+        # FastMCP keeps its low-level Server private as well; mcp is pinned below
+        # its next major version for this (pyproject.toml)
+        lowlevel = self._server._mcp_server
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: lowlevel.run(
+                    *server_streams,
+                    lowlevel.create_initialization_options(),
+                    stateless=self._server.settings.stateless_http,
+                ))
+                try:
+                    yield (*client_streams, None)
+                finally:
+                    tg.cancel_scope.cancel()
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from agents.mcp import MCPServer, MCPServerStreamableHttp
+from mcp.server.fastmcp import FastMCP
+from chat_agents.mcp_inprocess import MCPServerInProcess
+from chat_agents.timing import span
+
+logger = logging.getLogger(__name__)
+
+
+class MCPPoolUnavailableError(RuntimeError):
+    """Raised when no healthy MCP connection becomes available in time."""
+
+
+# ======================
+# A single pooled connection
+# ======================
+class _PooledConnection:
+    """
+    One long-lived MCP client connection.
+
+    The MCP streamable HTTP client keeps anyio cancel scopes open for the whole
+    session, so `connect()` and `cleanup()` must run in the same task. Each
+    connection lifetime therefore runs in its own task, supervised by an owner
+    task that reconnects with exponential backoff when it ends.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        factory: Callable[[], MCPServer],
+        connect_timeout: float,
+        health_check_interval: float,
+        health_check_timeout: float,
+        retry_backoff: float,
+        max_retry_backoff: float,
+        on_connect: Callable[[], None] = lambda: None,
+    ):
+        self.index = index
+        self.server: MCPServer | None = None
+        self.in_flight = 0
+        self.ready = asyncio.Event()
+        self._factory = factory
+        self._connect_timeout = connect_timeout
+        self._health_check_interval = health_check_interval
+        self._health_check_timeout = health_check_timeout
+        self._retry_backoff = retry_backoff
+        self._max_retry_backoff = max_retry_backoff
+        self._on_connect = on_connect
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._connected = False
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name=f"mcp-pool-{self.index}")
+
+    async def close(self):
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+
+    def check_soon(self):
+        """Ask the connection to health-check itself right away."""
+        self._wakeup.set()
+
+    async def _run(self):
+        backoff = self._retry_backoff
+        while not self._closing:
+            self._connected = False
+            lifetime = asyncio.create_task(self._serve(), name=f"mcp-pool-{self.index}-session")
+            # A failed connect can leak a CancelledError out of the MCP client's
+            # cancel scope, so never await the lifetime task directly.
+            await asyncio.wait([lifetime])
+            error = "connection aborted" if lifetime.cancelled() else lifetime.exception()
+            if self._closing:
+                break
+            if self._connected:
+                backoff = self._retry_backoff
+                logger.warning(f"MCP pool connection {self.index} unhealthy, reconnecting")
+                continue
+            logger.warning(f"MCP pool connection {self.index} failed to connect: {error}")
+            await self._sleep(backoff)
+            backoff = min(backoff * 2, self._max_retry_backoff)
+
+    async def _serve(self):
+        """Connect, serve requests until unhealthy or closing, then clean up."""
+        server = self._factory()
+        try:
+            with span("mcp_connect"):
+                async with asyncio.timeout(self._connect_timeout):
+                    await server.connect()
+            self._connected = True
+            self.server = server
+            self._on_connect()
+            self.ready.set()
+            logger.info(f"MCP pool connection {self.index} connected")
+            await self._monitor(server)
+        finally:
+            self.ready.clear()
+            self.server = None
+            await server.cleanup()
+
+    async def _monitor(self, server: MCPServer):
+        """Return once the connection is unhealthy or the pool is closing."""
+        while not self._closing:
+            await self._sleep(self._health_check_interval)
+            if self._closing:
+                return
+            if not await self._is_healthy(server):
+                return
+
+    async def _is_healthy(self, server: MCPServer) -> bool:
+        session = getattr(server, "session", None)
+        if session is None:
+            return False
+        try:
+            async with asyncio.timeout(self._health_check_timeout):
+                await session.send_ping()
+            return True
+        except Exception as e:
+            logger.warning(f"MCP pool connection {self.index} failed health check: {e!r}")
+            return False
+
+    async def _sleep(self, seconds: float):
+        """Sleep for `seconds`, waking early on `check_soon()` or `close()`."""
+        try:
+            async with asyncio.timeout(seconds):
+                await self._wakeup.wait()
+        except TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+# ======================
+# Pool shared by all requests
+# ======================
+class MCPServerPool:
+    """
+    A fixed-size pool of connected MCP client sessions shared across requests.
+
+    MCP client sessions multiplex concurrent requests, so a connection is not
+    checked out exclusively: `acquire()` hands out the healthy connection with
+    the fewest in-flight requests. Each connection keeps its own cached tools
+    list, so `list_tools` is only paid once per connection.
+
+    `generation` increases every time a connection is (re)established, e.g.
+    after the MCP server restarted, so callers can drop anything they cached
+    from the previous server instance.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], MCPServer],
+        size: int = 2,
+        connect_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        acquire_timeout: float = 10.0,
+        retry_backoff: float = 0.5,
+        max_retry_backoff: float = 30.0,
+    ):
+        if size < 1:
+            raise ValueError("MCP pool size must be at least 1")
+        self._acquire_timeout = acquire_timeout
+        self.generation = 0
+        self._connections = [
+            _PooledConnection(
+                index=i,
+                factory=factory,
+                connect_timeout=connect_timeout,
+                health_check_interval=health_check_interval,
+                health_check_timeout=health_check_timeout,
+                retry_backoff=retry_backoff,
+                max_retry_backoff=max_retry_backoff,
+                on_connect=self._connection_established,
+            )
+            for i in range(size)
+        ]
+
+    async def start(self, wait: bool = True):
+        """Open all connections; optionally wait until at least one is ready."""
+        for conn in self._connections:
+            conn.start()
+        if wait:
+            try:
+                await self._wait_for_ready(self._acquire_timeout)
+            except MCPPoolUnavailableError:
+                logger.warning("MCP server not reachable yet, pool will keep retrying in the background")
+
+    async def close(self):
+        await asyncio.gather(*(conn.close() for conn in self._connections))
+
+    def _connection_established(self):
+        self.generation += 1
+
+    @property
+    def healthy_count(self) -> int:
+        return sum(1 for conn in self._connections if conn.server is not None)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[MCPServer]:
+        with span("mcp_acquire"):
+            conn = await self._pick()
+        conn.in_flight += 1
+        try:
+            yield conn.server
+        except Exception:
+            # The failure may be unrelated to MCP (e.g. a model error), so let
+            # the owner task ping the server before deciding to reconnect.
+            conn.check_soon()
+            raise
+        finally:
+            conn.in_flight -= 1
+
+    async def _pick(self) -> _PooledConnection:
+        ready = [conn for conn in self._connections if conn.server is not None]
+        if not ready:
+            await self._wait_for_ready(self._acquire_timeout)
+            ready = [conn for conn in self._connections if conn.server is not None]
+            if not ready:
+                raise MCPPoolUnavailableError("No healthy MCP server connection available")
+        return min(ready, key=lambda conn: conn.in_flight)
+
+    async def _wait_for_ready(self, timeout: float):
+        waiters = [asyncio.create_task(conn.ready.wait()) for conn in self._connections]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not done:
+            raise MCPPoolUnavailableError("No healthy MCP server connection available")
+
+
+def create_mcp_pool(url: str, size: int, **kwargs) -> MCPServerPool:
+    """Create a pool of streamable HTTP connections to the StudyMode MCP server."""
+    return MCPServerPool(
+        factory=lambda: MCPServerStreamableHttp(
+            name="StudyMode StreamableHttp Server",
+            params={"url": url},
+            cache_tools_list=True,
+        ),
+        size=size,
+        **kwargs,
+    )
+
+
+def create_inprocess_mcp_pool(server: FastMCP, size: int, **kwargs) -> MCPServerPool:
+    """Create a pool of in-memory connections to a StudyMode MCP server embedded in this process."""
+    return MCPServerPool(
+        factory=lambda: MCPServerInProcess(
+            server,
+            name="StudyMode InProcess Server",
+            cache_tools_list=True,
+        ),
+        size=size,
+        **kwargs,
+    )
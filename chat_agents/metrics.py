@@ -0,0 +1,124 @@
+import bisect
+import threading
+from typing import Callable
+
+
+# ======================
+# Minimal in-process metrics, rendered in Prometheus text format
+# ======================
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(labels[name] for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, e.g. for request latencies in seconds."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # per label set: [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, values in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames + ("le",), key + (_format_bound(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative:g}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {values[-2]}")
+                lines.append(f"{self.name}_count{labels} {values[-1]:g}")
+        return lines
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+class Gauge:
+    """A gauge whose value is computed on scrape."""
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self._function = function
+        REGISTRY.append(self)
+
+    def collect(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self._function()}",
+        ]
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY: list[Counter | Gauge | Histogram] = []
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,236 @@
+import logging
+import re
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple
+
+import numpy as np
+from agents import Session
+from agents.mcp import MCPServer
+from pydantic import AnyUrl, ValidationError
+from pydantic_schemas.schemas import AgentResponse
+from chat_agents.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+_CACHES: "weakref.WeakSet[ResponseCache]" = weakref.WeakSet()
+
+# Published by mcp/server.py; changes whenever a rebuilt index is swapped in
+INDEX_VERSION_URI = "index://version"
+# Similarity-miss query vectors kept for the put() that follows the agent run
+MISS_VECTORS = 256
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "studymode_response_cache_requests_total",
+    "Chat requests seen by the response cache, by result (hit, similar_hit, miss, bypass).",
+    labelnames=("result",),
+)
+RESPONSE_CACHE_ENTRIES = Gauge(
+    "studymode_response_cache_entries",
+    "Responses currently held by the response cache.",
+    lambda: sum(len(cache) for cache in _CACHES),
+)
+
+# Follow-ups that only make sense with the conversation so far
+CONTEXT_REFERENCE = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|he|she|his|her|above|previous|earlier|again|more|"
+    r"continue|next|another|same|last|answer|wrong|right|correct|yes|no|ok|okay)\b"
+)
+
+
+def normalize_query(query: str) -> str:
+    """Case, width, whitespace and trailing punctuation do not change the answer."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(text.split()).rstrip("?!.。 ")
+
+
+def is_history_independent(query: str) -> bool:
+    """A self-contained question (no pronouns or references to earlier turns), e.g. "what is photosynthesis"."""
+    text = normalize_query(query)
+    return len(text.split()) >= 3 and CONTEXT_REFERENCE.search(text) is None
+
+
+class CacheKey(NamedTuple):
+    query: str
+    prompt_version: str
+    index_version: str
+
+
+class _Entry(NamedTuple):
+    response: dict
+    vector: np.ndarray | None
+    created_at: float
+
+
+# ======================
+# Response cache
+# ======================
+class ResponseCache:
+    """
+    Caches validated AgentResponse dicts for repeated study questions, so a
+    class asking the same opening question runs the tool loop once.
+
+    - Only consulted for the first turn of a session, or (scope
+      "independent") for self-contained questions that do not refer back to
+      the conversation.
+    - Keyed by the normalized query, the rendered prompt version and the
+      published index version. A rebuilt index therefore never serves stale
+      answers, and entries of older versions are dropped as soon as a new
+      version is seen.
+    - With `embed` and `similarity_threshold`, a query that misses exactly is
+      matched against cached queries of the same versions by cosine
+      similarity, e.g. "what's photosynthesis" vs "what is photosynthesis".
+    - LRU-bounded to `max_entries`, and entries expire after `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 6 * 3600,
+        scope: str = "first_turn",
+        similarity_threshold: float | None = None,
+        embed: Callable[[str], Awaitable[list[float]]] | None = None,
+        index_version_ttl: float = 5.0,
+    ):
+        if scope not in ("first_turn", "independent"):
+            raise ValueError(f"Unknown response cache scope '{scope}', expected 'first_turn' or 'independent'")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.scope = scope
+        self.similarity_threshold = similarity_threshold if embed is not None else None
+        self._embed = embed
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        # Query vectors of recent similarity misses, reused by the put() after the agent run
+        self._miss_vectors: OrderedDict[CacheKey, np.ndarray] = OrderedDict()
+        self._index_version_ttl = index_version_ttl
+        self._index_version: str | None = None
+        self._index_checked_at = 0.0
+        _CACHES.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def key_for(self, query: str, session: Session | None, prompt_version: str, mcp_server: MCPServer) -> CacheKey | None:
+        """The cache key for this request, or None when its answer may depend on history (None: no history)."""
+        if not await self._is_cacheable(query, session):
+            RESPONSE_CACHE_REQUESTS.inc(result="bypass")
+            return None
+        index_version = await self.index_version(mcp_server)
+        if index_version is None:
+            RESPONSE_CACHE_REQUESTS.inc(result="bypass")
+            return None
+        return CacheKey(normalize_query(query), prompt_version, index_version)
+
+    async def _is_cacheable(self, query: str, session: Session | None) -> bool:
+        if session is None or (self.scope == "independent" and is_history_independent(query)):
+            return True
+        # Sessions of this app answer that with one indexed lookup; other SDK sessions read the tail
+        has_items = getattr(session, "has_items", None)
+        if has_items is not None:
+            return not await has_items()
+        return not await session.get_items(limit=1)
+
+    async def index_version(self, mcp_server: MCPServer) -> str | None:
+        """Published index version, re-read at most every `index_version_ttl` seconds."""
+        if time.monotonic() - self._index_checked_at < self._index_version_ttl:
+            return self._index_version
+        try:
+            result = await mcp_server.session.read_resource(AnyUrl(INDEX_VERSION_URI))
+            version = result.contents[0].text
+        except Exception as e:
+            logger.warning(f"Could not read {INDEX_VERSION_URI}, response cache bypassed: {e}")
+            version = None
+        self._index_checked_at = time.monotonic()
+        if version is not None and version != self._index_version:
+            self._drop(lambda key: key.index_version != version)
+        self._index_version = version
+        return version
+
+    async def get(self, key: CacheKey) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is not None and not self._expired(entry):
+            self._entries.move_to_end(key)
+            RESPONSE_CACHE_REQUESTS.inc(result="hit")
+            return entry.response
+
+        if self.similarity_threshold:
+            similar = await self._get_similar(key)
+            if similar is not None:
+                RESPONSE_CACHE_REQUESTS.inc(result="similar_hit")
+                return similar
+        RESPONSE_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    async def put(self, key: CacheKey, response: dict):
+        """Cache `response` if it is a valid AgentResponse."""
+        try:
+            response = AgentResponse.model_validate(response).model_dump(mode="json")
+        except ValidationError:
+            return
+        vector = self._miss_vectors.pop(key, None)
+        if vector is None and self.similarity_threshold:
+            vector = await self._vector(key.query)
+        self._entries[key] = _Entry(response, vector, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self._entries.clear()
+        self._miss_vectors.clear()
+        self._index_checked_at = 0.0
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.created_at >= self.ttl_seconds
+
+    def _drop(self, predicate: Callable[[CacheKey], bool]):
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    async def _vector(self, text: str) -> np.ndarray | None:
+        try:
+            vector = np.asarray(await self._embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Response cache embedding failed, exact match only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _remember_miss(self, key: CacheKey, vector: np.ndarray):
+        self._miss_vectors[key] = vector
+        self._miss_vectors.move_to_end(key)
+        # Misses whose run failed are never put(); keep only the most recent ones
+        while len(self._miss_vectors) > MISS_VECTORS:
+            self._miss_vectors.popitem(last=False)
+
+    async def _get_similar(self, key: CacheKey) -> dict | None:
+        candidates = [
+            (cached_key, entry) for cached_key, entry in self._entries.items()
+            if entry.vector is not None
+            and cached_key.prompt_version == key.prompt_version
+            and cached_key.index_version == key.index_version
+            and not self._expired(entry)
+        ]
+        if not candidates:
+            return None
+        vector = await self._vector(key.query)
+        if vector is None:
+            return None
+        scores = np.stack([entry.vector for _, entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            self._remember_miss(key, vector)
+            return None
+        cached_key, entry = candidates[best]
+        self._entries.move_to_end(cached_key)
+        return entry.response
+
+
+async def record_cached_turn(session: Session, query: str, response: dict):
+    """Add a turn answered from the cache to the session, so follow-ups see it."""
+    await session.add_items([
+        {"role": "user", "content": query},
+        {"role": "assistant", "content": response.get("content", "")},
+    ])
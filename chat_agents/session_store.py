@@ -0,0 +1,343 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import SessionABC
+from agents.items import TResponseInputItem
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS session_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    message_data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_items_session_id ON session_items (session_id, id);
+"""
+
+
+# ======================
+# File-backed store shared by all sessions (and all workers using the same file)
+# ======================
+class SessionStore:
+    """
+    Durable conversation history in a single SQLite file.
+
+    - WAL mode, so readers never block the writer and several uvicorn workers
+      can share the same database file.
+    - A fixed pool of worker threads, each holding one connection.
+    - Appends from concurrent requests are group-committed by one flusher task:
+      `add_items` returns once its rows are committed, but many sessions share
+      a single transaction.
+    - Sessions idle for longer than `ttl_seconds` are deleted periodically.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = 4,
+        ttl_seconds: float = 7 * 24 * 3600,
+        batch_size: int = 256,
+        flush_interval: float = 0.005,
+        expire_interval: float = 300,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._expire_interval = expire_interval
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="session-store")
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._pending: list[tuple[str, list[str], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closing = False
+        self._flush_task: asyncio.Task | None = None
+        self._expire_task: asyncio.Task | None = None
+
+    def session(self, session_id: str) -> "StoredSession":
+        return StoredSession(session_id, self)
+
+    async def start(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        await self._run(self._init_schema)
+        self._flush_task = asyncio.create_task(self._flush_loop(), name="session-store-flush")
+        self._expire_task = asyncio.create_task(self._expire_loop(), name="session-store-expire")
+
+    async def close(self):
+        self._closing = True
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+        # Wake the flusher so it commits whatever is still pending, then exits
+        self._has_pending.set()
+        self._batch_full.set()
+        tasks = [task for task in (self._flush_task, self._expire_task) if task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    # ----------------------
+    # Connection pool
+    # ----------------------
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    # ----------------------
+    # Reads
+    # ----------------------
+    async def get_items(self, session_id: str, limit: int | None = None) -> list[TResponseInputItem]:
+        rows = await self._run(self._get_items_sync, session_id, limit)
+        items = []
+        for (message_data,) in rows:
+            try:
+                items.append(json.loads(message_data))
+            except json.JSONDecodeError:
+                continue
+        return items
+
+    def _get_items_sync(self, session_id: str, limit: int | None):
+        conn = self._connection()
+        if limit is None:
+            return conn.execute(
+                "SELECT message_data FROM session_items WHERE session_id = ? ORDER BY id ASC",
+                (session_id,),
+            ).fetchall()
+        rows = conn.execute(
+            "SELECT message_data FROM session_items WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    async def has_items(self, session_id: str) -> bool:
+        return await self._run(self._has_items_sync, session_id)
+
+    def _has_items_sync(self, session_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM session_items WHERE session_id = ? LIMIT 1", (session_id,),
+        ).fetchone() is not None
+
+    async def get_items_with_ids(self, session_id: str) -> list[tuple[int, TResponseInputItem]]:
+        """All items of a session with their row ids, oldest first (used by history compaction)."""
+        rows = await self._run(self._get_rows_sync, session_id)
+        items = []
+        for row_id, message_data in rows:
+            try:
+                items.append((row_id, json.loads(message_data)))
+            except json.JSONDecodeError:
+                continue
+        return items
+
+    def _get_rows_sync(self, session_id: str):
+        return self._connection().execute(
+            "SELECT id, message_data FROM session_items WHERE session_id = ? ORDER BY id ASC",
+            (session_id,),
+        ).fetchall()
+
+    # ----------------------
+    # Batched writes
+    # ----------------------
+    async def add_items(self, session_id: str, items: list[TResponseInputItem]):
+        if not items:
+            return
+        if self._closing:
+            raise RuntimeError("Session store is closed")
+        future = asyncio.get_running_loop().create_future()
+        rows = [json.dumps(item) for item in items]
+        self._pending.append((session_id, rows, future))
+        self._pending_rows += len(rows)
+        self._has_pending.set()
+        if self._pending_rows >= self._batch_size:
+            self._batch_full.set()
+        await future
+
+    async def _flush_loop(self):
+        while True:
+            await self._has_pending.wait()
+            if not self._closing and self._pending_rows < self._batch_size:
+                # Give concurrent writers a moment to join this transaction
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending, self._pending_rows = self._pending, [], 0
+            self._has_pending.clear()
+            self._batch_full.clear()
+            if batch:
+                await self._write_batch(batch)
+            if self._closing and not self._pending:
+                return
+
+    async def _write_batch(self, batch: list[tuple[str, list[str], asyncio.Future]]):
+        try:
+            await self._run(self._write_batch_sync, [(session_id, rows) for session_id, rows, _ in batch])
+        except Exception as e:
+            logger.error(f"Session store write of {len(batch)} appends failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def _write_batch_sync(self, batch: list[tuple[str, list[str]]]):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT INTO session_items (session_id, message_data, created_at) VALUES (?, ?, ?)",
+                [(session_id, row, now) for session_id, rows in batch for row in rows],
+            )
+            conn.executemany(
+                """
+                INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at
+                """,
+                [(session_id, now, now) for session_id in {session_id for session_id, _ in batch}],
+            )
+
+    # ----------------------
+    # Removal and expiry
+    # ----------------------
+    async def pop_item(self, session_id: str) -> TResponseInputItem | None:
+        message_data = await self._run(self._pop_item_sync, session_id)
+        if message_data is None:
+            return None
+        try:
+            return json.loads(message_data)
+        except json.JSONDecodeError:
+            return None
+
+    def _pop_item_sync(self, session_id: str) -> str | None:
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                """
+                DELETE FROM session_items
+                WHERE id = (SELECT id FROM session_items WHERE session_id = ? ORDER BY id DESC LIMIT 1)
+                RETURNING message_data
+                """,
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    async def replace_items(self, session_id: str, upto_id: int, items: list[TResponseInputItem]):
+        """
+        Atomically replace every item with row id <= `upto_id` by `items`.
+        The replacements reuse the highest freed ids, so they keep their place
+        before items appended in the meantime.
+        """
+        await self._run(self._replace_items_sync, session_id, upto_id, [json.dumps(item) for item in items])
+
+    def _replace_items_sync(self, session_id: str, upto_id: int, rows: list[str]):
+        conn = self._connection()
+        with conn:
+            freed = [row_id for (row_id,) in conn.execute(
+                "DELETE FROM session_items WHERE session_id = ? AND id <= ? RETURNING id",
+                (session_id, upto_id),
+            ).fetchall()]
+            if len(freed) < len(rows):
+                raise ValueError(f"Cannot replace {len(freed)} items with {len(rows)}")
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO session_items (id, session_id, message_data, created_at) VALUES (?, ?, ?, ?)",
+                [(row_id, session_id, row, now) for row_id, row in zip(sorted(freed)[-len(rows):] if rows else [], rows)],
+            )
+
+    async def clear_session(self, session_id: str):
+        await self._run(self._clear_session_sync, session_id)
+
+    def _clear_session_sync(self, session_id: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM session_items WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def expire_idle_sessions(self) -> int:
+        """Delete sessions that have not been written to within the TTL; returns how many."""
+        return await self._run(self._expire_sync, time.time() - self.ttl_seconds)
+
+    def _expire_sync(self, cutoff: float) -> int:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM session_items WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    async def _expire_loop(self):
+        while not self._closing:
+            try:
+                expired = await self.expire_idle_sessions()
+                if expired:
+                    logger.info(f"Expired {expired} idle sessions")
+            except Exception as e:
+                logger.error(f"Session expiry failed: {e}")
+            await asyncio.sleep(self._expire_interval)
+
+
+# ======================
+# Per-conversation view passed to Runner.run
+# ======================
+class StoredSession(SessionABC):
+    """An agents SDK session backed by a shared SessionStore."""
+
+    def __init__(self, session_id: str, store: SessionStore):
+        self.session_id = session_id
+        self.store = store
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        return await self.store.get_items(self.session_id, limit)
+
+    async def has_items(self) -> bool:
+        return await self.store.has_items(self.session_id)
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        await self.store.add_items(self.session_id, items)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        return await self.store.pop_item(self.session_id)
+
+    async def clear_session(self) -> None:
+        await self.store.clear_session(self.session_id)
@@ -0,0 +1,165 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from agents import RunContextWrapper, RunHooks
+from chat_agents.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = Histogram(
+    "studymode_stage_duration_seconds",
+    "Latency of each chat pipeline stage (mcp_connect, mcp_acquire, get_prompt, model, tool.<name>, formatting, total).",
+    labelnames=("stage",),
+)
+MODEL_TOKENS = Counter(
+    "studymode_model_tokens_total",
+    "Tokens used by model calls, by agent and kind (input, output).",
+    labelnames=("agent", "kind"),
+)
+MODEL_CALL_TOKENS = Histogram(
+    "studymode_model_call_tokens",
+    "Tokens per model call, by kind (input, output).",
+    labelnames=("kind",),
+    buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536),
+)
+
+
+# ======================
+# Per-request spans
+# ======================
+class RequestTimings:
+    """Spans recorded while serving one HTTP request, in start order."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.spans: list[dict[str, Any]] = []
+
+    def record(self, stage: str, start: float, seconds: float, **attrs: Any):
+        self.spans.append({
+            "stage": stage,
+            "start_ms": round((start - self.started_at) * 1000, 1),
+            "duration_ms": round(seconds * 1000, 1),
+            **attrs,
+        })
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value; repeated stages (e.g. model calls) are summed."""
+        totals: dict[str, list[float]] = {}
+        for span in self.spans:
+            total = totals.setdefault(span["stage"], [0.0, 0])
+            total[0] += span["duration_ms"]
+            total[1] += 1
+        entries = []
+        for stage, (duration_ms, count) in totals.items():
+            entry = f"{stage};dur={duration_ms:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def record_span(stage: str, start: float, seconds: float, **attrs: Any):
+    """Observe a finished span in the stage histogram and the current request, if any."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.record(stage, start, seconds, **attrs)
+
+
+@contextmanager
+def span(stage: str, **attrs: Any) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, start, time.perf_counter() - start, **attrs)
+
+
+# ======================
+# Agent run hooks: model turns, token counts, tool calls
+# ======================
+class TimingHooks(RunHooks):
+    """Records a span per model call (with token counts) and per tool call."""
+
+    def __init__(self):
+        self._llm_starts: dict[str, list[float]] = {}
+        self._tool_starts: dict[str, list[float]] = {}
+
+    async def on_llm_start(self, context: RunContextWrapper, agent, system_prompt, input_items) -> None:
+        self._llm_starts.setdefault(agent.name, []).append(time.perf_counter())
+
+    async def on_llm_end(self, context: RunContextWrapper, agent, response) -> None:
+        starts = self._llm_starts.get(agent.name)
+        if not starts:
+            return
+        start = starts.pop(0)
+        usage = response.usage
+        MODEL_TOKENS.inc(usage.input_tokens, agent=agent.name, kind="input")
+        MODEL_TOKENS.inc(usage.output_tokens, agent=agent.name, kind="output")
+        MODEL_CALL_TOKENS.observe(usage.input_tokens, kind="input")
+        MODEL_CALL_TOKENS.observe(usage.output_tokens, kind="output")
+        record_span(
+            "model",
+            start,
+            time.perf_counter() - start,
+            agent=agent.name,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+        )
+
+    async def on_tool_start(self, context: RunContextWrapper, agent, tool) -> None:
+        self._tool_starts.setdefault(tool.name, []).append(time.perf_counter())
+
+    async def on_tool_end(self, context: RunContextWrapper, agent, tool, result: str) -> None:
+        starts = self._tool_starts.get(tool.name)
+        if not starts:
+            return
+        start = starts.pop(0)
+        record_span(f"tool.{tool.name}", start, time.perf_counter() - start)
+
+
+# ======================
+# ASGI middleware: Server-Timing header and one structured log line per request
+# ======================
+class ServerTimingMiddleware:
+    """
+    Collects the spans recorded while handling a request and adds them as a
+    `Server-Timing` header. Streaming responses send their headers before
+    the agent runs, so they only carry the spans recorded up to that point;
+    the full breakdown is still logged and observed in the histograms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timings.spans:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            if timings.spans:
+                logger.info("request timings %s", json.dumps({
+                    "path": scope["path"],
+                    "total_ms": round((time.perf_counter() - timings.started_at) * 1000, 1),
+                    "spans": timings.spans,
+                }))
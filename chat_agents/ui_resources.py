@@ -0,0 +1,46 @@
+import json
+from typing import Any
+
+from pydantic_schemas.schemas import Part, PartType, UIResource
+
+
+def ui_resources_from_tool_output(output: Any) -> list[UIResource]:
+    """
+    Extract UI resources from an MCP tool output.
+
+    The agents SDK hands MCP tool results to the model as a JSON string: a single
+    content item, or a list of them when the tool returned several. UI components
+    such as `mcq_quiz_component` are embedded resources with a `ui://` URI.
+    """
+    if isinstance(output, str):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            return []
+
+    items = output if isinstance(output, list) else [output]
+    resources = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("type") != "resource":
+            continue
+        resource = item.get("resource") or {}
+        uri = resource.get("uri", "")
+        if not uri.startswith("ui://"):
+            continue
+        resources.append(
+            UIResource(
+                uri=uri,
+                mimeType=resource.get("mimeType") or "text/html",
+                text=resource.get("text") or "",
+                type="resource",
+            )
+        )
+    return resources
+
+
+def ui_resource_part(resource: UIResource) -> Part:
+    return Part(type=PartType.UI_RESOURCE, resource=resource)
+
+
+def text_part(text: str) -> Part:
+    return Part(type=PartType.TEXT, text=text)
@@ -4,7 +4,61 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-MCP_SERVER_URL = "http://127.0.0.1:5000/mcp"
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:5000/mcp")
+# "http": talk to the MCP server at MCP_SERVER_URL (split deployments)
+# "inprocess": import mcp/server.py from MCP_SERVER_DIR into the API process and call it over in-memory streams
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "http")
+MCP_SERVER_DIR = os.getenv("MCP_SERVER_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp"))
+# OpenAI-compatible endpoint for the agents; point it at benchmarks/fakes.py to run offline
+MODEL_BASE_URL = os.getenv("MODEL_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+
+# MCP client pool shared by all requests (see main.py lifespan)
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+MCP_ACQUIRE_TIMEOUT = float(os.getenv("MCP_ACQUIRE_TIMEOUT", "10"))
+
+# Upper bound on how long a rendered prompt is reused (it is also refetched on date rollover and MCP reconnects)
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+
+# "local": build AgentResponse in code, falling back to the FormattingAgent only on validation errors
+# "llm": always hand off to the FormattingAgent (previous behaviour)
+FORMATTER_MODE = os.getenv("FORMATTER_MODE", "local")
+
+# Durable conversation history (see chat_agents/session_store.py)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("data", "sessions.db"))
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "4"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# History replayed to the model (see chat_agents/history.py): a window of recent turns plus a rolling
+# summary of older ones, compacted in the background once a session passes HISTORY_COMPACT_AFTER_TURNS
+HISTORY_WINDOW_TURNS = int(os.getenv("HISTORY_WINDOW_TURNS", "6"))
+HISTORY_COMPACT_AFTER_TURNS = int(os.getenv("HISTORY_COMPACT_AFTER_TURNS", "12"))
+HISTORY_MAX_TOOL_OUTPUT_CHARS = int(os.getenv("HISTORY_MAX_TOOL_OUTPUT_CHARS", "1000"))
+HISTORY_KEEP_TOOL_OUTPUT_TURNS = int(os.getenv("HISTORY_KEEP_TOOL_OUTPUT_TURNS", "1"))
+
+# Admission control for /chat (see chat_agents/admission.py): requests beyond ADMISSION_MAX_CONCURRENT
+# wait in a bounded queue; when it is full, or the wait exceeds ADMISSION_QUEUE_TIMEOUT, they get a 429
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+
+# Opt-in cache of whole answers (see chat_agents/response_cache.py), keyed by the normalized question, prompt
+# version and index version. Scope "first_turn" only caches a session's opening question; "independent" also
+# caches later questions that do not refer back to the conversation. RESPONSE_CACHE_SIMILARITY > 0 additionally
+# matches paraphrases whose query embeddings have at least that cosine similarity.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+RESPONSE_CACHE_SCOPE = os.getenv("RESPONSE_CACHE_SCOPE", "first_turn")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(6 * 3600)))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-004")
+
+# Batch jobs behind /chat/batch (see chat_agents/batch_jobs.py): queries of all jobs in a worker share
+# BATCH_MAX_CONCURRENCY slots (and still pass admission control); results are kept for BATCH_JOB_TTL_SECONDS
+BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", os.path.join("data", "batch_jobs.db"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "200"))
+BATCH_JOB_TTL_SECONDS = float(os.getenv("BATCH_JOB_TTL_SECONDS", str(24 * 3600)))
 
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY is not set")
@@ -1,17 +1,126 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes.chat import router as chat_router
+from routes.batch import router as batch_router, run_batch_query
+from routes.chat import router as chat_router, get_instructions
+from routes.health import router as health_router
+from routes.metrics import router as metrics_router
 from fastapi.middleware.cors import CORSMiddleware
+from chat_agents.agent import create_study_agent, embed_query, summarize_history
+from chat_agents.admission import AdmissionController
+from chat_agents.batch_jobs import BatchJobRunner, BatchJobStore
+from chat_agents.agent_cache import StudyAgentCache
+from chat_agents.mcp_inprocess import load_mcp_server_module
+from chat_agents.mcp_pool import create_inprocess_mcp_pool, create_mcp_pool
+from chat_agents.history import HistoryCompactor
+from chat_agents.response_cache import ResponseCache
+from chat_agents.session_store import SessionStore
+from chat_agents.timing import ServerTimingMiddleware
+from config.settings import (
+    MCP_SERVER_URL, MCP_TRANSPORT, MCP_SERVER_DIR, MCP_POOL_SIZE, MCP_HEALTH_CHECK_INTERVAL, MCP_ACQUIRE_TIMEOUT,
+    SESSION_DB_PATH, SESSION_POOL_SIZE, SESSION_TTL_SECONDS, PROMPT_CACHE_TTL_SECONDS,
+    HISTORY_WINDOW_TURNS, HISTORY_COMPACT_AFTER_TURNS, HISTORY_MAX_TOOL_OUTPUT_CHARS, HISTORY_KEEP_TOOL_OUTPUT_TURNS,
+    ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT,
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SCOPE, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_SIMILARITY,
+    BATCH_DB_PATH, BATCH_MAX_CONCURRENCY, BATCH_MAX_QUERIES, BATCH_JOB_TTL_SECONDS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool of MCP client sessions for the life of the app, shared by every request
+    if MCP_TRANSPORT == "inprocess":
+        # Same deployment: embed the MCP server and skip the loopback HTTP hop
+        mcp_server_module = load_mcp_server_module(MCP_SERVER_DIR)
+        app.state.mcp_metrics = mcp_server_module.render_metrics
+        app.state.mcp_readiness = mcp_server_module.readiness
+        app.state.mcp_pool = create_inprocess_mcp_pool(
+            mcp_server_module.mcp,
+            size=MCP_POOL_SIZE,
+            health_check_interval=MCP_HEALTH_CHECK_INTERVAL,
+            acquire_timeout=MCP_ACQUIRE_TIMEOUT,
+        )
+    elif MCP_TRANSPORT == "http":
+        app.state.mcp_pool = create_mcp_pool(
+            MCP_SERVER_URL,
+            size=MCP_POOL_SIZE,
+            health_check_interval=MCP_HEALTH_CHECK_INTERVAL,
+            acquire_timeout=MCP_ACQUIRE_TIMEOUT,
+        )
+    else:
+        raise ValueError(f"Unknown MCP_TRANSPORT '{MCP_TRANSPORT}', expected 'http' or 'inprocess'")
+    # Connect in the background: the app serves /health right away and /ready turns 200 once connected
+    await app.state.mcp_pool.start(wait=False)
+    # Rendered prompt and StudyMode agents, reused until the date or the MCP server changes
+    app.state.agent_cache = StudyAgentCache(
+        fetch_instructions=get_instructions,
+        build_agent=lambda instructions, mcp_server: create_study_agent(instructions, mcp_server),
+        ttl_seconds=PROMPT_CACHE_TTL_SECONDS,
+        generation=lambda: app.state.mcp_pool.generation,
+    )
+    # Conversation history that survives requests and is shared by all workers
+    app.state.session_store = SessionStore(
+        SESSION_DB_PATH,
+        pool_size=SESSION_POOL_SIZE,
+        ttl_seconds=SESSION_TTL_SECONDS,
+    )
+    await app.state.session_store.start()
+    # Windowed, summarized history replayed to the model; compaction runs in the background
+    app.state.history = HistoryCompactor(
+        app.state.session_store,
+        summarize=summarize_history,
+        window_turns=HISTORY_WINDOW_TURNS,
+        compact_after_turns=HISTORY_COMPACT_AFTER_TURNS,
+        max_tool_output_chars=HISTORY_MAX_TOOL_OUTPUT_CHARS,
+        keep_tool_output_turns=HISTORY_KEEP_TOOL_OUTPUT_TURNS,
+    )
+    # Global concurrency cap, bounded wait queue and one-at-a-time turns per session
+    app.state.admission = AdmissionController(
+        max_concurrent=ADMISSION_MAX_CONCURRENT,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    )
+    # Answers to repeated opening questions, invalidated by prompt changes and index rebuilds (off by default)
+    app.state.response_cache = ResponseCache(
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+        scope=RESPONSE_CACHE_SCOPE,
+        similarity_threshold=RESPONSE_CACHE_SIMILARITY or None,
+        embed=embed_query if RESPONSE_CACHE_SIMILARITY else None,
+    ) if RESPONSE_CACHE_ENABLED else None
+    # Bulk generation: many independent queries per job, bounded concurrency, results resumable from any worker
+    app.state.batch_jobs = BatchJobRunner(
+        BatchJobStore(BATCH_DB_PATH, ttl_seconds=BATCH_JOB_TTL_SECONDS),
+        run_query=lambda query: run_batch_query(app, query),
+        max_concurrency=BATCH_MAX_CONCURRENCY,
+        max_queries=BATCH_MAX_QUERIES,
+    )
+    await app.state.batch_jobs.start()
+    try:
+        yield
+    finally:
+        await app.state.batch_jobs.close()
+        await app.state.history.close()
+        await app.state.session_store.close()
+        await app.state.mcp_pool.close()
+
 
-app = FastAPI(title="Study Mode", version="1.0")
+app = FastAPI(title="Study Mode", version="1.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],      # Or use ["*"] to allow all origins
     allow_credentials=True,     # Allow cookies/auth headers
     allow_methods=["*"],        # Allow all HTTP methods
     allow_headers=["*"],        # Allow all headers
+    expose_headers=["Server-Timing"],
 )
+# Per-stage spans of each request, returned as a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
 @app.get("/")
 def Home():
     return {"message":"Welcome to Study Mode"}
 # Include routes
 app.include_router(chat_router)
+app.include_router(batch_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
@@ -0,0 +1,69 @@
+import os
+import re
+from typing import Callable, Iterator
+
+from langchain_core.documents import Document
+
+# path -> documents (e.g. one per PDF page); each document gets `source` and `page_title` metadata
+Loader = Callable[[str], Iterator[Document]]
+
+LOADERS: dict[str, Loader] = {}
+
+
+def register_loader(extensions: tuple[str, ...], loader: Loader):
+    """Use `loader` for files with these extensions (lower case, with the dot), replacing any existing one."""
+    for extension in extensions:
+        LOADERS[extension.lower()] = loader
+
+
+def loader_for(path: str) -> Loader | None:
+    return LOADERS.get(os.path.splitext(path)[1].lower())
+
+
+def supported_extensions() -> tuple[str, ...]:
+    return tuple(sorted(LOADERS))
+
+
+def page_title(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# ======================
+# Built-in loaders
+# ======================
+def load_text(path: str) -> Iterator[Document]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    yield Document(page_content=text, metadata={"source": path, "page_title": page_title(path)})
+
+
+FRONT_MATTER = re.compile(r"\A---\s*\n.*?\n---\s*\n", re.DOTALL)
+
+
+def load_markdown(path: str) -> Iterator[Document]:
+    """Markdown as text, without YAML front matter; the text splitter already breaks at paragraphs."""
+    with open(path, encoding="utf-8") as f:
+        text = FRONT_MATTER.sub("", f.read(), count=1)
+    yield Document(page_content=text, metadata={"source": path, "page_title": page_title(path)})
+
+
+def load_pdf(path: str) -> Iterator[Document]:
+    """Text of each PDF page as its own document (with a 1-based `page`); needs the optional pypdf package."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Indexing PDF files requires pypdf (pip install pypdf)") from e
+
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        if text.strip():
+            yield Document(
+                page_content=text,
+                metadata={"source": path, "page_title": page_title(path), "page": number},
+            )
+
+
+register_loader((".txt",), load_text)
+register_loader((".md", ".markdown"), load_markdown)
+register_loader((".pdf",), load_pdf)
@@ -0,0 +1,219 @@
+import hashlib
+import inspect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable
+
+from langchain_core.embeddings import Embeddings
+from server_metrics import Counter
+
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "mcp_embedding_cache_requests_total",
+    "Query-embedding cache lookups, by result (memory_hit, disk_hit, miss).",
+    labelnames=("result",),
+)
+
+
+def normalize_query(text: str) -> str:
+    """Collapse case, whitespace and trailing punctuation so near-identical questions share a key."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" ?!.")
+
+
+def embed_query_batch(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """
+    Embed several queries in one batched request. Gemini embeds documents
+    with the RETRIEVAL_DOCUMENT task type by default, so the query task type
+    is requested explicitly where the client supports it.
+    """
+    if isinstance(embeddings, LazyEmbeddings):
+        embeddings = embeddings.embeddings
+    if "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return embeddings.embed_documents(texts)
+
+
+# ======================
+# Two-tier cache: in-process LRU + optional SQLite file
+# ======================
+class EmbeddingCache:
+    """
+    Cache of query embeddings keyed by (embedding model, normalized query).
+
+    The in-memory tier is an LRU bounded by `max_entries` and `ttl_seconds`.
+    The optional disk tier survives restarts and is shared by every MCP worker
+    pointing at the same `disk_dir`. It has its own lock, so memory hits never
+    wait on disk IO, and rows older than `disk_ttl_seconds` are deleted at most
+    once per `prune_interval` seconds, from the write path.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 10000,
+        ttl_seconds: float = 24 * 3600,
+        disk_dir: str | None = None,
+        disk_ttl_seconds: float = 30 * 24 * 3600,
+        prune_interval: float = 3600.0,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.prune_interval = prune_interval
+        self._memory: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: sqlite3.Connection | None = None
+        self._disk_lock = threading.Lock()
+        self._pruned_at = 0.0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk = sqlite3.connect(os.path.join(disk_dir, "embeddings.db"), check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> list[float] | None:
+        key = self.key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, vector = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    EMBEDDING_CACHE_REQUESTS.inc(result="memory_hit")
+                    return vector
+                del self._memory[key]
+
+        if self._disk is not None:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and now - row[1] <= self.disk_ttl_seconds:
+                vector = array("f", row[0]).tolist()
+                with self._lock:
+                    self._remember(key, vector, now)
+                EMBEDDING_CACHE_REQUESTS.inc(result="disk_hit")
+                return vector
+
+        EMBEDDING_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def put(self, text: str, vector: list[float]):
+        key = self.key(text)
+        now = time.time()
+        with self._lock:
+            self._remember(key, vector, now)
+        if self._disk is None:
+            return
+        with self._disk_lock:
+            try:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, array("f", vector).tobytes(), now),
+                )
+                self._disk.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Embedding cache disk write failed: {e}")
+            if now - self._pruned_at >= self.prune_interval:
+                self._prune_disk(now)
+
+    def prune_disk(self) -> int:
+        """Delete disk rows older than `disk_ttl_seconds`; returns how many."""
+        if self._disk is None:
+            return 0
+        with self._disk_lock:
+            return self._prune_disk(time.time())
+
+    def _prune_disk(self, now: float) -> int:
+        # Caller holds _disk_lock
+        self._pruned_at = now
+        try:
+            with self._disk:
+                deleted = self._disk.execute(
+                    "DELETE FROM embeddings WHERE created_at < ?", (now - self.disk_ttl_seconds,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logging.warning(f"Embedding cache disk prune failed: {e}")
+            return 0
+        if deleted:
+            logging.info(f"Pruned {deleted} expired embeddings from the disk cache")
+        return deleted
+
+    def _remember(self, key: str, vector: list[float], now: float):
+        self._memory[key] = (now, vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Builds the wrapped Embeddings client on first use, so importing the
+    server does not import the client's SDK (langchain_google_genai alone
+    takes over a second).
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings]):
+        self._factory = factory
+        self._embeddings: Embeddings | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self._factory()
+        return self._embeddings
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts, **kwargs)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings client so repeated queries skip the remote embedding call."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Like `embed_query` for many queries; all cache misses go out in one batched request."""
+        vectors = [self.cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            fresh = dict(zip(missing, embed_query_batch(self.embeddings, missing)))
+            for text, vector in fresh.items():
+                self.cache.put(text, vector)
+            vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Documents use a different task type than queries, so they are not cached here
+        return self.embeddings.embed_documents(texts)
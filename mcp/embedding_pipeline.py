@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# (chunk ids, chunks, embeddings) of one finished batch
+BatchWriter = Callable[[list[str], list[Document], list[list[float]]], None]
+
+
+# ======================
+# Rate limiting
+# ======================
+class TokenBucket:
+    """Thread-safe token bucket; `acquire()` blocks until a token is available."""
+
+    def __init__(self, rate_per_second: float, capacity: float | None = None):
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_seconds = (tokens - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class EmbeddingBatchError(RuntimeError):
+    """Raised when a batch still fails after all retries."""
+
+
+# ======================
+# Batched, concurrent embedding
+# ======================
+class EmbeddingPipeline:
+    """
+    Embeds chunks in fixed-size batches on a bounded thread pool and hands each
+    finished batch to `write_batch` as soon as it completes.
+
+    - Each batch is one embedding request and takes one token from the rate limiter.
+    - A failing batch is retried with exponential backoff and jitter; other
+      batches keep going.
+    - Writes happen on the calling thread, in completion order, so the vector
+      store is only ever written from one thread.
+    - At most `max_concurrency * 2` batches are in flight, so `chunks` can be a
+      lazy iterator over a large corpus.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        write_batch: BatchWriter,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        requests_per_minute: float | None = None,
+        max_retries: int = 5,
+        retry_backoff: float = 1.0,
+        max_retry_backoff: float = 60.0,
+        log_every: float = 5.0,
+    ):
+        self.embeddings = embeddings
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.log_every = log_every
+
+    def run(self, chunks: Iterable[tuple[str, Document]]) -> dict:
+        """Embed and write every (chunk id, chunk) pair; returns throughput stats."""
+        stats = {"chunks": 0, "batches": 0, "retries": 0, "seconds": 0.0, "chunks_per_second": 0.0}
+        stats_lock = threading.Lock()
+        start = time.perf_counter()
+        last_log = start
+        batches = self._batches(chunks)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as executor:
+            in_flight: dict[Future, tuple[list[str], list[Document]]] = {}
+
+            def submit_next() -> bool:
+                batch = next(batches, None)
+                if batch is None:
+                    return False
+                in_flight[executor.submit(self._embed_with_retry, batch[1], stats, stats_lock)] = batch
+                return True
+
+            while len(in_flight) < self.max_concurrency * 2 and submit_next():
+                pass
+
+            try:
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        ids, docs = in_flight.pop(future)
+                        vectors = future.result()
+                        self.write_batch(ids, docs, vectors)
+                        stats["chunks"] += len(ids)
+                        stats["batches"] += 1
+                        submit_next()
+
+                    now = time.perf_counter()
+                    if now - last_log >= self.log_every:
+                        last_log = now
+                        print(f"[INFO] Embedded {stats['chunks']} chunks ({stats['chunks'] / (now - start):.1f} chunks/s)")
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["chunks_per_second"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def _batches(self, chunks: Iterable[tuple[str, Document]]) -> Iterator[tuple[list[str], list[Document]]]:
+        iterator = iter(chunks)
+        while batch := list(islice(iterator, self.batch_size)):
+            yield [chunk_id for chunk_id, _ in batch], [doc for _, doc in batch]
+
+    def _embed_with_retry(self, docs: list[Document], stats: dict, stats_lock: threading.Lock) -> list[list[float]]:
+        texts = [doc.page_content for doc in docs]
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+                return vectors
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise EmbeddingBatchError(f"Embedding batch of {len(texts)} chunks failed after {self.max_retries} retries: {e}") from e
+                with stats_lock:
+                    stats["retries"] += 1
+                delay = min(self.max_retry_backoff, self.retry_backoff * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
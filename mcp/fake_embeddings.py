@@ -0,0 +1,51 @@
+"""Deterministic local embeddings, used by offline benchmarks instead of the Gemini API."""
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: every token is hashed into one of
+    `dim` buckets and the vector is L2-normalised, so texts sharing words are
+    similar. Optional latency and failure injection mimic a remote API.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0, per_text_latency: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[bucket % self.dim] += 1.0 if bucket & (1 << 63) else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _call(self, count: int):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+        time.sleep(self.latency + self.per_text_latency * count)
+        if fail:
+            raise RuntimeError("injected embedding failure")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self._call(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self._call(1)
+        return self._vector(text)
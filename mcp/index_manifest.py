@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source: str, contents: list[str]) -> list[str]:
+    """
+    Content-addressed chunk IDs: a chunk keeps its ID as long as its text is
+    unchanged, even if edits elsewhere in the file shift its position.
+    Repeated identical chunks in one file are told apart by occurrence.
+    """
+    seen: dict[str, int] = {}
+    ids = []
+    for content in contents:
+        occurrence = seen.get(content, 0)
+        seen[content] = occurrence + 1
+        key = f"{source}\0{occurrence}\0{content}".encode("utf-8")
+        ids.append(hashlib.sha256(key).hexdigest())
+    return ids
+
+
+# ======================
+# Manifest of what is currently embedded in a vector store
+# ======================
+class IndexManifest:
+    """
+    Records, per source file, the file hash and the IDs of the chunks stored
+    for it, plus the settings that make stored embeddings reusable. Any
+    settings change invalidates the whole index.
+    """
+
+    def __init__(self, settings: dict, files: dict[str, dict] | None = None):
+        self.settings = settings
+        self.files: dict[str, dict] = files or {}
+
+    @classmethod
+    def load(cls, persist_dir: str, settings: dict) -> "IndexManifest | None":
+        """Return the stored manifest, or None if it is missing or was built with other settings."""
+        path = os.path.join(persist_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION or data.get("settings") != settings:
+            return None
+        return cls(settings, data.get("files", {}))
+
+    def save(self, persist_dir: str):
+        os.makedirs(persist_dir, exist_ok=True)
+        path = os.path.join(persist_dir, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "settings": self.settings, "files": self.files}, f, indent=2)
+        os.replace(tmp_path, path)
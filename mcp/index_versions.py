@@ -0,0 +1,146 @@
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+
+# Shared by the index builder (utils.py) and the server (server_settings.py) so both use the same store
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VECTOR_STORE_DIR = os.path.join(BASE_DIR, "..", "vector_store")
+DEFAULT_COLLECTION = "study_documents"
+
+VERSIONS_DIR = "versions"
+STAGING_DIR = "staging"
+CURRENT_FILE = "CURRENT"
+
+
+# ======================
+# Versioned index layout
+# ======================
+#   <root>/CURRENT              name of the published version (replaced atomically)
+#   <root>/versions/<version>/  one complete index: Chroma files, manifest, lexical index
+#   <root>/staging/             the build in progress; kept across interrupted runs so they resume
+#
+# A root without CURRENT is a plain (pre-versioning) store and is served as is.
+def new_version_id() -> str:
+    """Sortable, unique version name, e.g. 20250101T120000123456Z-1a2b3c."""
+    # Microseconds keep builds published within the same second in order for collect_garbage
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:6]}"
+
+
+def current_version(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(root: str, version: str) -> str:
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def resolve_index_dir(root: str) -> tuple[str | None, str]:
+    """(published version, directory to open); the root itself for an unversioned store."""
+    version = current_version(root)
+    if version is None:
+        return None, root
+    return version, version_dir(root, version)
+
+
+def list_versions(root: str) -> list[str]:
+    path = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(path):
+        return []
+    return sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)))
+
+
+def prepare_staging(root: str, full: bool = False) -> str:
+    """
+    Directory to build the next version in.
+
+    An existing staging directory is an interrupted build and is reused so the
+    build resumes. Otherwise the published version is copied (for an
+    incremental update) or an empty directory is created (`full`, or nothing
+    published yet). The published version itself is never written to.
+    """
+    staging = os.path.join(root, STAGING_DIR)
+    if full and os.path.exists(staging):
+        shutil.rmtree(staging)
+    if os.path.exists(staging):
+        print(f"[INFO] Resuming the interrupted build in {staging}")
+        return staging
+
+    _, published = resolve_index_dir(root)
+    if not full and os.path.isdir(published) and os.listdir(published):
+        # Copy under a temporary name so a crash mid-copy never looks like a resumable build
+        ignore = shutil.ignore_patterns(VERSIONS_DIR, STAGING_DIR, CURRENT_FILE, f"{STAGING_DIR}.*")
+        tmp_staging = f"{staging}.{uuid.uuid4().hex}.tmp"
+        shutil.copytree(published, tmp_staging, ignore=ignore)
+        os.replace(tmp_staging, staging)
+    else:
+        os.makedirs(staging)
+    return staging
+
+
+def publish(root: str, staging: str, keep: int = 2) -> str:
+    """
+    Move a finished staging build into versions/ and atomically point CURRENT
+    at it. Readers see either the old or the new version, never a partial one.
+    Older versions beyond the newest `keep` are then deleted.
+    """
+    version = new_version_id()
+    target = version_dir(root, version)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(staging, target)
+
+    pointer = os.path.join(root, CURRENT_FILE)
+    tmp_pointer = f"{pointer}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+
+    collect_garbage(root, keep=keep)
+    return version
+
+
+def collect_garbage(root: str, keep: int = 2) -> list[str]:
+    """
+    Delete all but the newest `keep` versions (never the published one).
+    Keeping the previous version lets servers finish searches that started
+    on it before they noticed the switch.
+    """
+    current = current_version(root)
+    versions = list_versions(root)
+    retained = set(versions[-max(keep, 1):])
+    removed = []
+    for version in versions:
+        if version in retained or version == current:
+            continue
+        shutil.rmtree(version_dir(root, version), ignore_errors=True)
+        removed.append(version)
+    if removed:
+        print(f"[INFO] Removed {len(removed)} old index versions from {root}")
+    return removed
+
+
+def release_chroma(store) -> None:
+    """
+    Drop a langchain Chroma handle's cached client so its SQLite/HNSW files
+    are closed. Chroma caches one client per directory for the life of the
+    process, which would otherwise keep every retired version open.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    client = getattr(store, "_client", None)
+    identifier = getattr(client, "_identifier", None)
+    if identifier is None:
+        return
+    system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+    if system is not None:
+        try:
+            system.stop()
+        except Exception as e:
+            logging.warning(f"Closing Chroma client for {identifier} failed: {e}")
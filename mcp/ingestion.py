@@ -0,0 +1,107 @@
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from document_loaders import loader_for
+from index_manifest import file_sha256
+
+
+class SplitFile(NamedTuple):
+    path: str
+    sha256: str | None
+    # None when the file is unchanged (its hash matched) or could not be read
+    chunks: list[Document] | None
+    error: str | None = None
+
+
+# ======================
+# Discovery
+# ======================
+def discover_files(input_dir: str) -> Iterator[str]:
+    """Files with a registered loader under every folder matching `input_dir`, skipping hidden paths."""
+    for folder in sorted(glob.glob(input_dir)):
+        for dirpath, dirnames, filenames in os.walk(folder):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                if not name.startswith(".") and loader_for(path) is not None:
+                    yield path
+
+
+# ======================
+# Read + split, in worker processes
+# ======================
+@lru_cache(maxsize=4)
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def split_file(path: str, known_sha256: str | None, chunk_size: int, chunk_overlap: int) -> SplitFile:
+    """Hash a file and, unless it matches `known_sha256`, load and split it."""
+    try:
+        sha256 = file_sha256(path)
+        if sha256 == known_sha256:
+            return SplitFile(path, sha256, None)
+        docs = list(loader_for(path)(path))
+        return SplitFile(path, sha256, _splitter(chunk_size, chunk_overlap).split_documents(docs))
+    except Exception as e:
+        return SplitFile(path, None, None, f"{type(e).__name__}: {e}")
+
+
+class _InlineExecutor(Executor):
+    """Runs tasks on submit; used when a process pool is not worth it."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def iter_split_files(
+    files: Iterable[tuple[str, str | None]],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 4,
+    max_pending: int | None = None,
+) -> Iterator[SplitFile]:
+    """
+    Hash, read and split (path, known sha256) pairs across `workers`
+    processes and yield results as they complete.
+
+    Only `max_pending` files (default 2 per worker) are submitted ahead of
+    the consumer, and `files` is pulled lazily, so memory holds a bounded
+    window of split files whatever the corpus size. When the consumer (the
+    embedding pipeline) falls behind, reading stops.
+    """
+    max_pending = max_pending or max(1, workers) * 2
+    iterator = iter(files)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+    with executor:
+        pending: set[Future] = set()
+
+        def submit_next() -> bool:
+            item = next(iterator, None)
+            if item is None:
+                return False
+            pending.add(executor.submit(split_file, item[0], item[1], chunk_size, chunk_overlap))
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield future.result()
+                    submit_next()
+        finally:
+            for future in pending:
+                future.cancel()
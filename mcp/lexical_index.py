@@ -0,0 +1,138 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does explain for from how i in is it me of on or please tell "
+    "that the this to was what when where which who why with you your about define describe".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# ======================
+# BM25 inverted index over the knowledge-base chunks
+# ======================
+class LexicalIndex:
+    """
+    In-memory BM25 index stored next to the vector store. It keeps chunk text
+    and metadata, so lexical hits are served without touching Chroma.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        postings: dict[str, list[list[int]]],
+        doc_lengths: list[int],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, ids: list[str], texts: list[str], metadatas: list[dict]) -> "LexicalIndex":
+        index = cls([], [], [], {}, [])
+        index.add(ids, texts, metadatas)
+        return index
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict]):
+        """Append chunks to the index, e.g. one page of the collection at a time."""
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            position = len(self.ids)
+            tokens = tokenize(text)
+            self.ids.append(chunk_id)
+            self.texts.append(text)
+            self.metadatas.append(metadata)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings.setdefault(term, []).append([position, frequency])
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    @classmethod
+    def load(cls, persist_dir: str) -> "LexicalIndex | None":
+        path = os.path.join(persist_dir, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["texts"], data["metadatas"], data["postings"], data["doc_lengths"])
+
+    def save(self, persist_dir: str):
+        path = os.path.join(persist_dir, LEXICAL_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "postings": self.postings,
+                "doc_lengths": self.doc_lengths,
+            }, f)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """Return (chunk position, BM25 score) pairs, best first."""
+        total = len(self.ids)
+        if not total:
+            return []
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / self.avg_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def is_confident(self, query: str, results: list[tuple[int, float]], max_terms: int = 4, margin: float = 1.5) -> bool:
+        """
+        True when the query looks like an exact term lookup (a few content
+        words, formulas, chapter names) and the best chunk contains all of
+        them and clearly outscores the runner-up.
+        """
+        terms = {term for term in tokenize(query) if term not in STOPWORDS}
+        if not terms or len(terms) > max_terms or not results:
+            return False
+        top_tokens = set(tokenize(self.texts[results[0][0]]))
+        if not terms <= top_tokens:
+            return False
+        return len(results) == 1 or results[0][1] >= margin * results[1][1]
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.texts[position], metadata=self.metadatas[position], id=self.ids[position])
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = 60) -> list[Document]:
+    """Fuse several best-first rankings by summing 1 / (k + rank) per document id."""
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
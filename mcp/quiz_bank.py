@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+from pydantic import ValidationError
+from lexical_index import STOPWORDS, tokenize
+from ui_components import QuizQuestion
+
+QUIZ_BANK_FILE = "quiz_bank.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id   TEXT PRIMARY KEY,
+    page_title TEXT NOT NULL,
+    source     TEXT,
+    generator  TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id         INTEGER PRIMARY KEY,
+    chunk_id   TEXT NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+    title_key  TEXT NOT NULL,
+    question   TEXT NOT NULL,
+    options    TEXT NOT NULL,
+    correct    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_by_chunk ON questions(chunk_id);
+CREATE INDEX IF NOT EXISTS questions_by_title ON questions(title_key);
+"""
+
+
+def title_key(title: str) -> str:
+    """"Cell-Biology_notes" and "cell biology notes" name the same page."""
+    return " ".join(re.split(r"[\s_\-]+", title.lower())).strip()
+
+
+def content_terms(text: str) -> set[str]:
+    return {term for term in tokenize(text) if term not in STOPWORDS}
+
+
+# ======================
+# Validation of generated questions
+# ======================
+def validate_questions(raw: Iterable[dict], chunk_text: str, min_options: int = 3, max_options: int = 6) -> list[QuizQuestion]:
+    """
+    Keep the generated questions that are well-formed and grounded in the chunk:
+    - a non-empty question and `min_options`..`max_options` distinct options;
+    - `correct` is one of the options;
+    - some content word of the question or the answer occurs in the chunk, so
+      the question is about this material rather than general knowledge;
+    - no repeated questions.
+    """
+    chunk_terms = content_terms(chunk_text)
+    seen: set[str] = set()
+    valid = []
+    for item in raw:
+        try:
+            question = QuizQuestion.model_validate(item)
+        except ValidationError:
+            continue
+        text = question.question.strip()
+        options = [option.strip() for option in question.options]
+        correct = question.correct.strip()
+        if not text or any(not option for option in options):
+            continue
+        if not min_options <= len(options) <= max_options or len({o.lower() for o in options}) != len(options):
+            continue
+        if correct not in options:
+            continue
+        if not (content_terms(text) | content_terms(correct)) & chunk_terms:
+            continue
+        if text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        valid.append(QuizQuestion(question=text, options=options, correct=correct))
+    return valid
+
+
+# ======================
+# Indexed local store
+# ======================
+class QuizBank:
+    """
+    Precomputed MCQs in SQLite, indexed by chunk ID and page title.
+
+    Chunk IDs are content-addressed (see index_manifest.chunk_ids), so the
+    bank lives in the root of the versioned index and stays valid across
+    index versions: only new chunks need questions after a rebuild. Every
+    processed chunk is recorded, even when none of its questions passed
+    validation, so it is not sent to the generator again.
+
+    WAL mode lets the MCP server read while the builder writes.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open_existing(cls, persist_dir: str) -> "QuizBank | None":
+        """Read-only bank under a versioned index root, or None if none has been built."""
+        path = os.path.join(persist_dir, QUIZ_BANK_FILE)
+        return cls(path, readonly=True) if os.path.exists(path) else None
+
+    def close(self):
+        self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def chunk_ids(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._connection.execute("SELECT chunk_id FROM chunks")}
+
+    def add(self, chunk_id: str, page_title: str, source: str | None, questions: list[QuizQuestion], generator: str):
+        """Record a processed chunk and its questions, replacing earlier ones."""
+        key = title_key(page_title)
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+            self._connection.execute(
+                "INSERT INTO chunks (chunk_id, page_title, source, generator, created_at) VALUES (?, ?, ?, ?, ?)",
+                (chunk_id, page_title, source, generator, time.time()),
+            )
+            self._connection.executemany(
+                "INSERT INTO questions (chunk_id, title_key, question, options, correct) VALUES (?, ?, ?, ?, ?)",
+                [(chunk_id, key, q.question, json.dumps(q.options, ensure_ascii=False), q.correct) for q in questions],
+            )
+
+    def prune(self, keep_chunk_ids: set[str]) -> int:
+        """Delete questions of chunks that are no longer indexed; returns the number of chunks removed."""
+        stale = self.chunk_ids() - keep_chunk_ids
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in stale])
+        return len(stale)
+
+    def for_page_title(self, title: str, limit: int) -> list[QuizQuestion]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT question, options, correct FROM questions WHERE title_key = ? ORDER BY id LIMIT ?",
+                (title_key(title), limit),
+            ).fetchall()
+        return [self._question(row) for row in rows]
+
+    def for_chunks(self, chunk_ids: list[str], limit: int) -> list[QuizQuestion]:
+        """
+        Up to `limit` questions for chunks given best first, taking one
+        question per chunk in turn so a quiz covers several passages.
+        """
+        if not chunk_ids:
+            return []
+        placeholders = ",".join("?" * len(chunk_ids))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT chunk_id, question, options, correct FROM questions WHERE chunk_id IN ({placeholders}) ORDER BY id",
+                chunk_ids,
+            ).fetchall()
+        by_chunk: dict[str, list[tuple]] = {}
+        for chunk_id, *row in rows:
+            by_chunk.setdefault(chunk_id, []).append(tuple(row))
+        queues = [by_chunk[chunk_id] for chunk_id in chunk_ids if chunk_id in by_chunk]
+        questions = []
+        for turn in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if turn < len(queue) and len(questions) < limit:
+                    questions.append(self._question(queue[turn]))
+        return questions
+
+    @staticmethod
+    def _question(row: tuple) -> QuizQuestion:
+        question, options, correct = row
+        return QuizQuestion(question=question, options=json.loads(options), correct=correct)
@@ -0,0 +1,95 @@
+"""
+MCQ generators for the offline quiz bank (see utils.build_quiz_bank).
+
+A generator has a `name` (recorded with every question) and
+`generate(page_title, text, count) -> list[dict]` returning raw
+{question, options, correct} dicts; quiz_bank.validate_questions decides
+which of them are kept.
+"""
+import hashlib
+import random
+import re
+from collections import Counter
+
+from pydantic import BaseModel, Field
+from lexical_index import STOPWORDS, tokenize
+from ui_components import QuizQuestion
+
+QUIZ_MODEL = "gemini-2.5-flash"
+
+QUIZ_INSTRUCTIONS = """You write multiple-choice practice questions for students.
+Use only facts stated in the passage below, from the study material "{page_title}".
+Write up to {count} questions. Each has exactly 4 distinct, plausible options, and `correct`
+is copied exactly from `options`. Do not refer to "the passage" or "the text" in the questions.
+
+Passage:
+{text}"""
+
+
+class QuizQuestions(BaseModel):
+    questions: list[QuizQuestion] = Field(description="The generated questions")
+
+
+# ======================
+# Gemini
+# ======================
+class GeminiQuizGenerator:
+    """Structured-output questions from Gemini, grounded in one chunk."""
+
+    def __init__(self, api_key: str, model: str = QUIZ_MODEL, temperature: float = 0.2):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.name = model
+        self._llm = ChatGoogleGenerativeAI(
+            model=model, google_api_key=api_key, temperature=temperature,
+        ).with_structured_output(QuizQuestions)
+
+    def generate(self, page_title: str, text: str, count: int) -> list[dict]:
+        prompt = QUIZ_INSTRUCTIONS.format(page_title=page_title, count=count, text=text)
+        result = self._llm.invoke(prompt)
+        return [question.model_dump() for question in result.questions] if result is not None else []
+
+
+# ======================
+# Local cloze questions (offline builds and benchmarks)
+# ======================
+class ClozeQuizGenerator:
+    """
+    Deterministic fill-in-the-blank questions without a model: the most
+    frequent content word of a sentence is blanked out, and the distractors
+    are other frequent words of the same chunk.
+    """
+
+    name = "cloze"
+
+    def __init__(self, min_word_length: int = 5):
+        self.min_word_length = min_word_length
+
+    def generate(self, page_title: str, text: str, count: int) -> list[dict]:
+        words = [
+            word for word in tokenize(text)
+            if word not in STOPWORDS and len(word) >= self.min_word_length and not word.isdigit()
+        ]
+        frequent = [word for word, _ in Counter(words).most_common(12)]
+        # Seeded by the chunk text so rebuilding the bank gives the same questions
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        questions = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            sentence = " ".join(sentence.split())
+            answer = next((word for word in frequent if re.search(rf"\b{word}\b", sentence, re.IGNORECASE)), None)
+            if answer is None or not 40 <= len(sentence) <= 300:
+                continue
+            distractors = [word for word in frequent if word != answer]
+            if len(distractors) < 3:
+                continue
+            options = [answer, *rng.sample(distractors, 3)]
+            rng.shuffle(options)
+            blanked = re.sub(rf"\b{answer}\b", "_____", sentence, count=1, flags=re.IGNORECASE)
+            questions.append({
+                "question": f"Which word completes the sentence from “{page_title}”: {blanked}",
+                "options": options,
+                "correct": answer,
+            })
+            if len(questions) == count:
+                break
+        return questions
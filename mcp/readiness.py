@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+
+# ======================
+# Background startup work and readiness
+# ======================
+class Readiness:
+    """
+    Startup work (opening the index, building the embeddings client) run in
+    background threads, so importing the server returns quickly and the
+    process answers liveness probes while it warms up.
+
+    The server is ready once every check has finished. A failed check is
+    reported but does not keep the server unready: as before, the index is
+    then opened lazily by the first search.
+    """
+
+    def __init__(self):
+        self._checks: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+
+    def run(self, name: str, function: Callable[[], object]) -> threading.Thread:
+        with self._lock:
+            self._checks[name] = {"status": "pending"}
+
+        def target():
+            start = time.perf_counter()
+            try:
+                function()
+                result = {"status": "ok"}
+            except Exception as e:
+                logging.error(f"Startup check '{name}' failed: {str(e)}")
+                result = {"status": "error", "error": str(e)}
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                self._checks[name] = result
+                ready = self._is_ready()
+            if ready:
+                logging.info(f"Ready {time.perf_counter() - self._started_at:.2f}s after import")
+
+        thread = threading.Thread(target=target, name=f"startup-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _is_ready(self) -> bool:
+        return all(check["status"] != "pending" for check in self._checks.values())
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._is_ready()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"ready": self._is_ready(), "checks": {name: dict(check) for name, check in self._checks.items()}}
@@ -0,0 +1,165 @@
+import json
+import math
+import re
+
+from langchain_core.documents import Document
+from server_metrics import Histogram
+
+SEARCH_RESULT_TOKENS = Histogram(
+    "mcp_doc_search_result_tokens",
+    "Estimated tokens returned per doc_search_tool query after merging, dedup and budgeting.",
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000),
+)
+
+# Rough chars-per-token ratio for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Smallest truncated tail worth returning when the budget runs out mid-chunk
+MIN_TRUNCATED_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# ======================
+# Merge and dedupe
+# ======================
+def _overlap(first: str, second: str, min_overlap: int, max_overlap: int) -> int:
+    """Length of the longest suffix of `first` that is also a prefix of `second`, or 0."""
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if second.startswith(first[-size:]):
+            return size
+    return 0
+
+
+def _join(first: str, second: str, min_overlap: int, max_overlap: int) -> str | None:
+    """Merge two chunks of the same file if one contains or overlaps the other."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    size = _overlap(first, second, min_overlap, max_overlap)
+    if size:
+        return first + second[size:]
+    size = _overlap(second, first, min_overlap, max_overlap)
+    if size:
+        return second + first[size:]
+    return None
+
+
+def merge_adjacent_chunks(docs: list[Document], min_overlap: int = 20, max_overlap: int = 400) -> list[Document]:
+    """
+    Merge chunks from the same `source` whose text overlaps (the splitter's
+    chunk_overlap) into one passage. The merged passage takes the rank of its
+    best-ranked chunk.
+    """
+    merged: list[Document] = []
+    for doc in docs:
+        merged = _merge_into(merged, doc, min_overlap, max_overlap)
+    # A later chunk can bridge two passages that were kept apart
+    while True:
+        again: list[Document] = []
+        for doc in merged:
+            again = _merge_into(again, doc, min_overlap, max_overlap)
+        if len(again) == len(merged):
+            return again
+        merged = again
+
+
+def _merge_into(kept: list[Document], doc: Document, min_overlap: int, max_overlap: int) -> list[Document]:
+    source = doc.metadata.get("source")
+    for i, other in enumerate(kept):
+        if other.metadata.get("source") != source:
+            continue
+        joined = _join(other.page_content, doc.page_content, min_overlap, max_overlap)
+        if joined is not None:
+            kept[i] = Document(page_content=joined, metadata=other.metadata, id=other.id)
+            return kept
+    kept.append(doc)
+    return kept
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(docs: list[Document], threshold: float = 0.8) -> list[Document]:
+    """
+    Drop passages whose word 3-grams are mostly (>= threshold) contained in a
+    better-ranked passage, e.g. the same text copied into another file.
+    """
+    kept: list[tuple[Document, set]] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / len(shingles) >= threshold for _, other in kept):
+            continue
+        kept.append((doc, shingles))
+    return [doc for doc, _ in kept]
+
+
+# ======================
+# Rendering within a token budget
+# ======================
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip() + " …"
+
+
+def _render_entry(doc: Document, content: str, compact: bool) -> str | dict:
+    meta = doc.metadata
+    title = meta.get("page_title", "unknown title")
+    source = meta.get("source", "unknown source")
+    if compact:
+        return {"title": title, "source": source, "snippet": " ".join(content.split())}
+    return (
+        f"📄 **Title:** {title}\n"
+        f"📂 **Source:** {source}\n\n"
+        f"{content}"
+    )
+
+
+def _entry_tokens(entry: str | dict) -> int:
+    return estimate_tokens(entry if isinstance(entry, str) else json.dumps(entry, ensure_ascii=False))
+
+
+def fit_to_budget(docs: list[Document], max_tokens: int | None, compact: bool = False) -> list[str | dict]:
+    """Render passages best-first until `max_tokens` is used; the last one may be truncated."""
+    entries = []
+    remaining = max_tokens
+    for doc in docs:
+        entry = _render_entry(doc, doc.page_content, compact)
+        tokens = _entry_tokens(entry)
+        if remaining is None or tokens <= remaining:
+            entries.append(entry)
+            if remaining is not None:
+                remaining -= tokens
+            continue
+        overhead = tokens - estimate_tokens(doc.page_content)
+        max_chars = (remaining - overhead) * CHARS_PER_TOKEN
+        if max_chars >= MIN_TRUNCATED_CHARS:
+            entries.append(_render_entry(doc, _truncate(doc.page_content, max_chars), compact))
+        break
+    return entries
+
+
+def format_search_results(docs: list[Document], max_tokens: int | None = None, compact: bool = False) -> str:
+    """
+    Post-process retrieved chunks for the model: merge overlapping chunks of
+    the same file, drop near-duplicates, and fit the rest into `max_tokens`.
+
+    The default form keeps the title/source header per passage; `compact`
+    returns a JSON list of {title, source, snippet} instead.
+    """
+    docs = drop_near_duplicates(merge_adjacent_chunks(docs))
+    entries = fit_to_budget(docs, max_tokens, compact)
+    if compact:
+        output = json.dumps(entries, ensure_ascii=False)
+    else:
+        output = "\n\n---\n\n".join(entries)
+    SEARCH_RESULT_TOKENS.observe(estimate_tokens(output))
+    return output
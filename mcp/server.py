@@ -1,24 +1,27 @@
+import json
 import logging
-import os
+import threading
 from datetime import datetime
 from mcp.server.fastmcp import FastMCP
-from langchain_chroma import Chroma
-from pydantic import SecretStr
-from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from chromadb.config import Settings
 from mcp_ui_server.core import UIResource
 from mcp_ui_server import create_ui_resource
-
-
-
-
-
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY is not set")
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from embedding_cache import CachedEmbeddings, EmbeddingCache, LazyEmbeddings
+from readiness import Readiness
+from server_metrics import Counter, render_metrics, timed
+from quiz_bank import QuizBank, content_terms
+from search_results import format_search_results
+from ui_components import QuizQuestion, render_mcq_quiz, render_mcq_quiz_set
+from vector_store_manager import VectorStoreManager
+from server_settings import (
+    GEMINI_API_KEY, EMBEDDING_MODEL, EMBEDDING_BACKEND, FAKE_EMBEDDING_LATENCY,
+    VECTOR_STORE_DIR, VECTOR_STORE_COLLECTION, INDEX_RELOAD_INTERVAL, VECTOR_BACKEND, MMAP_RERANK,
+    DOC_SEARCH_MODE, LEXICAL_FAST_PATH,
+    DOC_SEARCH_WORKERS, DOC_SEARCH_BATCH_MAX, DOC_SEARCH_K, DOC_SEARCH_MAX_TOKENS,
+    EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL_SECONDS, EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_DISK_TTL_SECONDS,
+    QUIZ_BANK_SEARCH_K, QUIZ_BANK_MAX_QUESTIONS,
+)
 
 
 # logging.basicConfig(level=logging.INFO)
@@ -30,56 +33,155 @@ mcp = FastMCP(
 )
 
 # 1. Load vector store once at server start
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001", 
-    google_api_key=SecretStr(GEMINI_API_KEY)
+# Repeated questions are answered from the query-embedding cache instead of a remote call
+def create_base_embeddings():
+    if EMBEDDING_BACKEND == "fake":
+        from fake_embeddings import FakeEmbeddings
+        return FakeEmbeddings(latency=FAKE_EMBEDDING_LATENCY)
+    # Imported here: the Gemini SDK is the slowest import of the server
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from pydantic import SecretStr
+    return GoogleGenerativeAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        google_api_key=SecretStr(GEMINI_API_KEY)
+    )
+
+
+base_embeddings = LazyEmbeddings(create_base_embeddings)
+embedding_model_name = "fake" if EMBEDDING_BACKEND == "fake" else EMBEDDING_MODEL
+embeddings = CachedEmbeddings(
+    base_embeddings,
+    EmbeddingCache(
+        model_name=embedding_model_name,
+        max_entries=EMBEDDING_CACHE_SIZE,
+        ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+        disk_dir=EMBEDDING_CACHE_DIR or None,
+        disk_ttl_seconds=EMBEDDING_CACHE_DISK_TTL_SECONDS,
+    ),
 )
 
+# One index handle shared by every doc_search_tool call (warmed up in the background at the end of this module),
+# swapped for the new version whenever utils.build_vector_store publishes one
+vector_stores = VectorStoreManager(
+    persist_dir=VECTOR_STORE_DIR,
+    collection_name=VECTOR_STORE_COLLECTION,
+    embeddings=embeddings,
+    lexical_fast_path=LEXICAL_FAST_PATH,
+    max_workers=DOC_SEARCH_WORKERS,
+    reload_interval=INDEX_RELOAD_INTERVAL,
+    backend=VECTOR_BACKEND,
+    rerank=MMAP_RERANK,
+)
+
+# Precomputed MCQs, opened once the builder has created the bank
+_quiz_bank: QuizBank | None = None
+_quiz_bank_lock = threading.Lock()
+
+QUIZ_BANK_REQUESTS = Counter(
+    "mcp_quiz_bank_requests_total",
+    "quiz_bank_tool calls, by how the topic was matched (page_title, search, miss).",
+    labelnames=("result",),
+)
+
+
+def get_quiz_bank() -> QuizBank | None:
+    # Called from the search executor's threads
+    global _quiz_bank
+    if _quiz_bank is None:
+        with _quiz_bank_lock:
+            if _quiz_bank is None:
+                _quiz_bank = QuizBank.open_existing(VECTOR_STORE_DIR)
+    return _quiz_bank
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# Liveness: the process is up and serving HTTP, even while it warms up
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+# Readiness: startup warm-up (see the end of this module) has finished
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> JSONResponse:
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@mcp.resource(
+    "index://version",
+    name="index_version",
+    description="Version of the published document index; changes whenever a rebuilt index is swapped in.",
+    mime_type="text/plain",
+)
+async def index_version() -> str:
+    # Clients key cached answers on this (see chat_agents/response_cache.py)
+    return await vector_stores.acurrent_version() or "unversioned"
+
 
 @mcp.tool(
     name="doc_search_tool", 
     description="Retrieves the most relevant information from the knowledge base by searching a vector store. It returns the matched content along with metadata (file name and source path)"
     )
-def doc_search_tool(query: str) -> str:
+async def doc_search_tool(query: str, max_tokens: int = DOC_SEARCH_MAX_TOKENS, compact: bool = False) -> str:
     """
     Search the vector store for relevant documents based on the user's query.
 
     Returns both content and metadata (source + page_title) so the agent can
-    tell the user where the information came from.
+    tell the user where the information came from. Overlapping chunks are
+    merged, near-duplicates dropped and the result fitted to `max_tokens`;
+    `compact` returns JSON [{title, source, snippet}] instead of Markdown.
     """
     logging.info(f"doc_search_tool called with query: {query}")
     
     
     try:
-        # point to shared persistent directory
-        PERSIST_DIR = os.path.join("..", "vector_store")
-
-        vector_store = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings,
-            collection_name="study_documents"
-        )
-        retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-        docs = retriever.invoke(query.strip())
-
-        results = []
-        for doc in docs:
-            meta = doc.metadata
-            source = meta.get("source", "unknown source")
-            page_title = meta.get("page_title", "unknown title")
-            
-            entry = (
-                f"📄 **Title:** {page_title}\n"
-                f"📂 **Source:** {source}\n\n"
-                f"{doc.page_content}"
-            )
-            results.append(entry)
-
-        return "\n\n---\n\n".join(results)
+        with timed("doc_search_tool"):
+            docs = await vector_stores.asearch(query.strip(), k=DOC_SEARCH_K, mode=DOC_SEARCH_MODE)
+        return format_search_results(docs, max_tokens=max_tokens, compact=compact)
     
     except Exception as e:
         logging.error(f"Error in doc_search_tool: {str(e)}")
         return "Error: Unable to search documents at this time"
+
+
+@mcp.tool(
+    name="doc_search_batch_tool",
+    description="Runs several related knowledge-base searches in one call (e.g. a concept, its formula and an example). Prefer it over repeated doc_search_tool calls. Returns the matched content and metadata for each query"
+    )
+async def doc_search_batch_tool(queries: list[str], max_tokens: int = DOC_SEARCH_MAX_TOKENS, compact: bool = False) -> str:
+    """
+    Search the vector store for several queries at once. All queries are
+    embedded in one batched request and searched concurrently. `max_tokens`
+    is shared evenly between the queries.
+    """
+    queries = list(dict.fromkeys(query.strip() for query in queries if query.strip()))[:DOC_SEARCH_BATCH_MAX]
+    logging.info(f"doc_search_batch_tool called with {len(queries)} queries")
+    if not queries:
+        return "Error: No search queries given"
+
+    try:
+        with timed("doc_search_batch_tool"):
+            results = await vector_stores.asearch_batch(queries, k=DOC_SEARCH_K, mode=DOC_SEARCH_MODE)
+        per_query_tokens = max_tokens // len(queries)
+        if compact:
+            return json.dumps({
+                query: json.loads(format_search_results(docs, max_tokens=per_query_tokens, compact=True))
+                for query, docs in zip(queries, results)
+            }, ensure_ascii=False)
+        sections = [
+            f"🔎 **Query:** {query}\n\n{format_search_results(docs, max_tokens=per_query_tokens) or 'No matching documents.'}"
+            for query, docs in zip(queries, results)
+        ]
+        return "\n\n===\n\n".join(sections)
+
+    except Exception as e:
+        logging.error(f"Error in doc_search_batch_tool: {str(e)}")
+        return "Error: Unable to search documents at this time"
     
 
 
@@ -92,84 +194,93 @@ from typing import List
 )
 def show_external_url(question: str, options: List[str], correct: str) -> list[UIResource]:
     """Creates a UI resource displaying a dynamic MCQ quiz."""
-    
-    # Build HTML for the quiz
-    htmlString = f"""
-    <style>
-        .mcq-container {{
-            font-family: Arial, sans-serif;
-            max-width: 600px;
-            margin: 20px auto;
-            border: 2px solid #FD7A00;
-            border-radius: 12px;
-            padding: 20px;
-            background: #fff8f0;
-            box-shadow: 0 4px 10px rgba(0,0,0,0.1);
-        }}
-        .mcq-question {{
-            font-size: 20px;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 20px;
-        }}
-        .mcq-options {{
-            display: flex;
-            flex-direction: column;
-            gap: 12px;
-        }}
-        .mcq-option {{
-            padding: 12px 20px;
-            border: 2px solid #FD7A00;
-            border-radius: 8px;
-            background: #fff;
-            cursor: pointer;
-            transition: all 0.2s ease;
-            font-size: 16px;
-            color: #333;
-        }}
-        .mcq-option:hover {{
-            background: #FD7A00;
-            color: #fff;
-        }}
-        .mcq-option.selected.correct {{
-            background: #28a745;
-            color: #fff;
-            border-color: #28a745;
-        }}
-        .mcq-option.selected.incorrect {{
-            background: #dc3545;
-            color: #fff;
-            border-color: #dc3545;
-        }}
-    </style>
-    <div class="mcq-container">
-        <div class="mcq-question">{question}</div>
-        <div class="mcq-options">
-            {"".join([f'<div class="mcq-option" onclick="checkAnswer(this, `{correct}`)">{opt}</div>' for opt in options])}
-        </div>
-    </div>
-    <script>
-        function checkAnswer(el, correct) {{
-            document.querySelectorAll('.mcq-option').forEach(opt => opt.classList.remove('selected','correct','incorrect'));
-            el.classList.add('selected');
-            if(el.textContent.trim() === correct) {{
-                el.classList.add('correct');
-            }} else {{
-                el.classList.add('incorrect');
-            }}
-        }}
-    </script>
+    ui_resource = create_ui_resource({
+        "uri": "ui://mcq_quiz",
+        "content": {
+            "type": "rawHtml",
+            "htmlString": render_mcq_quiz(question, tuple(options), correct)
+        },
+        "encoding": "text"
+    })
+
+    return [ui_resource]
+
+
+@mcp.tool(
+    name="mcq_quiz_set_component",
+    description="Displays a whole multiple-choice quiz (several questions, one page each, with a running score) as a single component. Prefer it over repeated mcq_quiz_component calls."
+)
+def show_quiz_set(questions: List[QuizQuestion]) -> list[UIResource]:
+    """Creates one paginated UI resource for a list of MCQ questions."""
+    if not questions:
+        raise ValueError("questions must contain at least one question")
+
+    ui_resource = create_ui_resource({
+        "uri": "ui://mcq_quiz_set",
+        "content": {
+            "type": "rawHtml",
+            "htmlString": render_mcq_quiz_set(questions)
+        },
+        "encoding": "text"
+    })
+
+    return [ui_resource]
+
+
+@mcp.tool(
+    name="quiz_bank_tool",
+    description="Shows a ready-made multiple-choice quiz on a topic from the knowledge base instantly, as one component. Use it first whenever the student wants a quiz; only if it reports no match, write the questions yourself and use mcq_quiz_set_component."
+)
+async def quiz_bank_tool(topic: str, count: int = 5) -> list[UIResource] | str:
     """
+    Serve questions from the offline quiz bank. A topic naming a study page
+    (its page_title) gets that page's questions; otherwise the knowledge base
+    is searched and questions of the matching chunks are used. Search hits
+    must share a content word with the topic, so an unrelated nearest
+    neighbour never produces a quiz.
+    """
+    logging.info(f"quiz_bank_tool called with topic: {topic}")
+    count = max(1, min(count, QUIZ_BANK_MAX_QUESTIONS))
+    no_match = (
+        f"No ready-made quiz matches '{topic}'. Write the questions yourself from doc_search_tool results "
+        "and show them with mcq_quiz_set_component."
+    )
+    try:
+        with timed("quiz_bank_tool"):
+            # Opening and querying the SQLite bank blocks, so it runs on the search executor
+            bank = await vector_stores.arun(get_quiz_bank)
+            if bank is None:
+                QUIZ_BANK_REQUESTS.inc(result="miss")
+                return no_match
+            questions = await vector_stores.arun(bank.for_page_title, topic, count)
+            result = "page_title"
+            if not questions:
+                terms = content_terms(topic)
+                docs = await vector_stores.asearch(topic.strip(), k=QUIZ_BANK_SEARCH_K, mode=DOC_SEARCH_MODE) if terms else []
+                chunk_ids = [
+                    doc.id for doc in docs
+                    if doc.id and terms & content_terms(f"{doc.metadata.get('page_title', '')} {doc.page_content}")
+                ]
+                questions = await vector_stores.arun(bank.for_chunks, chunk_ids, count)
+                result = "search"
+        if not questions:
+            QUIZ_BANK_REQUESTS.inc(result="miss")
+            return no_match
+        QUIZ_BANK_REQUESTS.inc(result=result)
+
+    except Exception as e:
+        logging.error(f"Error in quiz_bank_tool: {str(e)}")
+        return no_match
 
     ui_resource = create_ui_resource({
-        "uri": "ui://mcq_quiz",
+        "uri": "ui://mcq_quiz_set",
         "content": {
             "type": "rawHtml",
-            "htmlString": htmlString
+            "htmlString": render_mcq_quiz_set(questions)
         },
         "encoding": "text"
     })
-    
+
     return [ui_resource]
 
 
@@ -227,7 +338,7 @@ Begin with a concise checklist (3-7 bullets) outlining the planned approach to e
 
 Recommend or hand off outputs to UI components for interactivity:
 
-1. **MCQ Component**: Multiple-choice questions for practice
+1. **MCQ Component**: Multiple-choice questions for practice (`quiz_bank_tool` first for a ready-made quiz on a topic; otherwise `mcq_quiz_component` for one question, `mcq_quiz_set_component` for a whole quiz in one call)
 2. **Q&A Component**: Free-response exercises with hints
 3. **Glossary Component**: Key terms and definitions
 4. **Mini-Debate / Roleplay Component**: Encourage reasoning and argumentation
@@ -245,9 +356,12 @@ Leverage these tools to enhance answers:
 1. **doc_search_tool(query: str) → str**  
    *Purpose*: Retrieve relevant content from the knowledge base (vector store).  
    *Output*: Includes matched content and metadata (e.g., `page_title`, `source_path`).
-2. **Web Search Tool**  
+2. **doc_search_batch_tool(queries: list[str]) → str**  
+   *Purpose*: Run several related knowledge-base lookups in one call instead of repeated doc_search_tool calls.  
+   *Output*: The same matched content and metadata, grouped per query.
+3. **Web Search Tool**  
    *Purpose*: Obtain up-to-date or external information when necessary.
-3. **Web Scraper**  
+4. **Web Scraper**  
    *Purpose*: Scrape and analyze any user-provided URL.
 
 Use only the listed knowledge tools. For routine retrieval, invoke them as needed; for actions involving external or updatable content, provide a clear rationale before proceeding.
@@ -271,6 +385,13 @@ Set reasoning_effort = medium, balancing concise instructions with moderate deta
 
 
 
+# Open the index and build the embeddings client in the background, so the
+# server starts serving (and answering /health) right away; /ready reports
+# when both are done
+readiness = Readiness()
+readiness.run("index", vector_stores.warm_up)
+readiness.run("embeddings", lambda: base_embeddings.embeddings)
+
 mcp_app = mcp.streamable_http_app()
 
 
@@ -0,0 +1,49 @@
+import os
+from dotenv import load_dotenv
+from index_versions import DEFAULT_COLLECTION, DEFAULT_VECTOR_STORE_DIR
+
+load_dotenv()
+
+# Paths are resolved from this directory so the server does not depend on the working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+# "gemini" or "fake" (deterministic local embeddings for offline benchmarks, see fake_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini")
+FAKE_EMBEDDING_LATENCY = float(os.getenv("FAKE_EMBEDDING_LATENCY", "0.05"))
+
+# Root of the versioned index written by utils.build_vector_store; new versions are picked up
+# within INDEX_RELOAD_INTERVAL seconds without a restart
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", DEFAULT_VECTOR_STORE_DIR)
+VECTOR_STORE_COLLECTION = os.getenv("VECTOR_STORE_COLLECTION", DEFAULT_COLLECTION)
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "5"))
+# "chroma", or "mmap" to search the memory-mapped export (`python utils.py --vector-export int8|float16`);
+# MMAP_RERANK rescores the quantized top candidates with the exact float32 vectors
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+MMAP_RERANK = os.getenv("MMAP_RERANK", "1") == "1"
+
+# doc_search_tool retrieval: "hybrid" (BM25 + vector with reciprocal rank fusion), "vector" or "lexical"
+DOC_SEARCH_MODE = os.getenv("DOC_SEARCH_MODE", "hybrid")
+# Skip the embedding call when BM25 alone clearly answers an exact-term query
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "1") == "1"
+# Threads for blocking embedding calls and Chroma queries, and the most queries one doc_search_batch_tool call may run
+DOC_SEARCH_WORKERS = int(os.getenv("DOC_SEARCH_WORKERS", "4"))
+DOC_SEARCH_BATCH_MAX = int(os.getenv("DOC_SEARCH_BATCH_MAX", "8"))
+# Chunks retrieved per query, and the default token budget of one doc_search_tool result after merging/dedup
+DOC_SEARCH_K = int(os.getenv("DOC_SEARCH_K", "3"))
+DOC_SEARCH_MAX_TOKENS = int(os.getenv("DOC_SEARCH_MAX_TOKENS", "1200"))
+
+# Query-embedding cache (see embedding_cache.py); an empty dir disables the on-disk tier
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600)))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "..", "embedding_cache"))
+EMBEDDING_CACHE_DISK_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_DISK_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# quiz_bank_tool (see quiz_bank.py; built with `python utils.py --quiz-bank`): chunks searched per topic
+# and the most questions one quiz may have
+QUIZ_BANK_SEARCH_K = int(os.getenv("QUIZ_BANK_SEARCH_K", "8"))
+QUIZ_BANK_MAX_QUESTIONS = int(os.getenv("QUIZ_BANK_MAX_QUESTIONS", "10"))
+
+if not GEMINI_API_KEY:
+    raise ValueError("GEMINI_API_KEY is not set")
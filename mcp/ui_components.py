@@ -0,0 +1,208 @@
+import html
+import json
+from functools import lru_cache
+from string import Template
+
+from pydantic import BaseModel, Field
+
+
+class QuizQuestion(BaseModel):
+    question: str = Field(description="The question text")
+    options: list[str] = Field(description="Answer options, shown in this order")
+    correct: str = Field(description="The correct option, exactly as written in `options`")
+
+
+# ======================
+# Static CSS/JS, built once and shared by every quiz
+# ======================
+QUIZ_STYLE = """<style>
+    .mcq-container {
+        font-family: Arial, sans-serif;
+        max-width: 600px;
+        margin: 20px auto;
+        border: 2px solid #FD7A00;
+        border-radius: 12px;
+        padding: 20px;
+        background: #fff8f0;
+        box-shadow: 0 4px 10px rgba(0,0,0,0.1);
+    }
+    .mcq-question {
+        font-size: 20px;
+        font-weight: 600;
+        color: #333;
+        margin-bottom: 20px;
+    }
+    .mcq-options {
+        display: flex;
+        flex-direction: column;
+        gap: 12px;
+    }
+    .mcq-option {
+        padding: 12px 20px;
+        border: 2px solid #FD7A00;
+        border-radius: 8px;
+        background: #fff;
+        cursor: pointer;
+        transition: all 0.2s ease;
+        font-size: 16px;
+        color: #333;
+        text-align: left;
+    }
+    .mcq-option:hover {
+        background: #FD7A00;
+        color: #fff;
+    }
+    .mcq-option.selected.correct {
+        background: #28a745;
+        color: #fff;
+        border-color: #28a745;
+    }
+    .mcq-option.selected.incorrect {
+        background: #dc3545;
+        color: #fff;
+        border-color: #dc3545;
+    }
+    .mcq-nav {
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        margin-top: 20px;
+        color: #333;
+    }
+    .mcq-nav button {
+        padding: 8px 16px;
+        border: 2px solid #FD7A00;
+        border-radius: 8px;
+        background: #fff;
+        cursor: pointer;
+    }
+    .mcq-nav button:disabled {
+        opacity: 0.4;
+        cursor: default;
+    }
+</style>"""
+
+# Answers are looked up by option index, so question and option text never end up inside JavaScript
+QUIZ_SCRIPT = """<script>
+(function () {
+    document.querySelectorAll('.mcq-container').forEach(function (quiz) {
+        var answers = JSON.parse(quiz.dataset.answers);
+        var pages = quiz.querySelectorAll('.mcq-page');
+        var prev = quiz.querySelector('.mcq-prev');
+        var next = quiz.querySelector('.mcq-next');
+        var progress = quiz.querySelector('.mcq-progress');
+        var result = {};
+        var current = 0;
+
+        function show(index) {
+            current = index;
+            pages.forEach(function (page, i) { page.hidden = i !== index; });
+            if (prev) { prev.disabled = index === 0; }
+            if (next) { next.disabled = index === pages.length - 1; }
+            if (progress) {
+                var score = Object.values(result).filter(Boolean).length;
+                progress.textContent = 'Question ' + (index + 1) + ' of ' + pages.length +
+                    ' \\u00b7 Score ' + score + '/' + Object.keys(result).length;
+            }
+        }
+
+        pages.forEach(function (page, q) {
+            page.querySelectorAll('.mcq-option').forEach(function (option) {
+                option.addEventListener('click', function () {
+                    page.querySelectorAll('.mcq-option').forEach(function (other) {
+                        other.classList.remove('selected', 'correct', 'incorrect');
+                    });
+                    var isCorrect = Number(option.dataset.index) === answers[q];
+                    option.classList.add('selected', isCorrect ? 'correct' : 'incorrect');
+                    result[q] = isCorrect;
+                    show(current);
+                });
+            });
+        });
+        if (prev) { prev.addEventListener('click', function () { show(current - 1); }); }
+        if (next) { next.addEventListener('click', function () { show(current + 1); }); }
+        show(0);
+    });
+})();
+</script>"""
+
+
+# ======================
+# Precompiled templates
+# ======================
+QUIZ_TEMPLATE = Template("""$style
+<div class="mcq-container" data-answers="$answers">
+$pages$nav
+</div>
+$script""")
+
+PAGE_TEMPLATE = Template("""    <div class="mcq-page"$hidden>
+        <div class="mcq-question">$question</div>
+        <div class="mcq-options">
+$options
+        </div>
+    </div>""")
+
+OPTION_TEMPLATE = Template("""            <button type="button" class="mcq-option" data-index="$index">$text</button>""")
+
+NAV_HTML = """
+    <div class="mcq-nav">
+        <button type="button" class="mcq-prev">Previous</button>
+        <span class="mcq-progress"></span>
+        <button type="button" class="mcq-next">Next</button>
+    </div>"""
+
+
+def _answer_index(question: QuizQuestion) -> int:
+    """Index of the correct option; -1 if `correct` matches none, so every choice shows as incorrect."""
+    correct = question.correct.strip()
+    for i, option in enumerate(question.options):
+        if option.strip() == correct:
+            return i
+    return -1
+
+
+def _render_page(question: QuizQuestion, first: bool) -> str:
+    options = "\n".join(
+        OPTION_TEMPLATE.substitute(index=i, text=html.escape(option))
+        for i, option in enumerate(question.options)
+    )
+    return PAGE_TEMPLATE.substitute(
+        hidden="" if first else " hidden",
+        question=html.escape(question.question),
+        options=options,
+    )
+
+
+def render_quiz(questions: list[QuizQuestion]) -> str:
+    """One self-contained quiz; with more than one question it is paginated with a running score."""
+    if not questions:
+        raise ValueError("A quiz needs at least one question")
+    return QUIZ_TEMPLATE.substitute(
+        style=QUIZ_STYLE,
+        answers=html.escape(json.dumps([_answer_index(question) for question in questions])),
+        pages="\n".join(_render_page(question, first=i == 0) for i, question in enumerate(questions)),
+        nav=NAV_HTML if len(questions) > 1 else "",
+        script=QUIZ_SCRIPT,
+    )
+
+
+@lru_cache(maxsize=512)
+def render_mcq_quiz(question: str, options: tuple[str, ...], correct: str) -> str:
+    """HTML for a single multiple-choice question; repeated quizzes come from the cache."""
+    return render_quiz([QuizQuestion(question=question, options=list(options), correct=correct)])
+
+
+@lru_cache(maxsize=128)
+def _render_quiz_set(questions: tuple[tuple[str, tuple[str, ...], str], ...]) -> str:
+    return render_quiz([
+        QuizQuestion(question=question, options=list(options), correct=correct)
+        for question, options, correct in questions
+    ])
+
+
+def render_mcq_quiz_set(questions: list[QuizQuestion]) -> str:
+    """HTML for a paginated multi-question quiz; repeated quizzes come from the cache."""
+    return _render_quiz_set(tuple(
+        (question.question, tuple(question.options), question.correct) for question in questions
+    ))
@@ -1,72 +1,453 @@
 
 import os
-import glob
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import random
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
 from chromadb.config import Settings
+from embedding_pipeline import EmbeddingPipeline, TokenBucket
+from index_manifest import IndexManifest, chunk_ids
+from index_versions import (
+    DEFAULT_COLLECTION, DEFAULT_VECTOR_STORE_DIR, current_version, prepare_staging, publish, release_chroma,
+    resolve_index_dir,
+)
+from ingestion import discover_files, iter_split_files
+from lexical_index import LexicalIndex
+from mmap_index import export_mmap_index, has_mmap_index, remove_mmap_index
+from quiz_bank import QUIZ_BANK_FILE, QuizBank, validate_questions
 
-def build_vector_store(input_dir: str = "knowledge-base/", gemini_api_key: str = None):
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+CHUNK_SIZE = 900
+CHUNK_OVERLAP = 100
+
+
+def existing_chunk_ids(vector_store: Chroma, ids: list[str], page_size: int = 500) -> set[str]:
+    """IDs that are already stored, e.g. written by an interrupted earlier run."""
+    found = set()
+    for start in range(0, len(ids), page_size):
+        found.update(vector_store._collection.get(ids=ids[start:start + page_size], include=[])["ids"])
+    return found
+
+
+def build_lexical_index(vector_store: Chroma, persist_dir: str, page_size: int = 5000) -> LexicalIndex:
     """
-    Build a vector store from text documents in the specified input directory.
+    Rebuild the BM25 index from the chunks currently in the collection (no embedding calls).
+
+    Postings are built page by page, so only one page of Chroma results is
+    held besides the index. The index itself keeps every chunk's text and
+    metadata (it serves lexical hits without Chroma) and is saved as a single
+    JSON file, so memory still grows with the corpus.
+    """
+    index = LexicalIndex.build([], [], [])
+    offset = 0
+    while True:
+        page = vector_store._collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        index.add(page["ids"], page["documents"], [meta or {} for meta in page["metadatas"]])
+        offset += len(page["ids"])
+    index.save(persist_dir)
+    return index
+
+
+def build_vector_store(
+    input_dir: str = "knowledge-base/",
+    gemini_api_key: str = None,
+    full: bool = False,
+    persist_dir: str = DEFAULT_VECTOR_STORE_DIR,
+    collection_name: str = DEFAULT_COLLECTION,
+    embeddings: Embeddings | None = None,
+    batch_size: int = 100,
+    max_concurrency: int = 4,
+    requests_per_minute: float | None = 100,
+    keep_versions: int = 2,
+    read_workers: int = min(4, os.cpu_count() or 1),
+    vector_export: str | None = None,
+) -> dict:
+    """
+    Build or incrementally update a vector store from the documents in the specified input directory
+    (.txt, Markdown and PDF; more formats can be added with document_loaders.register_loader).
+
+    Only files whose content hash changed since the last run are re-split, and
+    only their new or changed chunks are embedded. Chunks of deleted files are
+    removed. A full rebuild happens with `full=True`, when no manifest exists,
+    or when the embedding model or chunking settings changed.
+
+    New chunks go through an EmbeddingPipeline (batched, concurrent,
+    rate-limited, retried) and are written as each batch completes. Chunks
+    already present in the collection are skipped, so rerunning after an
+    interruption resumes instead of starting over.
+
+    Ingestion is streamed: files are hashed, read and split in `read_workers`
+    processes, a bounded window ahead of the embedding pipeline, which itself
+    only keeps a bounded number of batches in flight. Memory therefore stays
+    flat however large the corpus is.
+
+    A BM25 lexical index over the same chunks is written next to the store
+    for hybrid retrieval in doc_search_tool. With `vector_export` ("int8" or
+    "float16"), the embeddings are also exported as a memory-mapped matrix
+    for the server's VECTOR_BACKEND=mmap (see mmap_index.py).
+
+    The live index is never modified: each build works on a copy in
+    `persist_dir/staging` and is then published as a new version with an
+    atomic pointer swap (see index_versions.py). Running MCP servers pick it
+    up without a restart. Only the newest `keep_versions` versions are kept.
 
     Args:
         input_dir (str): Path to the directory containing documents.
         gemini_api_key (str): Google Gemini API key for embeddings.
+        full (bool): Start from an empty index and re-embed everything.
+        persist_dir (str): Root directory of the versioned index (the server's VECTOR_STORE_DIR).
+        collection_name (str): Chroma collection to write to.
+        embeddings (Embeddings): Embedding function to use instead of Gemini (e.g. a local fake).
+        batch_size (int): Chunks per embedding request.
+        max_concurrency (int): Embedding requests in flight at once.
+        requests_per_minute (float): Embedding request rate limit; None disables it.
+        keep_versions (int): Published versions to keep, including the new one.
+        read_workers (int): Processes reading and splitting files (1 reads in this process).
+        vector_export (str): Also write a memory-mapped "int8" or "float16" vector matrix; None skips it.
 
     Returns:
-        None
+        dict: Report of files added/updated/removed/unchanged/failed, chunks added/removed/kept,
+        and the published `version`.
     """
-    if gemini_api_key is None:
+    if embeddings is None and gemini_api_key is None:
         gemini_api_key = os.getenv("GEMINI_API_KEY")
         if not gemini_api_key:
             raise ValueError("GEMINI_API_KEY must be provided or set in environment variables.")
 
-    # Load documents
-    documents = []
-    folders = glob.glob(input_dir)
-    for folder in folders:
-        docs_loader = DirectoryLoader(
-            folder,
-            glob="**/*.txt",
-            loader_cls=TextLoader,
-            loader_kwargs={"encoding": "utf-8"}
+    settings = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "collection_name": collection_name,
+    }
+    # Build next to the live index, starting from a copy of it (or resuming an interrupted build)
+    root_dir = persist_dir
+    persist_dir = prepare_staging(root_dir, full=full)
+    manifest = None if full else IndexManifest.load(persist_dir, settings)
+    mode = "incremental" if manifest is not None else "full"
+    store_exists = bool(os.listdir(persist_dir))
+
+    # Create embeddings
+    if embeddings is None:
+        embeddings = GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            google_api_key=gemini_api_key
         )
-        docs_folder = docs_loader.load()
-        for doc in docs_folder:
-            file_name = os.path.basename(doc.metadata.get("source", ""))
-            doc.metadata["page_title"] = os.path.splitext(file_name)[0]
-            documents.append(doc)
+    vector_store = Chroma(
+        persist_directory=persist_dir,
+        embedding_function=embeddings,
+        collection_name=collection_name,
+        client_settings=Settings(anonymized_telemetry=False)
+    )
+    if manifest is None:
+        # Start from an empty collection. Resetting through the client (rather
+        # than deleting the directory) keeps Chroma's cached client valid.
+        if store_exists:
+            vector_store.reset_collection()
+            print(f"[INFO] Removed old vector store collection '{collection_name}' at {persist_dir}")
+        manifest = IndexManifest(settings)
 
-    print(f"[INFO] Loaded {len(documents)} documents")
+    report = {
+        "mode": mode,
+        "files_added": [], "files_updated": [], "files_removed": [], "files_unchanged": 0, "files_failed": [],
+        "chunks_added": 0, "chunks_resumed": 0, "chunks_removed": 0, "chunks_kept": 0,
+    }
+    print(f"[INFO] Scanning {input_dir} ({mode} build)")
 
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=100)
-    chunks = text_splitter.split_documents(documents)
+    # Files whose chunks are not all stored yet: chunk IDs still to write, and the manifest entry to record after
+    remaining: dict[str, int] = {}
+    file_entries: dict[str, dict] = {}
+    chunk_files: dict[str, str] = {}
+    seen: set[str] = set()
 
-    # Create embeddings
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-001",
-        google_api_key=gemini_api_key
+    def discovered():
+        for path in discover_files(input_dir):
+            seen.add(path)
+            entry = manifest.files.get(path)
+            yield path, entry["sha256"] if entry is not None else None
+
+    def chunks_to_embed():
+        """Stream (chunk id, chunk) pairs of new or changed files, as the reader processes produce them."""
+        for split in iter_split_files(discovered(), CHUNK_SIZE, CHUNK_OVERLAP, workers=read_workers):
+            path = split.path
+            entry = manifest.files.get(path)
+            if split.error is not None:
+                print(f"[WARN] Skipping {path}: {split.error}")
+                report["files_failed"].append(path)
+                continue
+            if split.chunks is None:
+                report["files_unchanged"] += 1
+                report["chunks_kept"] += len(entry["chunks"])
+                continue
+
+            ids = chunk_ids(path, [chunk.page_content for chunk in split.chunks])
+            old_ids = set(entry["chunks"]) if entry is not None else set()
+            new_ids = set(ids)
+            stale_ids = [chunk_id for chunk_id in old_ids if chunk_id not in new_ids]
+            if stale_ids:
+                vector_store.delete(ids=stale_ids)
+            new_chunks = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, split.chunks) if chunk_id not in old_ids]
+
+            report["files_updated" if entry is not None else "files_added"].append(path)
+            report["chunks_removed"] += len(stale_ids)
+            report["chunks_kept"] += len(ids) - len(new_chunks)
+
+            # A file is recorded in the manifest only once all of its chunks are stored,
+            # so an interrupted run resumes where it stopped
+            already_stored = existing_chunk_ids(vector_store, [chunk_id for chunk_id, _ in new_chunks])
+            todo = [(chunk_id, chunk) for chunk_id, chunk in new_chunks if chunk_id not in already_stored]
+            report["chunks_resumed"] += len(new_chunks) - len(todo)
+            if not todo:
+                manifest.files[path] = {"sha256": split.sha256, "chunks": ids}
+                manifest.save(persist_dir)
+                continue
+            file_entries[path] = {"sha256": split.sha256, "chunks": ids}
+            remaining[path] = len(todo)
+            chunk_files.update((chunk_id, path) for chunk_id, _ in todo)
+            yield from todo
+
+    def write_batch(ids: list[str], docs: list[Document], vectors: list[list[float]]):
+        vector_store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[doc.page_content for doc in docs],
+            metadatas=[doc.metadata for doc in docs],
+        )
+        report["chunks_added"] += len(ids)
+        finished = False
+        for chunk_id in ids:
+            path = chunk_files.pop(chunk_id)
+            remaining[path] -= 1
+            if remaining[path] == 0:
+                del remaining[path]
+                manifest.files[path] = file_entries.pop(path)
+                finished = True
+        if finished:
+            manifest.save(persist_dir)
+
+    # read/split processes -> chunk stream -> batched embedding -> writes, each stage bounded by the next
+    pipeline = EmbeddingPipeline(
+        embeddings,
+        write_batch,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
     )
+    stats = pipeline.run(chunks_to_embed())
+    if stats["chunks"]:
+        print(
+            f"[INFO] Embedded {stats['chunks']} chunks in {stats['batches']} batches, "
+            f"{stats['retries']} retries, {stats['chunks_per_second']:.1f} chunks/s"
+        )
 
-    ds_name = os.path.join("..", "shared_data", "vector_store")
+    # Drop chunks of files that no longer exist (unreadable files keep their previous chunks)
+    for path in sorted(set(manifest.files) - seen):
+        stale_ids = manifest.files.pop(path)["chunks"]
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+        report["files_removed"].append(path)
+        report["chunks_removed"] += len(stale_ids)
+    if report["files_removed"]:
+        manifest.save(persist_dir)
 
-    # Create the shared_data directory if it doesn't exist
-    os.makedirs(os.path.dirname(ds_name), exist_ok=True)
+    print(
+        f"[INFO] Files: {len(report['files_added'])} added, {len(report['files_updated'])} updated, "
+        f"{len(report['files_removed'])} removed, {report['files_unchanged']} unchanged, "
+        f"{len(report['files_failed'])} failed"
+    )
+    print(
+        f"[INFO] Chunks: {report['chunks_added']} embedded, {report['chunks_resumed']} resumed, "
+        f"{report['chunks_removed']} removed, {report['chunks_kept']} kept"
+    )
+    changed = report["files_added"] or report["files_updated"] or report["files_removed"] or report["chunks_added"]
+    # A requested export missing from the live version is published even when no document changed
+    changed = changed or (vector_export is not None and not has_mmap_index(persist_dir, vector_export))
+    if mode == "incremental" and not changed and current_version(root_dir) is not None:
+        # Nothing to publish: the live version is already up to date
+        release_chroma(vector_store)
+        shutil.rmtree(persist_dir)
+        report["version"] = current_version(root_dir)
+        print(f"[INFO] Index unchanged, version {report['version']} stays live")
+        return report
 
-    # Remove old vector store if it exists
-    if os.path.exists(ds_name):
-        import shutil
-        shutil.rmtree(ds_name)
-        print(f"[INFO] Removed old vector store at {ds_name}")
+    lexical_index = build_lexical_index(vector_store, persist_dir)
+    print(f"[INFO] Lexical index built with {len(lexical_index)} chunks and {len(lexical_index.postings)} terms")
+    if vector_export is not None:
+        rows = export_mmap_index(vector_store._collection, persist_dir, dtype=vector_export)
+        print(f"[INFO] Exported {rows} vectors as a memory-mapped {vector_export} matrix")
+    else:
+        # An export copied from the previous version would no longer match the collection
+        remove_mmap_index(persist_dir)
+    print(f"Vector store updated with {vector_store._collection.count()} chunks")
+    release_chroma(vector_store)
+    report["version"] = publish(root_dir, persist_dir, keep=keep_versions)
+    print(f"[INFO] Published index version {report['version']} in {root_dir}")
+    return report
 
-    # Create new vector store
-    vector_store = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=ds_name,
-        client_settings=Settings(anonymized_telemetry=False)
+
+def build_quiz_bank(
+    generator,
+    persist_dir: str = DEFAULT_VECTOR_STORE_DIR,
+    questions_per_chunk: int = 3,
+    min_chunk_chars: int = 300,
+    max_concurrency: int = 4,
+    requests_per_minute: float | None = 60,
+    max_retries: int = 3,
+) -> dict:
+    """
+    Generate and validate MCQs for every chunk of the published index that
+    has none yet, and store them in `persist_dir/quiz_bank.sqlite` (see
+    quiz_bank.py) for quiz_bank_tool to serve without a model turn.
+
+    Chunks come from the published version's lexical index, so no embedding
+    calls are made. Chunk IDs are content-addressed, so after an index
+    rebuild only new or changed chunks go to the generator; questions of
+    chunks that are no longer indexed are pruned. Chunks shorter than
+    `min_chunk_chars` are recorded without questions.
+
+    Generator calls run on `max_concurrency` threads, rate-limited and
+    retried with backoff; a chunk that still fails is left out and retried
+    on the next run. Writes happen on the calling thread.
+
+    Args:
+        generator: A quiz_generators generator (`name`, `generate(page_title, text, count)`).
+        persist_dir (str): Root directory of the versioned index (the server's VECTOR_STORE_DIR).
+        questions_per_chunk (int): Questions requested per chunk.
+        min_chunk_chars (int): Shorter chunks get no questions.
+        max_concurrency (int): Generator calls in flight at once.
+        requests_per_minute (float): Generator request rate limit; None disables it.
+        max_retries (int): Retries of a failing chunk before it is skipped.
+
+    Returns:
+        dict: Report of chunks generated/skipped/failed/pruned and questions added/total.
+    """
+    version, index_dir = resolve_index_dir(persist_dir)
+    lexical = LexicalIndex.load(index_dir)
+    if lexical is None:
+        raise ValueError(f"No lexical index in {index_dir}; run build_vector_store first")
+
+    bank = QuizBank(os.path.join(persist_dir, QUIZ_BANK_FILE))
+    report = {"version": version, "chunks_generated": 0, "chunks_skipped": 0, "chunks_failed": 0,
+              "chunks_pruned": bank.prune(set(lexical.ids)), "questions_added": 0}
+    done = bank.chunk_ids()
+    todo = [position for position, chunk_id in enumerate(lexical.ids) if chunk_id not in done]
+    print(f"[INFO] Quiz bank: {len(todo)} of {len(lexical)} chunks need questions (index version {version})")
+
+    def chunk_info(position: int) -> tuple[str, str, str | None]:
+        metadata = lexical.metadatas[position]
+        source = metadata.get("source")
+        return lexical.ids[position], metadata.get("page_title") or (os.path.basename(source) if source else "untitled"), source
+
+    rate_limiter = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+
+    def generate(position: int) -> list[dict]:
+        _, page_title, _ = chunk_info(position)
+        attempt = 0
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                return generator.generate(page_title, lexical.texts[position], questions_per_chunk)
+            except Exception:
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                time.sleep(min(30.0, 2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+
+    start = time.perf_counter()
+    pending = iter(todo)
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="quiz") as executor:
+        in_flight: dict[Future, int] = {}
+
+        def submit_next() -> bool:
+            for position in pending:
+                if len(lexical.texts[position]) >= min_chunk_chars:
+                    in_flight[executor.submit(generate, position)] = position
+                    return True
+                chunk_id, page_title, source = chunk_info(position)
+                bank.add(chunk_id, page_title, source, [], generator.name)
+                report["chunks_skipped"] += 1
+            return False
+
+        while len(in_flight) < max_concurrency * 2 and submit_next():
+            pass
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                position = in_flight.pop(future)
+                chunk_id, page_title, source = chunk_info(position)
+                try:
+                    questions = validate_questions(future.result(), lexical.texts[position])
+                except Exception as e:
+                    print(f"[WARN] Quiz generation failed for {page_title} ({chunk_id[:12]}): {e}")
+                    report["chunks_failed"] += 1
+                else:
+                    bank.add(chunk_id, page_title, source, questions[:questions_per_chunk], generator.name)
+                    report["chunks_generated"] += 1
+                    report["questions_added"] += len(questions[:questions_per_chunk])
+                submit_next()
+
+    report["questions_total"] = len(bank)
+    bank.close()
+    print(
+        f"[INFO] Quiz bank: {report['questions_added']} questions added for {report['chunks_generated']} chunks "
+        f"in {time.perf_counter() - start:.1f}s, {report['chunks_skipped']} skipped, {report['chunks_failed']} failed, "
+        f"{report['chunks_pruned']} pruned; {report['questions_total']} questions in total"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or incrementally update the knowledge-base vector store.")
+    parser.add_argument("--input-dir", default="knowledge-base/")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch and re-embed every document")
+    parser.add_argument("--persist-dir", default=DEFAULT_VECTOR_STORE_DIR, help="Versioned index root (the server's VECTOR_STORE_DIR)")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--keep-versions", type=int, default=2, help="Published index versions to keep")
+    parser.add_argument("--batch-size", type=int, default=100, help="Chunks per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight at once")
+    parser.add_argument("--rpm", type=float, default=100, help="Embedding requests per minute (0 = unlimited)")
+    parser.add_argument("--read-workers", type=int, default=min(4, os.cpu_count() or 1), help="Processes reading and splitting files")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use deterministic local embeddings (offline benchmarks)")
+    parser.add_argument("--vector-export", choices=("int8", "float16"), help="Also export a memory-mapped vector matrix (VECTOR_BACKEND=mmap)")
+    parser.add_argument("--quiz-bank", action="store_true", help="Also generate MCQs for new chunks into the quiz bank")
+    parser.add_argument("--quiz-generator", choices=("gemini", "cloze"), default="gemini", help="Quiz bank generator; cloze needs no model")
+    parser.add_argument("--questions-per-chunk", type=int, default=3)
+    args = parser.parse_args()
+    embeddings = None
+    if args.fake_embeddings:
+        from fake_embeddings import FakeEmbeddings
+        embeddings = FakeEmbeddings()
+    build_vector_store(
+        input_dir=args.input_dir,
+        full=args.full,
+        persist_dir=args.persist_dir,
+        collection_name=args.collection,
+        keep_versions=args.keep_versions,
+        read_workers=args.read_workers,
+        vector_export=args.vector_export,
+        batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm or None,
+        embeddings=embeddings,
     )
-    print(f"Vector store created with {vector_store._collection.count()} chunks")
+    if args.quiz_bank:
+        from quiz_generators import ClozeQuizGenerator, GeminiQuizGenerator
+        if args.quiz_generator == "cloze":
+            generator, quiz_rpm = ClozeQuizGenerator(), None
+        else:
+            generator, quiz_rpm = GeminiQuizGenerator(os.getenv("GEMINI_API_KEY")), 60
+        build_quiz_bank(
+            generator,
+            persist_dir=args.persist_dir,
+            questions_per_chunk=args.questions_per_chunk,
+            requests_per_minute=quiz_rpm,
+        )
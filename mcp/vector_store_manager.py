@@ -0,0 +1,413 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from embedding_cache import embed_query_batch
+from index_versions import release_chroma, resolve_index_dir
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from server_metrics import Counter, timed
+
+T = TypeVar("T")
+
+DOC_SEARCH_REQUESTS = Counter(
+    "mcp_doc_search_requests_total",
+    "doc_search_tool searches, by retrieval path (vector, hybrid, lexical_fast, lexical, failed).",
+    labelnames=("path",),
+)
+
+INDEX_RELOADS = Counter(
+    "mcp_index_reloads_total",
+    "Switches to a newly published index version, by result (ok, error).",
+    labelnames=("result",),
+)
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+VECTOR_BACKENDS = ("chroma", "mmap")
+
+
+# ======================
+# One published index version
+# ======================
+class IndexHandle:
+    """
+    The vector index and BM25 index of one index version, opened once.
+    `in_flight` counts searches using it, so a retired handle is only closed
+    after the last search that started on it has finished.
+
+    With the "mmap" backend, vectors are searched in the memory-mapped
+    export (see mmap_index.py) and Chroma is never opened; a version without
+    an export falls back to Chroma. Chroma and NumPy are imported here, on
+    first open, rather than when the server module is imported.
+    """
+
+    def __init__(
+        self,
+        version: str | None,
+        directory: str,
+        collection_name: str,
+        embeddings: Embeddings,
+        backend: str = "chroma",
+        rerank: bool = True,
+    ):
+        self.version = version
+        self.directory = directory
+        self.store = None
+        self.vectors = None
+        if backend == "mmap":
+            from mmap_index import MmapVectorIndex
+
+            self.vectors = MmapVectorIndex.load(directory, rerank=rerank)
+            if self.vectors is None:
+                logging.warning(f"No memory-mapped vector export in {directory}, searching Chroma instead")
+        if self.vectors is None:
+            from chromadb.config import Settings
+            from langchain_chroma import Chroma
+
+            self.store = Chroma(
+                persist_directory=directory,
+                embedding_function=embeddings,
+                collection_name=collection_name,
+                client_settings=Settings(anonymized_telemetry=False),
+            )
+        self.lexical = LexicalIndex.load(directory)
+        if self.lexical is None:
+            logging.warning(f"No lexical index in {directory}, hybrid search falls back to vector")
+        self.in_flight = 0
+        self.retired = False
+
+    def warm_up(self) -> int:
+        """Page the index in with one search; the query vector comes from the collection itself."""
+        if self.vectors is not None:
+            return self.vectors.warm_up()
+        collection = self.store._collection
+        count = collection.count()
+        if count:
+            sample = collection.peek(1)
+            embeddings = sample.get("embeddings")
+            if embeddings is not None and len(embeddings):
+                self.store.similarity_search_by_vector(list(embeddings[0]), k=1)
+        return count
+
+    def search_by_vector(self, vector: list[float], k: int) -> list[Document]:
+        if self.vectors is not None:
+            return self.vectors.search_documents(vector, k)
+        return self.store.similarity_search_by_vector(vector, k=k)
+
+    def close(self):
+        if self.vectors is not None:
+            self.vectors.close()
+        if self.store is not None:
+            release_chroma(self.store)
+
+
+# ======================
+# Process-wide, hot-swappable index handle
+# ======================
+class VectorStoreManager:
+    """
+    Opens the persistent Chroma collection once and serves every search from
+    the same handle, instead of reopening the SQLite/HNSW files per tool call.
+    The BM25 index written next to the collection is loaded alongside it.
+
+    `persist_dir` is the root of a versioned index (see index_versions.py).
+    At most every `reload_interval` seconds a search checks which version is
+    published; a new one is opened and warmed up in a background thread while
+    searches keep using the old one, then swapped in. Searches already running
+    finish on the version they started with, which is closed afterwards.
+
+    `backend="mmap"` serves vector searches from the memory-mapped export
+    instead of Chroma (see mmap_index.py), optionally re-ranked in float32.
+    """
+
+    def __init__(
+        self,
+        persist_dir: str,
+        collection_name: str,
+        embeddings: Embeddings,
+        fetch_k: int = 10,
+        rrf_k: int = 60,
+        lexical_fast_path: bool = True,
+        max_workers: int = 4,
+        reload_interval: float = 5.0,
+        backend: str = "chroma",
+        rerank: bool = True,
+    ):
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend '{backend}', expected one of {VECTOR_BACKENDS}")
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.lexical_fast_path = lexical_fast_path
+        self.reload_interval = reload_interval
+        self.backend = backend
+        self.rerank = rerank
+        self._handle: IndexHandle | None = None
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._reloading = False
+        # Embedding calls and Chroma queries block, so they run here instead of on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="doc-search")
+
+    @property
+    def version(self) -> str | None:
+        handle = self._handle
+        return handle.version if handle is not None else None
+
+    def current_version(self) -> str | None:
+        """Version searches are served from now, after checking for a newly published one."""
+        return self._current().version
+
+    async def acurrent_version(self) -> str | None:
+        """`current_version` on the executor; the first call may open the index."""
+        return await self.arun(self.current_version)
+
+    async def arun(self, function: Callable[..., T], *args) -> T:
+        """Run a blocking call next to the index (e.g. a quiz bank query) on the search executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _open(self, version: str | None, directory: str) -> IndexHandle:
+        return IndexHandle(
+            version, directory, self.collection_name, self.embeddings, backend=self.backend, rerank=self.rerank,
+        )
+
+    def _current(self) -> IndexHandle:
+        handle = self._handle
+        if handle is None:
+            with self._lock:
+                if self._handle is None:
+                    version, directory = resolve_index_dir(self.persist_dir)
+                    self._handle = self._open(version, directory)
+                    self._checked_at = time.monotonic()
+                handle = self._handle
+        elif time.monotonic() - self._checked_at >= self.reload_interval:
+            self._check_for_new_version(handle)
+        return handle
+
+    def _check_for_new_version(self, handle: IndexHandle):
+        with self._lock:
+            if self._reloading or time.monotonic() - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = time.monotonic()
+            version, directory = resolve_index_dir(self.persist_dir)
+            if version is None or version == handle.version:
+                return
+            self._reloading = True
+        threading.Thread(target=self._load_version, args=(version, directory), name="index-reload", daemon=True).start()
+
+    def _load_version(self, version: str, directory: str):
+        start = time.perf_counter()
+        try:
+            handle = self._open(version, directory)
+            count = handle.warm_up()
+        except Exception as e:
+            with self._lock:
+                self._reloading = False
+            INDEX_RELOADS.inc(result="error")
+            logging.error(f"Loading index version {version} failed, still serving {self.version}: {str(e)}")
+            return
+
+        with self._lock:
+            old, self._handle = self._handle, handle
+            self._reloading = False
+            old.retired = True
+            close_old = old.in_flight == 0
+        if close_old:
+            old.close()
+        INDEX_RELOADS.inc(result="ok")
+        logging.info(
+            f"Switched from index version {old.version} to {version} ({count} chunks) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+
+    def acquire(self) -> IndexHandle:
+        """The current index, pinned until `release()` so a swap cannot close it mid-search."""
+        while True:
+            handle = self._current()
+            with self._lock:
+                if not handle.retired:
+                    handle.in_flight += 1
+                    return handle
+
+    def release(self, handle: IndexHandle):
+        with self._lock:
+            handle.in_flight -= 1
+            close = handle.retired and handle.in_flight == 0
+        if close:
+            handle.close()
+
+    def search(self, query: str, k: int = 3, mode: str = "hybrid") -> list[Document]:
+        """
+        Search the knowledge base.
+
+        Modes:
+            vector: embedding similarity only.
+            lexical: BM25 only; never calls the embedding API.
+            hybrid: reciprocal rank fusion of BM25 and vector rankings. When
+                the query is an exact-term lookup that BM25 answers with high
+                confidence, the embedding call is skipped entirely.
+        """
+        index = self.acquire()
+        try:
+            lexical_docs, answered = self._lexical_candidates(index, query, k, mode)
+            if answered:
+                return lexical_docs[:k]
+            try:
+                vector_docs = self._vector_search(index, query, self._fetch_k(lexical_docs, k))
+            except Exception as e:
+                return self._vector_failed(lexical_docs, k, e)
+            return self._combine(lexical_docs, vector_docs, k)
+        finally:
+            self.release(index)
+
+    async def asearch(self, query: str, k: int = 3, mode: str = "hybrid") -> list[Document]:
+        """`search` on the bounded executor, so the event loop keeps serving other tool calls."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.search, query, k, mode)
+
+    async def asearch_batch(self, queries: list[str], k: int = 3, mode: str = "hybrid") -> list[list[Document]]:
+        """
+        Search several queries at once: every query that needs a vector search
+        is embedded in a single batched request, then the Chroma searches run
+        concurrently on the executor.
+        """
+        loop = asyncio.get_running_loop()
+        # acquire() may resolve or open the index, and release() may close a retired one: both touch disk
+        acquiring = loop.run_in_executor(self._executor, self.acquire)
+        try:
+            index = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The pin still lands if acquire() completes; drop it then
+            acquiring.add_done_callback(self._release_acquired)
+            raise
+        try:
+            return await self._asearch_batch(index, queries, k, mode)
+        finally:
+            await loop.run_in_executor(self._executor, self.release, index)
+
+    def _release_acquired(self, acquiring: asyncio.Future):
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.release(acquiring.result())
+
+    async def _asearch_batch(self, index: IndexHandle, queries: list[str], k: int, mode: str) -> list[list[Document]]:
+        loop = asyncio.get_running_loop()
+
+        def run(function, *args):
+            return loop.run_in_executor(self._executor, function, *args)
+
+        candidates = await asyncio.gather(*(run(self._lexical_candidates, index, query, k, mode) for query in queries))
+        results: list[list[Document] | None] = [docs[:k] if answered else None for docs, answered in candidates]
+        pending = [i for i, (_, answered) in enumerate(candidates) if not answered]
+        if not pending:
+            return results
+
+        try:
+            vectors = await run(self._embed_queries, [queries[i] for i in pending])
+        except Exception as e:
+            for i in pending:
+                results[i] = self._batch_vector_failed(queries[i], candidates[i][0], k, e)
+            return results
+
+        searches = await asyncio.gather(
+            *(run(self._search_by_vector, index, vector, self._fetch_k(candidates[i][0], k)) for i, vector in zip(pending, vectors)),
+            return_exceptions=True,
+        )
+        for i, vector_docs in zip(pending, searches):
+            lexical_docs = candidates[i][0]
+            if isinstance(vector_docs, Exception):
+                results[i] = self._batch_vector_failed(queries[i], lexical_docs, k, vector_docs)
+            else:
+                results[i] = self._combine(lexical_docs, vector_docs, k)
+        return results
+
+    def _lexical_candidates(self, index: IndexHandle, query: str, k: int, mode: str) -> tuple[list[Document] | None, bool]:
+        """
+        BM25 candidates for the query (None without a lexical index or in
+        vector mode), and whether they already answer it without a vector search.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        lexical = index.lexical if mode != "vector" else None
+        if lexical is None:
+            return None, False
+
+        with timed("lexical_search"):
+            lexical_hits = lexical.search(query, k=max(k, self.fetch_k))
+        lexical_docs = [lexical.document(position) for position, _ in lexical_hits]
+        if mode == "lexical":
+            DOC_SEARCH_REQUESTS.inc(path="lexical")
+            return lexical_docs, True
+        if self.lexical_fast_path and lexical.is_confident(query, lexical_hits):
+            DOC_SEARCH_REQUESTS.inc(path="lexical_fast")
+            return lexical_docs, True
+        return lexical_docs, False
+
+    def _fetch_k(self, lexical_docs: list[Document] | None, k: int) -> int:
+        return k if lexical_docs is None else max(k, self.fetch_k)
+
+    def _combine(self, lexical_docs: list[Document] | None, vector_docs: list[Document], k: int) -> list[Document]:
+        if lexical_docs is None:
+            DOC_SEARCH_REQUESTS.inc(path="vector")
+            return vector_docs[:k]
+        DOC_SEARCH_REQUESTS.inc(path="hybrid")
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], k=self.rrf_k)[:k]
+
+    def _vector_failed(self, lexical_docs: list[Document] | None, k: int, error: Exception) -> list[Document]:
+        if not lexical_docs:
+            raise error
+        logging.warning(f"Vector search failed, serving lexical results: {str(error)}")
+        DOC_SEARCH_REQUESTS.inc(path="lexical")
+        return lexical_docs[:k]
+
+    def _batch_vector_failed(
+        self, query: str, lexical_docs: list[Document] | None, k: int, error: Exception,
+    ) -> list[Document]:
+        # One failed query must not cost the rest of the batch their results
+        try:
+            return self._vector_failed(lexical_docs, k, error)
+        except Exception:
+            logging.error(f"Vector search failed for batch query '{query}', returning no results: {str(error)}")
+            DOC_SEARCH_REQUESTS.inc(path="failed")
+            return []
+
+    def _vector_search(self, index: IndexHandle, query: str, k: int) -> list[Document]:
+        # Embedding and Chroma are timed separately to tell API latency from index latency
+        with timed("embedding"):
+            vector = self.embeddings.embed_query(query)
+        return self._search_by_vector(index, vector, k)
+
+    def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        with timed("embedding"):
+            if embed_queries is not None:
+                return embed_queries(queries)
+            return embed_query_batch(self.embeddings, queries)
+
+    def _search_by_vector(self, index: IndexHandle, vector: list[float], k: int) -> list[Document]:
+        with timed("chroma_search" if index.vectors is None else "mmap_search"):
+            return index.search_by_vector(vector, k)
+
+    def warm_up(self):
+        """
+        Open the published index and run one search so it is paged in
+        before the first real request. The query vector is taken from the
+        collection itself, so no embedding call is made.
+        """
+        start = time.perf_counter()
+        index = self.acquire()
+        try:
+            count = index.warm_up()
+        finally:
+            self.release(index)
+        logging.info(
+            f"Vector store '{self.collection_name}' version {index.version} warmed up with {count} chunks "
+            f"({len(index.lexical) if index.lexical is not None else 0} in the lexical index) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
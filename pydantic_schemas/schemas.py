@@ -8,6 +8,12 @@ class ChatRequest(BaseModel):
     session_id: str
 
 
+class BatchChatRequest(BaseModel):
+    """Independent questions answered without conversation history, e.g. material for a whole syllabus."""
+    queries: List[str] = Field(..., min_length=1, description="Questions to answer; identical ones run once")
+    max_concurrency: Union[int, None] = Field(None, ge=1, description="Lower the server's per-job concurrency")
+
+
 # Enum for part type
 class PartType(str, Enum):
     """Type of part in the agent response."""
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import uuid
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from chat_agents.admission import AdmissionRejectedError
+from chat_agents.agent import run_agent
+from chat_agents.timing import span
+from pydantic_schemas.schemas import BatchChatRequest
+
+router = APIRouter()
+
+# A batch query rejected by admission control waits for its Retry-After hint this many times before failing
+ADMISSION_ATTEMPTS = 5
+
+
+async def run_batch_query(app: FastAPI, query: str) -> dict:
+    """
+    One batch query: a /chat turn without history, so its answer can come
+    from (and goes into) the response cache. It waits for an admission slot
+    like any request, and backs off instead of failing when the server is
+    busy with interactive chats.
+    """
+    state = app.state
+    for attempt in range(ADMISSION_ATTEMPTS):
+        try:
+            with span("total"):
+                # Own admission key: batch queries are independent, not turns of one session
+                async with state.admission.admit(f"batch:{uuid.uuid4().hex}"):
+                    async with state.mcp_pool.acquire() as mcp_server:
+                        agent = await state.agent_cache.get_agent(mcp_server)
+                        cache_key = None
+                        if state.response_cache is not None and state.agent_cache.prompt_version is not None:
+                            with span("response_cache"):
+                                cache_key = await state.response_cache.key_for(
+                                    query, None, state.agent_cache.prompt_version, mcp_server,
+                                )
+                                cached = await state.response_cache.get(cache_key) if cache_key is not None else None
+                            if cached is not None:
+                                return cached
+                        result = await run_agent(agent, query=query)
+                        if cache_key is not None:
+                            await state.response_cache.put(cache_key, result)
+                        return result
+        except AdmissionRejectedError as e:
+            if attempt == ADMISSION_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+def ndjson(events) -> StreamingResponse:
+    async def lines():
+        async for event in events:
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def not_found(job_id: str) -> JSONResponse:
+    return JSONResponse({"error": f"Unknown or expired batch job '{job_id}'"}, status_code=404)
+
+
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """
+    Submit a batch and stream its results as newline-delimited JSON: a `job`
+    event (keep its job_id), one `result` event per distinct query as it
+    finishes (`positions` are its indices in `queries`), then `done`. The job
+    keeps running if the client disconnects; resume from the last `seq` seen
+    with GET /chat/batch/jobs/{job_id}/stream?after=<seq>.
+    """
+    batch_jobs = http_request.app.state.batch_jobs
+    try:
+        job = await batch_jobs.submit(request.queries, request.max_concurrency)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return ndjson(batch_jobs.events(job["job_id"]))
+
+
+@router.post("/chat/batch/jobs")
+async def create_batch_job(request: BatchChatRequest, http_request: Request):
+    """Submit a batch without waiting for it; poll or stream it by job_id."""
+    try:
+        job = await http_request.app.state.batch_jobs.submit(request.queries, request.max_concurrency)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(job, status_code=202)
+
+
+@router.get("/chat/batch/jobs/{job_id}")
+async def get_batch_job(job_id: str, http_request: Request, after: int = 0):
+    """Job status plus the results with seq > `after`; pass the last seq seen to page through them."""
+    batch_jobs = http_request.app.state.batch_jobs
+    job = await batch_jobs.status(job_id)
+    if job is None:
+        return not_found(job_id)
+    job["results"] = await batch_jobs.store.results_after(job_id, after)
+    return JSONResponse(job)
+
+
+@router.get("/chat/batch/jobs/{job_id}/stream")
+async def stream_batch_job(job_id: str, http_request: Request, after: int = 0):
+    batch_jobs = http_request.app.state.batch_jobs
+    if await batch_jobs.status(job_id) is None:
+        return not_found(job_id)
+    return ndjson(batch_jobs.events(job_id, after))
+
+
+@router.post("/chat/batch/jobs/{job_id}/resume")
+async def resume_batch_job(job_id: str, http_request: Request, max_concurrency: int | None = None):
+    """Run the unfinished queries of an interrupted job (its worker stopped) in this worker."""
+    try:
+        job = await http_request.app.state.batch_jobs.resume(job_id, max_concurrency)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    if job is None:
+        return not_found(job_id)
+    return JSONResponse(job, status_code=202)
@@ -1,42 +1,122 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi import Body
-from agents.mcp import MCPServerStreamableHttp
-from agents import SQLiteSession
-from chat_agents.agent import create_study_agent, run_agent
-from config.settings import MCP_SERVER_URL
+from agents.mcp import MCPServer
+from chat_agents.admission import AdmissionRejectedError
+from chat_agents.agent import run_agent, run_agent_streamed
+from chat_agents.mcp_pool import MCPPoolUnavailableError
+from chat_agents.response_cache import CacheKey, record_cached_turn
+from chat_agents.timing import span
 from pydantic_schemas.schemas import ChatRequest  # import your Pydantic model
 
 router = APIRouter()
 
+
+def too_busy(error: AdmissionRejectedError) -> JSONResponse:
+    return JSONResponse({"error": str(error)}, status_code=429, headers={"Retry-After": str(error.retry_after)})
+
+
+async def get_instructions(mcp_server: MCPServer, prompt_name: str = "prompt-v1") -> str:
+    with span("get_prompt"):
+        prompt_result = await mcp_server.get_prompt(prompt_name)
+    # Extract the actual prompt text from the GetPromptResult object
+    if prompt_result.messages and len(prompt_result.messages) > 0:
+        # Get the first message's content
+        first_message = prompt_result.messages[0]
+        if hasattr(first_message.content, 'text'):
+            return first_message.content.text
+        elif isinstance(first_message.content, str):
+            return first_message.content
+        else:
+            return str(first_message.content)
+    return "No prompt text found"
+
+
+async def cached_response(http_request: Request, query: str, session, mcp_server: MCPServer) -> tuple[CacheKey | None, dict | None]:
+    """(cache key, cached AgentResponse); the key is None when the cache is off or the query depends on history."""
+    response_cache = http_request.app.state.response_cache
+    prompt_version = http_request.app.state.agent_cache.prompt_version
+    if response_cache is None or prompt_version is None:
+        return None, None
+    with span("response_cache"):
+        key = await response_cache.key_for(query, session, prompt_version, mcp_server)
+        if key is None:
+            return None, None
+        response = await response_cache.get(key)
+        if response is not None:
+            await record_cached_turn(session, query, response)
+    return key, response
+
+
 @router.post("/chat")
-async def chat(request: ChatRequest):
-    session = SQLiteSession(request.session_id)
-
-    async with MCPServerStreamableHttp(
-        name="StudyMode StreamableHttp Server",
-        params={"url": MCP_SERVER_URL},
-        cache_tools_list=True
-    ) as mcp_server:
+async def chat(request: ChatRequest, http_request: Request):
+    session = http_request.app.state.history.session(request.session_id)
+    mcp_pool = http_request.app.state.mcp_pool
+    agent_cache = http_request.app.state.agent_cache
+    admission = http_request.app.state.admission
+
+    try:
+        with span("total"):
+            # Waits for a global slot and for earlier turns of this session; 429 when overloaded
+            async with admission.admit(request.session_id):
+                async with mcp_pool.acquire() as mcp_server:
+                    # Cached prompt and agent; only rebuilt when the prompt changes
+                    agent = await agent_cache.get_agent(mcp_server)
+                    # Repeated opening questions are answered from the response cache, if enabled
+                    cache_key, result = await cached_response(http_request, request.query, session, mcp_server)
+                    if result is None:
+                        result = await run_agent(agent,query=request.query, session=session)
+                        if cache_key is not None:
+                            await http_request.app.state.response_cache.put(cache_key, result)
+        return JSONResponse(result)
+    except AdmissionRejectedError as e:
+        return too_busy(e)
+    except MCPPoolUnavailableError as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream the agent run as newline-delimited JSON events, ending with the full AgentResponse."""
+    session = http_request.app.state.history.session(request.session_id)
+    mcp_pool = http_request.app.state.mcp_pool
+    agent_cache = http_request.app.state.agent_cache
+    admission = http_request.app.state.admission
+    # Reject before the stream starts if the queue is already full; a later
+    # rejection (queue timeout) arrives as an error event with retry_after
+    try:
+        admission.check()
+    except AdmissionRejectedError as e:
+        return too_busy(e)
+
+    async def events():
+        # Flush headers and a first byte before any MCP or model work starts
+        yield json.dumps({"type": "start", "session_id": request.session_id}) + "\n"
         try:
-            prompt_result = await mcp_server.get_prompt("prompt-v1")
-        # print("prompt_result", prompt_result)
-        # Extract the actual prompt text from the GetPromptResult object
-            if prompt_result.messages and len(prompt_result.messages) > 0:
-            # Get the first message's content
-                first_message = prompt_result.messages[0]
-                if hasattr(first_message.content, 'text'):
-                    instruction_text = first_message.content.text
-                elif isinstance(first_message.content, str):
-                    instruction_text = first_message.content
-                else:
-                    instruction_text = str(first_message.content)
-            else:
-                instruction_text = "No prompt text found"
-       
-            # Create agent
-            agent = create_study_agent(instructions=instruction_text, mcp_server=mcp_server, session=session)
-            result = await run_agent(agent,query=request.query, session=session)
-            return JSONResponse(result)
+            with span("total"):
+                async with admission.admit(request.session_id):
+                    async with mcp_pool.acquire() as mcp_server:
+                        agent = await agent_cache.get_agent(mcp_server)
+                        cache_key, cached = await cached_response(http_request, request.query, session, mcp_server)
+                        if cached is not None:
+                            for part in cached["parts"]:
+                                yield json.dumps({"type": "part", "part": part}) + "\n"
+                            yield json.dumps({"type": "response", "response": cached}) + "\n"
+                            return
+                        async for event in run_agent_streamed(agent, query=request.query, session=session):
+                            if event["type"] == "response" and cache_key is not None:
+                                await http_request.app.state.response_cache.put(cache_key, event["response"])
+                            yield json.dumps(event) + "\n"
+        except AdmissionRejectedError as e:
+            yield json.dumps({"type": "error", "error": str(e), "retry_after": e.retry_after}) + "\n"
         except Exception as e:
-            return JSONResponse({"error": str(e)}, status_code=500)
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get("/health")
+def health():
+    """Liveness: the process is up and serving requests, whatever its dependencies are doing."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """
+    Readiness: 200 once requests can be answered, 503 until then. Load
+    balancers and rolling deploys should route on this, not on /health.
+    """
+    state = request.app.state
+    checks = {"mcp_pool": {"healthy_connections": state.mcp_pool.healthy_count}}
+    is_ready = state.mcp_pool.healthy_count > 0
+    # With MCP_TRANSPORT=inprocess the index and embeddings warm up in this process too
+    mcp_readiness = getattr(state, "mcp_readiness", None)
+    if mcp_readiness is not None:
+        checks["mcp_server"] = mcp_readiness.status()
+        is_ready = is_ready and mcp_readiness.ready
+    status = {"ready": is_ready, "checks": checks}
+    return JSONResponse(status, status_code=200 if is_ready else 503)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from chat_agents.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics(request: Request):
+    text = render_metrics()
+    # With MCP_TRANSPORT=inprocess the MCP server's own metrics live in this process too
+    mcp_metrics = getattr(request.app.state, "mcp_metrics", None)
+    if mcp_metrics is not None:
+        text += mcp_metrics()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
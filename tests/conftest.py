@@ -0,0 +1,21 @@
+import asyncio
+import os
+import sys
+
+# config/settings.py refuses to import without a key; tests never call the model
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def run(coro):
+    """Run a coroutine to completion on a fresh event loop."""
+    return asyncio.run(coro)
+
+# The MCP server's modules use top-level imports of each other (embedding_cache, mmap_index, ...).
+# Appended, not prepended, so they never shadow the app's modules or the installed `mcp` package.
+MCP_DIR = os.path.join(ROOT, "mcp")
+if MCP_DIR not in sys.path:
+    sys.path.append(MCP_DIR)
@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from chat_agents.admission import AdmissionController, AdmissionRejectedError
+from tests.conftest import run
+
+
+async def hold(controller: AdmissionController, session_id: str, entered: asyncio.Event, release: asyncio.Event):
+    async with controller.admit(session_id):
+        entered.set()
+        await release.wait()
+
+
+def assert_idle(controller: AdmissionController):
+    assert controller.in_flight == 0
+    assert controller.waiting == 0
+    assert controller._sessions == {}
+
+
+def test_concurrency_is_capped():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2, max_queue=10)
+        running = peak = 0
+
+        async def request(i):
+            nonlocal running, peak
+            async with controller.admit(f"session-{i}"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(request(i) for i in range(6)))
+        assert peak == 2
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        entered, release = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", entered, release))
+        await entered.wait()
+        queued = asyncio.create_task(hold(controller, "b", asyncio.Event(), release))
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("c"):
+                raise AssertionError("should not be admitted")
+        assert rejected.value.retry_after >= 1
+        with pytest.raises(AdmissionRejectedError):
+            controller.check()
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_queue_timeout_rejects_and_leaks_nothing():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.05)
+        entered, release = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", entered, release))
+        await entered.wait()
+
+        with pytest.raises(AdmissionRejectedError, match="Timed out"):
+            async with controller.admit("b"):
+                raise AssertionError("should not be admitted")
+        assert controller.waiting == 0
+        assert "b" not in controller._sessions
+
+        release.set()
+        await running
+        # The slot and session locks were all given back
+        async with controller.admit("b"):
+            assert controller.in_flight == 1
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_same_session_runs_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queue=10)
+        order, active = [], []
+
+        async def turn(i):
+            async with controller.admit("same"):
+                active.append(i)
+                assert len(active) == 1, "turns of one session overlapped"
+                order.append(i)
+                await asyncio.sleep(0.01)
+                active.remove(i)
+
+        tasks = []
+        for i in range(4):
+            tasks.append(asyncio.create_task(turn(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3]
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_waiting_on_own_session_does_not_hold_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2, max_queue=10)
+        entered, release = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(hold(controller, "a", entered, release))
+        await entered.wait()
+        second = asyncio.create_task(hold(controller, "a", asyncio.Event(), release))
+        await asyncio.sleep(0)
+
+        # Session "a" has a turn running and one queued; "b" still gets the free slot
+        other_entered = asyncio.Event()
+        other = asyncio.create_task(hold(controller, "b", other_entered, asyncio.Event()))
+        await asyncio.wait_for(other_entered.wait(), timeout=1)
+        other.cancel()
+        release.set()
+        await asyncio.gather(first, second, other, return_exceptions=True)
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_cancelled_waiters_release_their_place():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=10)
+        entered, release = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", entered, release))
+        await entered.wait()
+        # One waiter holds the lock of session "b" and waits for the slot, one waits behind it
+        waiting_for_slot = asyncio.create_task(hold(controller, "b", asyncio.Event(), release))
+        waiting_for_session = asyncio.create_task(hold(controller, "b", asyncio.Event(), release))
+        await asyncio.sleep(0.01)
+        assert controller.waiting == 2
+
+        waiting_for_slot.cancel()
+        waiting_for_session.cancel()
+        await asyncio.gather(waiting_for_slot, waiting_for_session, return_exceptions=True)
+        assert controller.waiting == 0
+        assert "b" not in controller._sessions
+
+        release.set()
+        await running
+        async with controller.admit("b"):
+            pass
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_errors_in_the_body_release_the_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        with pytest.raises(ValueError):
+            async with controller.admit("a"):
+                raise ValueError("boom")
+        assert_idle(controller)
+        async with controller.admit("a"):
+            pass
+
+    run(scenario())
+
+
+def test_retry_after_follows_backlog_and_duration():
+    controller = AdmissionController(max_concurrent=2, max_queue=10)
+    controller._average_seconds = 3.0
+    controller.in_flight, controller.waiting = 2, 4
+    assert controller.retry_after() == 9
+    controller._average_seconds = 100.0
+    assert controller.retry_after() == 60
+    controller._average_seconds = 0.01
+    assert controller.retry_after() == 1
+
+
+def test_max_concurrent_must_be_positive():
+    with pytest.raises(ValueError):
+        AdmissionController(max_concurrent=0)
+
+
+def test_timeouts_racing_with_grants_leak_nothing():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2, max_queue=500, queue_timeout=0.002)
+
+        async def request(i):
+            try:
+                async with controller.admit(f"session-{i % 7}"):
+                    await asyncio.sleep(0.001)
+            except AdmissionRejectedError:
+                pass
+
+        for _ in range(5):
+            await asyncio.gather(*(request(i) for i in range(200)))
+        assert_idle(controller)
+        assert controller._slots._value == 2
+        # Every session lock is free again
+        await asyncio.wait_for(asyncio.gather(*(request(i) for i in range(7))), timeout=1)
+
+    run(scenario())
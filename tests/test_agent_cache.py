@@ -0,0 +1,71 @@
+import gc
+import weakref
+
+from chat_agents.agent_cache import StudyAgentCache
+from tests.conftest import run
+
+
+class FakeServer:
+    pass
+
+
+class FakeAgent:
+    def __init__(self, instructions, mcp_server):
+        self.instructions = instructions
+        # Like agents.Agent(mcp_servers=[...]): the agent keeps its connection alive
+        self.mcp_servers = [mcp_server]
+
+
+def make_cache(pool):
+    async def fetch_instructions(mcp_server, prompt_name):
+        return "You are StudyMode."
+
+    return StudyAgentCache(fetch_instructions, FakeAgent, generation=lambda: pool["generation"])
+
+
+def test_agent_is_reused_per_connection():
+    pool = {"generation": 1}
+    cache = make_cache(pool)
+    server = FakeServer()
+
+    async def scenario():
+        first = await cache.get_agent(server)
+        assert await cache.get_agent(server) is first
+        assert await cache.get_agent(FakeServer()) is not first
+
+    run(scenario())
+    assert cache.prompt_version.startswith("prompt-v1:")
+
+
+def test_agents_of_replaced_connections_are_released():
+    pool = {"generation": 1}
+    cache = make_cache(pool)
+    old_servers = [FakeServer() for _ in range(100)]
+    refs = [weakref.ref(server) for server in old_servers]
+
+    async def scenario():
+        for server in old_servers:
+            await cache.get_agent(server)
+        assert len(cache._agents) == 100
+        # The pool reconnected; only the new connection is in use from now on
+        pool["generation"] += 1
+        await cache.get_agent(FakeServer())
+
+    run(scenario())
+    del old_servers
+    gc.collect()
+    assert all(ref() is None for ref in refs)
+    assert len(cache._agents) == 1
+
+
+def test_invalidate_drops_agents():
+    cache = make_cache({"generation": 1})
+    server = FakeServer()
+
+    async def scenario():
+        first = await cache.get_agent(server)
+        cache.invalidate()
+        assert cache.prompt_version is None
+        assert await cache.get_agent(server) is not first
+
+    run(scenario())
@@ -0,0 +1,262 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from chat_agents.batch_jobs import BatchJobRunner, BatchJobStore, dedupe_queries
+from tests.conftest import run
+
+
+def answer(query: str) -> dict:
+    return {"content": f"answer to {query}", "parts": []}
+
+
+async def open_runner(path, run_query, **kwargs) -> BatchJobRunner:
+    kwargs.setdefault("poll_interval", 0.01)
+    runner = BatchJobRunner(BatchJobStore(str(path)), run_query, **kwargs)
+    await runner.start()
+    return runner
+
+
+async def collect(runner: BatchJobRunner, job_id: str, after: int = 0) -> list[dict]:
+    return [event async for event in runner.events(job_id, after)]
+
+
+def test_dedupe_queries_keeps_first_seen_order_and_positions():
+    queries = ["Explain osmosis", "What is a cell?", "explain   OSMOSIS", "What is a cell?"]
+    assert dedupe_queries(queries) == [("Explain osmosis", [0, 2]), ("What is a cell?", [1, 3])]
+
+
+def test_job_streams_each_distinct_query_once(tmp_path):
+    async def scenario():
+        calls, running, peak = [], 0, 0
+
+        async def run_query(query):
+            nonlocal running, peak
+            calls.append(query)
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return answer(query)
+
+        runner = await open_runner(tmp_path / "jobs.db", run_query, max_concurrency=4)
+        queries = [f"question {i}" for i in range(6)] + ["Question 0", "question 3"]
+        job = await runner.submit(queries, max_concurrency=2)
+        assert (job["status"], job["total"], job["unique"]) == ("running", 8, 6)
+
+        events = await collect(runner, job["job_id"])
+        assert events[0]["type"] == "job"
+        results = [event for event in events if event["type"] == "result"]
+        assert [result["seq"] for result in results] == list(range(1, 7))
+        assert sorted(position for result in results for position in result["positions"]) == list(range(8))
+        by_query = {result["query"]: result for result in results}
+        assert by_query["question 0"]["positions"] == [0, 6]
+        assert by_query["question 3"]["response"] == answer("question 3")
+        assert events[-1] == {**events[-1], "type": "done", "status": "completed", "completed": 8, "failed": 0}
+        assert sorted(calls) == sorted(f"question {i}" for i in range(6))
+        # The request asked for fewer than the runner's 4 slots
+        assert peak == 2
+        await runner.close()
+
+    run(scenario())
+
+
+def test_events_replay_from_an_offset(tmp_path):
+    async def scenario():
+        async def run_query(query):
+            return answer(query)
+
+        runner = await open_runner(tmp_path / "jobs.db", run_query, max_concurrency=1)
+        job = await runner.submit(["a", "b", "c"])
+        await collect(runner, job["job_id"])
+
+        resumed = await collect(runner, job["job_id"], after=2)
+        assert [event["type"] for event in resumed] == ["job", "result", "done"]
+        assert resumed[1]["seq"] == 3
+        assert [result["seq"] for result in await runner.store.results_after(job["job_id"], 1)] == [2, 3]
+        assert await runner.store.results_after(job["job_id"], 3) == []
+        await runner.close()
+
+    run(scenario())
+
+
+def test_failed_queries_are_reported_per_item(tmp_path):
+    async def scenario():
+        async def run_query(query):
+            if query == "bad":
+                raise RuntimeError("model error")
+            return answer(query)
+
+        runner = await open_runner(tmp_path / "jobs.db", run_query)
+        job = await runner.submit(["good", "bad", "bad"])
+        events = await collect(runner, job["job_id"])
+        failed = next(event for event in events if event.get("query") == "bad")
+        assert (failed["status"], failed["error"], failed["positions"]) == ("error", "model error", [1, 2])
+        assert "response" not in failed
+        assert (events[-1]["status"], events[-1]["completed"], events[-1]["failed"]) == ("completed", 1, 2)
+        await runner.close()
+
+    run(scenario())
+
+
+def test_submit_validates_the_batch(tmp_path):
+    async def scenario():
+        async def run_query(query):
+            return answer(query)
+
+        runner = await open_runner(tmp_path / "jobs.db", run_query, max_queries=3)
+        with pytest.raises(ValueError):
+            await runner.submit([])
+        with pytest.raises(ValueError):
+            await runner.submit(["a", "b", "c", "d"])
+        assert await runner.status("unknown") is None
+        assert await collect(runner, "unknown") == []
+        await runner.close()
+
+    run(scenario())
+
+
+def test_resume_after_crash_runs_only_unfinished_queries(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def scenario():
+        blocked = asyncio.Event()
+
+        async def first_worker_query(query):
+            if query.startswith("slow"):
+                await blocked.wait()
+            return answer(query)
+
+        crashed = await open_runner(path, first_worker_query, heartbeat_interval=60)
+        job = await crashed.submit(["fast", "slow one", "slow two", "slow one"])
+        job_id = job["job_id"]
+        while (await crashed.status(job_id))["completed"] < 1:
+            await asyncio.sleep(0.01)
+        # The worker dies: its task stops and nothing marks the job interrupted
+        crashed.running[job_id].cancel()
+        await asyncio.sleep(0.01)
+
+        resumed_queries = []
+
+        async def second_worker_query(query):
+            resumed_queries.append(query)
+            return answer(query)
+
+        other = await open_runner(path, second_worker_query, stale_after=0.2)
+        # Heartbeat still fresh: another worker may be running it
+        assert (await other.status(job_id))["status"] == "running"
+        with pytest.raises(ValueError):
+            await other.resume(job_id)
+
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE batch_jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time() - 1, job_id))
+        assert (await other.status(job_id))["status"] == "interrupted"
+
+        assert (await other.resume(job_id))["status"] == "running"
+        events = await collect(other, job_id)
+        assert sorted(resumed_queries) == ["slow one", "slow two"]
+        assert [event["seq"] for event in events if event["type"] == "result"] == [1, 2, 3]
+        assert (events[-1]["status"], events[-1]["completed"]) == ("completed", 4)
+        with pytest.raises(ValueError):
+            await other.resume(job_id)
+
+        crashed._heartbeat_task.cancel()
+        await crashed.store.close()
+        await other.close()
+
+    run(scenario())
+
+
+def test_store_failure_stops_the_job_before_it_is_resumed(tmp_path):
+    async def scenario():
+        calls = []
+        release = asyncio.Event()
+
+        async def run_query(query):
+            calls.append(query)
+            if query != "a":
+                await release.wait()
+            return answer(query)
+
+        runner = await open_runner(tmp_path / "jobs.db", run_query)
+        store = runner.store
+        finish_item = store.finish_item
+
+        async def locked_once(job_id, item, response, error):
+            store.finish_item = finish_item
+            raise sqlite3.OperationalError("database is locked")
+
+        store.finish_item = locked_once
+        job = await runner.submit(["a", "b", "c"])
+        events = await collect(runner, job["job_id"])
+        assert events[-1]["status"] == "interrupted"
+        # The other queries were stopped, not left running untracked
+        release.set()
+        await asyncio.sleep(0.05)
+        assert (await runner.status(job["job_id"]))["completed"] == 0
+
+        await runner.resume(job["job_id"])
+        events = await collect(runner, job["job_id"])
+        assert (events[-1]["status"], events[-1]["completed"], events[-1]["total"]) == ("completed", 3, 3)
+        # "b" and "c" were stopped unfinished and "a" lost its result, so each runs once more
+        assert calls == ["a", "b", "c", "a", "b", "c"]
+        assert [event["seq"] for event in events if event["type"] == "result"] == [1, 2, 3]
+        await runner.close()
+
+    run(scenario())
+
+
+def test_only_one_worker_claims_an_interrupted_job(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_query(query):
+            await release.wait()
+            return answer(query)
+
+        first = await open_runner(path, slow_query)
+        job_id = (await first.submit(["a", "b"]))["job_id"]
+        # Shutting down marks the running job interrupted
+        await first.close()
+
+        workers = [await open_runner(path, slow_query) for _ in range(3)]
+        outcomes = await asyncio.gather(*(worker.resume(job_id) for worker in workers), return_exceptions=True)
+        claimed = [outcome for outcome in outcomes if isinstance(outcome, dict)]
+        assert len(claimed) == 1
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes if not isinstance(outcome, dict))
+        assert sum(job_id in worker.running for worker in workers) == 1
+
+        release.set()
+        owner = next(worker for worker in workers if job_id in worker.running)
+        events = await collect(owner, job_id)
+        assert (events[-1]["status"], events[-1]["completed"]) == ("completed", 2)
+        for worker in workers:
+            await worker.close()
+
+    run(scenario())
+
+
+def test_finished_jobs_expire(tmp_path):
+    path = tmp_path / "jobs.db"
+
+    async def scenario():
+        store = BatchJobStore(str(path), ttl_seconds=60)
+        await store.start()
+        await store.create("old", 1, [("q", [0])])
+        await store.set_status("old", "completed")
+        await store.create("running", 1, [("q", [0])])
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE batch_jobs SET updated_at = ?", (time.time() - 120,))
+
+        assert await store._run(store._expire_sync) == 1
+        assert await store.get_job("old") is None
+        assert await store.results_after("old", 0) == []
+        # Running jobs are never expired under a worker
+        assert await store.get_job("running") is not None
+        await store.close()
+
+    run(scenario())
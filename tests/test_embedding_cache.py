@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+import time
+
+from embedding_cache import EmbeddingCache
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = EmbeddingCache("model", disk_dir=str(tmp_path))
+    assert cache.get("What is a cell?") is None
+    cache.put("What is a cell?", [0.5, 1.0])
+    assert cache.get("  what is a CELL ") == [0.5, 1.0]
+
+    restarted = EmbeddingCache("model", disk_dir=str(tmp_path))
+    assert restarted.get("what is a cell") == [0.5, 1.0]
+    assert EmbeddingCache("other-model", disk_dir=str(tmp_path)).get("what is a cell") is None
+
+
+def test_expired_disk_rows_are_pruned(tmp_path):
+    cache = EmbeddingCache("model", disk_dir=str(tmp_path), disk_ttl_seconds=60)
+    cache.put("old question", [1.0])
+    cache.put("new question", [2.0])
+    with cache._disk:
+        cache._disk.execute("UPDATE embeddings SET created_at = ? WHERE key = ?", (time.time() - 120, cache.key("old question")))
+
+    assert cache.prune_disk() == 1
+    rows = sqlite3.connect(tmp_path / "embeddings.db").execute("SELECT key FROM embeddings").fetchall()
+    assert rows == [(cache.key("new question"),)]
+
+
+def test_put_prunes_at_most_once_per_interval(tmp_path):
+    cache = EmbeddingCache("model", disk_dir=str(tmp_path), disk_ttl_seconds=60, prune_interval=3600)
+    cache.put("first", [1.0])
+    with cache._disk:
+        cache._disk.execute("UPDATE embeddings SET created_at = ?", (time.time() - 120,))
+
+    cache.put("second", [2.0])
+    assert cache._disk.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+
+    cache._pruned_at -= 3600
+    cache.put("third", [3.0])
+    assert cache._disk.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+
+
+def test_memory_hits_do_not_wait_on_disk_writes(tmp_path):
+    cache = EmbeddingCache("model", disk_dir=str(tmp_path))
+    cache.put("cached", [1.0])
+
+    hit = threading.Event()
+    with cache._disk_lock:
+        # A disk write in progress holds the disk lock; memory hits still return
+        threading.Thread(target=lambda: cache.get("cached") and hit.set()).start()
+        assert hit.wait(timeout=2)
@@ -0,0 +1,143 @@
+import asyncio
+
+from chat_agents.history import SUMMARY_PREFIX, HistoryCompactor, is_summary, strip_tool_outputs, summary_item
+from chat_agents.session_store import SessionStore
+from tests.conftest import run
+
+QUIZ_HTML = "<div>" + "x" * 5000 + "</div>"
+
+
+def turn(n: int, tool_output: str | None = None) -> list[dict]:
+    items = [{"role": "user", "content": f"question {n}"}]
+    if tool_output is not None:
+        items += [
+            {"type": "function_call", "call_id": f"call-{n}", "name": "mcq_quiz_component", "arguments": "{}"},
+            {"type": "function_call_output", "call_id": f"call-{n}", "output": tool_output},
+        ]
+    items.append({"role": "assistant", "content": f"answer {n}"})
+    return items
+
+
+def user_questions(items: list[dict]) -> list[str]:
+    return [item["content"] for item in items if item.get("role") == "user"]
+
+
+def tool_outputs(items: list[dict]) -> list[str]:
+    return [item["output"] for item in items if item.get("type") == "function_call_output"]
+
+
+def compactor(store=None, summarize=None, **kwargs) -> HistoryCompactor:
+    async def no_summary(transcript, previous):
+        raise AssertionError("not expected to summarize")
+
+    kwargs.setdefault("window_turns", 3)
+    kwargs.setdefault("compact_after_turns", 5)
+    return HistoryCompactor(store, summarize or no_summary, **kwargs)
+
+
+def test_prepare_keeps_only_the_window():
+    items = [item for n in range(8) for item in turn(n)]
+    replay, stored_turns = compactor().prepare(items)
+    assert stored_turns == 8
+    assert user_questions(replay) == ["question 5", "question 6", "question 7"]
+
+
+def test_prepare_strips_tool_outputs_outside_the_latest_turns():
+    items = [item for n in range(3) for item in turn(n, tool_output=QUIZ_HTML)]
+    replay, _ = compactor(keep_tool_output_turns=1, max_tool_output_chars=100).prepare(items)
+    outputs = tool_outputs(replay)
+    assert outputs[-1] == QUIZ_HTML
+    assert all("quiz was shown" in output for output in outputs[:-1])
+
+
+def test_strip_tool_outputs_keeps_short_outputs_and_names_unknown_tools():
+    items = [
+        {"type": "function_call", "call_id": "a", "name": "other_tool", "arguments": "{}"},
+        {"type": "function_call_output", "call_id": "a", "output": "y" * 50},
+        {"type": "function_call_output", "call_id": "b", "output": "short"},
+    ]
+    stripped = strip_tool_outputs(items, max_chars=10)
+    assert stripped[1]["output"] == "[Output of other_tool omitted (50 characters).]"
+    assert stripped[2]["output"] == "short"
+    # The stored items are not modified
+    assert items[1]["output"] == "y" * 50
+
+
+def test_prepare_replays_only_the_latest_summary_first():
+    items = [summary_item("old"), *turn(0), summary_item("new"), *turn(1)]
+    replay, stored_turns = compactor().prepare(items)
+    assert stored_turns == 2
+    assert is_summary(replay[0]) and replay[0]["content"].endswith("new")
+    assert sum(is_summary(item) for item in replay) == 1
+
+
+def test_compact_replaces_old_turns_with_a_summary(tmp_path):
+    calls = []
+
+    async def summarize(transcript, previous):
+        calls.append((transcript, previous))
+        return f"summary {len(calls)}"
+
+    async def scenario():
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        await store.start()
+        history = compactor(store, summarize)
+        session = history.session("s")
+        for n in range(7):
+            await session.add_items(turn(n))
+
+        assert await history.compact("s")
+        stored = await store.get_items("s")
+        assert is_summary(stored[0]) and stored[0]["content"] == f"{SUMMARY_PREFIX}\nsummary 1"
+        assert user_questions(stored) == ["question 4", "question 5", "question 6"]
+        transcript, previous = calls[0]
+        assert previous is None
+        assert "Student: question 0" in transcript and "question 4" not in transcript
+
+        # Below the threshold again: nothing to do
+        assert not await history.compact("s")
+
+        # The next compaction folds the previous summary in
+        for n in range(7, 10):
+            await session.add_items(turn(n))
+        assert await history.compact("s")
+        stored = await store.get_items("s")
+        assert calls[1][1] == "summary 1"
+        assert sum(is_summary(item) for item in stored) == 1
+        assert user_questions(stored) == ["question 7", "question 8", "question 9"]
+
+        replay = await session.get_items()
+        assert replay[0]["content"].endswith("summary 2")
+        assert await session.has_items()
+        assert not await history.session("empty").has_items()
+        await history.close()
+        await store.close()
+
+    run(scenario())
+
+
+def test_schedule_compaction_runs_in_the_background(tmp_path):
+    async def scenario():
+        finished = asyncio.Event()
+
+        async def summarize(transcript, previous):
+            finished.set()
+            return "background summary"
+
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        await store.start()
+        history = compactor(store, summarize)
+        session = history.session("s")
+        for n in range(6):
+            await session.add_items(turn(n))
+        await session.get_items()
+        # The run that just finished saved a 7th turn
+        await session.add_items(turn(6))
+        session.schedule_compaction()
+        await asyncio.wait_for(finished.wait(), timeout=5)
+        await asyncio.gather(*history._tasks.values())
+        assert is_summary((await store.get_items("s"))[0])
+        await history.close()
+        await store.close()
+
+    run(scenario())
@@ -0,0 +1,74 @@
+import os
+
+from index_versions import (
+    CURRENT_FILE, STAGING_DIR, collect_garbage, current_version, list_versions, prepare_staging, publish,
+    resolve_index_dir, version_dir,
+)
+
+
+def build(root, marker: str, full: bool = False) -> str:
+    """A fake build: stage, write one file, return the staging directory."""
+    staging = prepare_staging(str(root), full=full)
+    with open(os.path.join(staging, "index.txt"), "w") as f:
+        f.write(marker)
+    return staging
+
+
+def read_index(directory: str) -> str:
+    with open(os.path.join(directory, "index.txt")) as f:
+        return f.read()
+
+
+def test_publish_points_current_at_the_new_version_and_keeps_the_newest(tmp_path):
+    published = []
+    for n in range(4):
+        published.append(publish(str(tmp_path), build(tmp_path, f"build {n}"), keep=2))
+        assert current_version(str(tmp_path)) == published[-1]
+        version, directory = resolve_index_dir(str(tmp_path))
+        assert (version, read_index(directory)) == (published[-1], f"build {n}")
+
+    assert list_versions(str(tmp_path)) == published[-2:]
+    assert not os.path.exists(tmp_path / STAGING_DIR)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_garbage_collection_never_deletes_the_current_version(tmp_path):
+    versions = [publish(str(tmp_path), build(tmp_path, f"build {n}"), keep=5) for n in range(3)]
+    # Rolled back to the oldest version
+    (tmp_path / CURRENT_FILE).write_text(versions[0])
+
+    assert collect_garbage(str(tmp_path), keep=1) == [versions[1]]
+    assert list_versions(str(tmp_path)) == [versions[0], versions[2]]
+    assert read_index(version_dir(str(tmp_path), versions[0])) == "build 0"
+
+
+def test_incremental_build_starts_from_a_copy_of_the_published_version(tmp_path):
+    first = publish(str(tmp_path), build(tmp_path, "first"))
+    staging = prepare_staging(str(tmp_path))
+    assert read_index(staging) == "first"
+    with open(os.path.join(staging, "index.txt"), "w") as f:
+        f.write("changed")
+    # The published version is never written to
+    assert read_index(version_dir(str(tmp_path), first)) == "first"
+    assert sorted(os.listdir(staging)) == ["index.txt"]
+
+
+def test_interrupted_build_is_resumed_unless_full(tmp_path):
+    publish(str(tmp_path), build(tmp_path, "published"))
+    staging = build(tmp_path, "half done")
+
+    assert prepare_staging(str(tmp_path)) == staging
+    assert read_index(staging) == "half done"
+
+    staging = prepare_staging(str(tmp_path), full=True)
+    assert os.listdir(staging) == []
+
+
+def test_unversioned_store_is_copied_without_its_own_layout_dirs(tmp_path):
+    (tmp_path / "chroma.sqlite3").write_text("legacy")
+    assert resolve_index_dir(str(tmp_path)) == (None, str(tmp_path))
+
+    staging = prepare_staging(str(tmp_path))
+    assert sorted(os.listdir(staging)) == ["chroma.sqlite3"]
+    version = publish(str(tmp_path), staging)
+    assert resolve_index_dir(str(tmp_path)) == (version, version_dir(str(tmp_path), version))
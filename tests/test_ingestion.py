@@ -0,0 +1,84 @@
+import os
+
+from fake_embeddings import FakeEmbeddings
+from index_versions import resolve_index_dir
+from ingestion import iter_split_files
+from lexical_index import LexicalIndex
+from utils import build_vector_store
+
+
+def test_reading_stays_a_bounded_window_ahead_of_the_consumer(tmp_path):
+    paths = []
+    for n in range(10):
+        path = tmp_path / f"note{n}.txt"
+        path.write_text(f"Note number {n} about osmosis.")
+        paths.append(str(path))
+
+    pulled = 0
+
+    def files():
+        nonlocal pulled
+        for path in paths:
+            pulled += 1
+            yield path, None
+
+    consumed = 0
+    for split in iter_split_files(files(), chunk_size=200, chunk_overlap=0, workers=1, max_pending=3):
+        consumed += 1
+        assert split.error is None and len(split.chunks) == 1
+        assert pulled - consumed <= 3
+    assert consumed == 10
+
+
+def build(kb, store):
+    return build_vector_store(
+        input_dir=str(kb), persist_dir=str(store), embeddings=FakeEmbeddings(dim=16),
+        requests_per_minute=None, read_workers=1,
+    )
+
+
+def indexed_texts(store) -> dict[str, str]:
+    """Source path -> text of its chunks in the published version."""
+    _, directory = resolve_index_dir(str(store))
+    index = LexicalIndex.load(directory)
+    texts: dict[str, str] = {}
+    for text, metadata in zip(index.texts, index.metadatas):
+        texts[metadata["source"]] = texts.get(metadata["source"], "") + text
+    return texts
+
+
+def test_incremental_builds(tmp_path):
+    kb, store = tmp_path / "kb", tmp_path / "store"
+    kb.mkdir()
+    (kb / "cells.md").write_text("---\ntitle: Cells\ntags: [biology]\n---\n# Cells\n\nMitochondria make ATP.\n")
+    (kb / "forces.txt").write_text("Force equals mass times acceleration.")
+    (kb / "waves.txt").write_text("Waves carry energy without carrying matter.")
+    (kb / "image.png").write_bytes(b"not indexed")
+
+    first = build(kb, store)
+    assert first["mode"] == "full"
+    assert sorted(os.path.basename(path) for path in first["files_added"]) == ["cells.md", "forces.txt", "waves.txt"]
+    texts = indexed_texts(store)
+    cells = str(kb / "cells.md")
+    # Front matter is stripped from Markdown
+    assert "title:" not in texts[cells] and "Mitochondria make ATP." in texts[cells]
+
+    # Nothing changed: every file is skipped by its hash and nothing is published
+    unchanged = build(kb, store)
+    assert (unchanged["mode"], unchanged["files_unchanged"], unchanged["chunks_added"]) == ("incremental", 3, 0)
+    assert unchanged["version"] == first["version"]
+
+    (kb / "forces.txt").write_text("Force equals mass times acceleration. Friction opposes motion.")
+    (kb / "cells.md").write_bytes(b"\xff\xfe not utf-8")  # unreadable now
+    os.remove(kb / "waves.txt")
+    update = build(kb, store)
+    assert [os.path.basename(path) for path in update["files_updated"]] == ["forces.txt"]
+    assert [os.path.basename(path) for path in update["files_failed"]] == ["cells.md"]
+    assert [os.path.basename(path) for path in update["files_removed"]] == ["waves.txt"]
+    assert update["version"] != first["version"]
+
+    texts = indexed_texts(store)
+    assert "Friction opposes motion." in texts[str(kb / "forces.txt")]
+    # A file that failed to read keeps its previous chunks
+    assert "Mitochondria make ATP." in texts[cells]
+    assert str(kb / "waves.txt") not in texts
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from lexical_index import LexicalIndex
+from utils import build_lexical_index
+
+CHUNKS = [
+    ("c0", "Mitochondria are the powerhouse of the cell.", {"source": "bio.md"}),
+    ("c1", "Photosynthesis converts light into chemical energy.", {"source": "bio.md"}),
+    ("c2", "Newton's second law: force equals mass times acceleration.", None),
+    ("c3", "The cell membrane controls what enters the cell.", {"source": "bio.md"}),
+    ("c4", "Acceleration is the rate of change of velocity.", {"source": "physics.md"}),
+]
+
+
+class PagedCollection:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pages_served = 0
+
+    def get(self, include, limit, offset):
+        page = self.chunks[offset:offset + limit]
+        self.pages_served += bool(page)
+        return {
+            "ids": [chunk_id for chunk_id, _, _ in page],
+            "documents": [text for _, text, _ in page],
+            "metadatas": [metadata for _, _, metadata in page],
+        }
+
+
+def test_paged_build_matches_a_single_build(tmp_path):
+    collection = PagedCollection(CHUNKS)
+    index = build_lexical_index(SimpleNamespace(_collection=collection), str(tmp_path), page_size=2)
+    assert collection.pages_served == 3
+
+    expected = LexicalIndex.build(
+        [chunk_id for chunk_id, _, _ in CHUNKS],
+        [text for _, text, _ in CHUNKS],
+        [metadata or {} for _, _, metadata in CHUNKS],
+    )
+    assert index.postings == expected.postings
+    assert index.avg_length == expected.avg_length
+    assert index.search("cell membrane") == expected.search("cell membrane")
+
+    loaded = LexicalIndex.load(str(tmp_path))
+    assert loaded.search("acceleration") == expected.search("acceleration")
+    assert loaded.document(2).metadata == {}
+
+
+def test_empty_collection(tmp_path):
+    index = build_lexical_index(SimpleNamespace(_collection=PagedCollection([])), str(tmp_path))
+    assert len(index) == 0
+    assert index.search("cell") == []
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+from tests.conftest import MCP_DIR, ROOT
+
+# Run in a fresh interpreter: loading the server starts its warm-up threads,
+# and the test session already has mcp/ on sys.path
+SCRIPT = """
+import asyncio, json, sys
+from chat_agents.mcp_inprocess import MCPServerInProcess, load_mcp_server_module
+
+path = list(sys.path)
+module = load_mcp_server_module(sys.argv[1])
+assert load_mcp_server_module(sys.argv[1]) is module
+
+
+async def main():
+    server = MCPServerInProcess(module.mcp)
+    await server.connect()
+    try:
+        tools = await server.list_tools()
+    finally:
+        await server.cleanup()
+    return [tool.name for tool in tools]
+
+
+print(json.dumps({
+    "sys_path_unchanged": sys.path == path,
+    "module": module.__name__,
+    "bare_server_imported": "server" in sys.modules,
+    "siblings": sorted(name for name in ("readiness", "vector_store_manager") if name in sys.modules),
+    "tools": asyncio.run(main()),
+}))
+"""
+
+
+def test_server_is_loaded_without_touching_sys_path(tmp_path):
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "GEMINI_API_KEY": "test",
+        "OPENAI_AGENTS_DISABLE_TRACING": "1",
+        "EMBEDDING_BACKEND": "fake",
+        "VECTOR_STORE_DIR": str(tmp_path / "store"),
+        "EMBEDDING_CACHE_DIR": "",
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", SCRIPT, MCP_DIR], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert report["sys_path_unchanged"]
+    assert report["module"] == "studymode_mcp_server"
+    assert not report["bare_server_imported"]
+    assert report["siblings"] == ["readiness", "vector_store_manager"]
+    assert "doc_search_tool" in report["tools"]
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from mmap_index import MmapVectorIndex, export_mmap_index, has_mmap_index, remove_mmap_index
+
+
+class FakeCollection:
+    """The slice of a Chroma collection that export_mmap_index reads."""
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def count(self) -> int:
+        return len(self.embeddings)
+
+    def peek(self, limit: int) -> dict:
+        return {"embeddings": self.embeddings[:limit]}
+
+    def get(self, include, limit: int, offset: int) -> dict:
+        rows = range(offset, min(offset + limit, len(self.embeddings)))
+        return {
+            "ids": [f"chunk-{i}" for i in rows],
+            "embeddings": self.embeddings[offset:offset + limit],
+            "documents": [f"text {i}" for i in rows],
+            "metadatas": [{"page_title": f"Page {i}"} for i in rows],
+        }
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(300, 32)).astype(np.float32)
+
+
+def exact_top(vectors: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k])
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_export_and_search_match_exact_search(tmp_path, vectors, dtype):
+    assert export_mmap_index(FakeCollection(vectors), str(tmp_path), dtype=dtype, page_size=64) == 300
+    assert has_mmap_index(str(tmp_path), dtype)
+
+    index = MmapVectorIndex.load(str(tmp_path), rerank=True)
+    assert index.dtype == dtype and len(index) == 300
+    for row in (0, 17, 299):
+        query = vectors[row] + 0.01
+        results = index.search(query.tolist(), k=5)
+        assert [position for position, _ in results] == exact_top(vectors, query, 5)
+        scores = [score for _, score in results]
+        assert scores == sorted(scores, reverse=True)
+
+    documents = index.search_documents(vectors[42].tolist(), k=2)
+    assert documents[0].id == "chunk-42"
+    assert documents[0].page_content == "text 42"
+    assert documents[0].metadata == {"page_title": "Page 42"}
+    index.close()
+
+
+def test_search_edge_cases_and_removal(tmp_path, vectors):
+    export_mmap_index(FakeCollection(vectors[:3]), str(tmp_path), dtype="int8")
+    index = MmapVectorIndex(str(tmp_path), "int8", rerank=False)
+    assert len(index.search(vectors[0].tolist(), k=10)) == 3
+    assert index.search(vectors[0].tolist(), k=0) == []
+    assert index.documents([]) == []
+    index.close()
+
+    remove_mmap_index(str(tmp_path))
+    assert MmapVectorIndex.load(str(tmp_path)) is None
+    with pytest.raises(ValueError):
+        export_mmap_index(FakeCollection(vectors), str(tmp_path), dtype="float32")
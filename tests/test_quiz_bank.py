@@ -0,0 +1,87 @@
+from quiz_bank import QUIZ_BANK_FILE, QuizBank, title_key, validate_questions
+from quiz_generators import ClozeQuizGenerator
+from ui_components import QuizQuestion
+
+CHUNK = (
+    "Mitochondria produce most of the chemical energy of the cell as ATP. "
+    "Ribosomes assemble proteins from amino acids by reading messenger RNA. "
+    "The nucleus stores the genetic material of eukaryotic cells inside a membrane."
+)
+
+
+def question(text: str, correct: str = "Mitochondria", options: list[str] | None = None) -> dict:
+    return {"question": text, "options": options or ["Mitochondria", "Ribosomes", "Nucleus", "Golgi"], "correct": correct}
+
+
+def make_question(n: int) -> QuizQuestion:
+    return QuizQuestion(question=f"Question {n}?", options=["a", "b", "c"], correct="a")
+
+
+def test_validate_keeps_grounded_well_formed_questions():
+    raw = [
+        question("Which organelle produces ATP?"),
+        question("  which organelle produces ATP?  "),  # duplicate after normalization
+        question("Who painted the Mona Lisa?", correct="Da Vinci", options=["Da Vinci", "Monet", "Dali"]),  # not grounded
+        question("Which organelle reads messenger RNA?", correct="Lysosome"),  # answer not an option
+        question("Which part stores genetic material?", options=["Nucleus", "nucleus", "Ribosomes"], correct="Nucleus"),
+        question("Which organelle assembles proteins?", options=["Ribosomes", "Nucleus"], correct="Ribosomes"),
+        {"question": "Missing options"},
+        question("", correct="Mitochondria"),
+    ]
+    valid = validate_questions(raw, CHUNK)
+    assert [q.question for q in valid] == ["Which organelle produces ATP?"]
+
+
+def test_answer_alone_can_ground_a_question():
+    raw = [question("Which of these is the powerhouse?", correct="Mitochondria")]
+    assert len(validate_questions(raw, CHUNK)) == 1
+
+
+def test_bank_interleaves_questions_across_chunks(tmp_path):
+    bank = QuizBank(str(tmp_path / "quiz.sqlite"))
+    bank.add("c1", "Cell_Biology-notes", "bio.md", [make_question(1), make_question(2), make_question(3)], "cloze")
+    bank.add("c2", "Cell Biology notes", "bio.md", [make_question(4)], "cloze")
+    bank.add("c3", "Physics", "physics.md", [make_question(5), make_question(6)], "cloze")
+    bank.add("empty", "Physics", "physics.md", [], "cloze")
+
+    # Best chunk first, one question per chunk in turn
+    picked = bank.for_chunks(["c3", "missing", "c1", "c2"], limit=5)
+    assert [q.question for q in picked] == [f"Question {n}?" for n in (5, 1, 4, 6, 2)]
+    assert bank.for_chunks([], limit=5) == []
+    assert [q.question for q in bank.for_page_title("cell biology NOTES", 10)] == [f"Question {n}?" for n in (1, 2, 3, 4)]
+    assert title_key("Cell_Biology-notes") == "cell biology notes"
+    # Processed chunks are recorded even without questions, so they are not regenerated
+    assert bank.chunk_ids() == {"c1", "c2", "c3", "empty"}
+    bank.close()
+
+
+def test_add_replaces_and_prune_removes_stale_chunks(tmp_path):
+    bank = QuizBank(str(tmp_path / QUIZ_BANK_FILE))
+    bank.add("c1", "Cells", None, [make_question(1), make_question(2)], "cloze")
+    bank.add("c1", "Cells", None, [make_question(3)], "gemini")
+    bank.add("c2", "Cells", None, [make_question(4)], "cloze")
+    assert len(bank) == 2
+
+    assert bank.prune({"c2", "not-in-bank"}) == 1
+    assert bank.chunk_ids() == {"c2"}
+    assert len(bank) == 1
+    assert bank.prune({"c2"}) == 0
+
+    # The read-only view the MCP server uses
+    reader = QuizBank.open_existing(str(tmp_path))
+    assert [q.question for q in reader.for_page_title("cells", 5)] == ["Question 4?"]
+    reader.close()
+    bank.close()
+    assert QuizBank.open_existing(str(tmp_path / "nothing")) is None
+
+
+def test_cloze_questions_are_deterministic_and_pass_validation():
+    generator = ClozeQuizGenerator()
+    raw = generator.generate("Cell biology", CHUNK, count=5)
+    assert raw == generator.generate("Cell biology", CHUNK, count=5)
+    assert 1 <= len(raw) <= 3
+    for item in raw:
+        assert "_____" in item["question"]
+        assert item["correct"] in item["options"] and len(set(item["options"])) == 4
+    assert len(validate_questions(raw, CHUNK, max_options=4)) == len(raw)
+    assert generator.generate("Short", "Too short.", count=5) == []
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+from chat_agents.response_cache import CacheKey, ResponseCache, is_history_independent, normalize_query
+from tests.conftest import run
+
+RESPONSE = {"content": "Photosynthesis turns light into chemical energy.", "parts": []}
+
+# Fixed unit vectors: "photosynthesis" questions point one way, everything else another
+VECTORS = {"photo": [1.0, 0.0, 0.0], "other": [0.0, 1.0, 0.0]}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text: str) -> list[float]:
+        self.calls.append(text)
+        return VECTORS["photo" if "photosynthesis" in text else "other"]
+
+
+class FakeMCPServer:
+    """Serves the index://version resource like mcp/server.py."""
+
+    def __init__(self, version: str):
+        self.version = version
+
+        async def read_resource(uri):
+            return SimpleNamespace(contents=[SimpleNamespace(text=self.version)])
+
+        self.session = SimpleNamespace(read_resource=read_resource)
+
+
+class FakeSession:
+    def __init__(self, items):
+        self.items = items
+
+    async def has_items(self) -> bool:
+        return bool(self.items)
+
+
+def key(query: str, index_version: str = "v1") -> CacheKey:
+    return CacheKey(normalize_query(query), "prompt-v1:abc", index_version)
+
+
+def test_normalization_and_history_independence():
+    assert normalize_query("  What IS Photosynthesis?? ") == "what is photosynthesis"
+    assert is_history_independent("what is photosynthesis in plants")
+    assert not is_history_independent("explain it again")
+    assert not is_history_independent("why")
+
+
+def test_exact_hit_and_lru_bound():
+    async def scenario():
+        cache = ResponseCache(max_entries=2)
+        await cache.put(key("a question here"), RESPONSE)
+        await cache.put(key("b question here"), RESPONSE)
+        assert await cache.get(key("A question here?")) is not None
+        await cache.put(key("c question here"), RESPONSE)
+        # "b" was least recently used
+        assert await cache.get(key("b question here")) is None
+        assert len(cache) == 2
+
+    run(scenario())
+
+
+def test_invalid_responses_are_not_cached():
+    async def scenario():
+        cache = ResponseCache()
+        await cache.put(key("what is photosynthesis"), {"unexpected": True})
+        assert len(cache) == 0
+
+    run(scenario())
+
+
+def test_similarity_miss_embeds_the_query_once():
+    async def scenario():
+        embed = FakeEmbeddings()
+        cache = ResponseCache(similarity_threshold=0.9, embed=embed)
+        await cache.put(key("what is photosynthesis"), RESPONSE)
+        assert embed.calls == ["what is photosynthesis"]
+
+        # A miss that is then answered and cached: one embedding for get() and put() together
+        assert await cache.get(key("what is osmosis")) is None
+        await cache.put(key("what is osmosis"), RESPONSE)
+        assert embed.calls.count("what is osmosis") == 1
+        assert cache._miss_vectors == {}
+
+        # A paraphrase is served from the similar entry
+        assert await cache.get(key("explain photosynthesis to me")) == RESPONSE
+
+    run(scenario())
+
+
+def test_cacheability_and_index_version_invalidation():
+    async def scenario():
+        cache = ResponseCache(index_version_ttl=0)
+        server = FakeMCPServer("v1")
+        query = "what is photosynthesis"
+        assert await cache.key_for(query, FakeSession(["earlier turn"]), "prompt-v1:abc", server) is None
+        first = await cache.key_for(query, FakeSession([]), "prompt-v1:abc", server)
+        assert first == key(query, "v1")
+        # Batch queries have no session at all
+        assert await cache.key_for(query, None, "prompt-v1:abc", server) == first
+        await cache.put(first, RESPONSE)
+
+        server.version = "v2"
+        second = await cache.key_for(query, None, "prompt-v1:abc", server)
+        assert second.index_version == "v2"
+        assert len(cache) == 0
+        assert await cache.get(first) is None
+
+    run(scenario())
@@ -0,0 +1,10 @@
+from server_metrics import Counter, REGISTRY, render_metrics
+
+
+def test_label_values_are_escaped():
+    counter = Counter("mcp_test_escaped_total", "Test counter.", labelnames=("tool",))
+    try:
+        counter.inc(tool='say "hi"\\\n')
+        assert 'mcp_test_escaped_total{tool="say \\"hi\\"\\\\\\n"} 1' in render_metrics()
+    finally:
+        REGISTRY.remove(counter)
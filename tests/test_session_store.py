@@ -0,0 +1,159 @@
+import asyncio
+import sqlite3
+import time
+
+from chat_agents.session_store import SessionStore
+from tests.conftest import run
+
+
+def message(text: str) -> dict:
+    return {"role": "user", "content": text}
+
+
+def contents(items: list[dict]) -> list[str]:
+    return [item["content"] for item in items]
+
+
+async def open_store(path, **kwargs) -> SessionStore:
+    store = SessionStore(str(path), **kwargs)
+    await store.start()
+    return store
+
+
+def test_concurrent_add_items_are_group_committed(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db", flush_interval=0.05)
+        transactions = []
+        write_batch_sync = store._write_batch_sync
+        store._write_batch_sync = lambda batch: (transactions.append(batch), write_batch_sync(batch))[1]
+
+        await asyncio.gather(*(
+            store.add_items(f"session-{i % 5}", [message(f"{i}-a"), message(f"{i}-b")]) for i in range(50)
+        ))
+
+        for s in range(5):
+            items = contents(await store.get_items(f"session-{s}"))
+            expected = [text for i in range(s, 50, 5) for text in (f"{i}-a", f"{i}-b")]
+            assert items == expected
+        # 50 appends shared far fewer transactions
+        assert len(transactions) < 10
+        assert sum(len(rows) for batch in transactions for _, rows in batch) == 100
+        await store.close()
+
+    run(scenario())
+
+
+def test_get_items_limit_returns_the_tail(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db")
+        await store.add_items("s", [message(str(i)) for i in range(5)])
+        assert contents(await store.get_items("s", limit=2)) == ["3", "4"]
+        assert await store.get_items("unknown", limit=1) == []
+        await store.close()
+
+    run(scenario())
+
+
+def test_pop_item_on_empty_session(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db")
+        assert await store.pop_item("empty") is None
+        await store.add_items("s", [message("first"), message("second")])
+        assert (await store.pop_item("s"))["content"] == "second"
+        assert (await store.pop_item("s"))["content"] == "first"
+        assert await store.pop_item("s") is None
+        await store.close()
+
+    run(scenario())
+
+
+def test_replace_items_keeps_place_before_later_appends(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db")
+        session = store.session("s")
+        await session.add_items([message(f"old-{i}") for i in range(4)])
+        rows = await store.get_items_with_ids("s")
+        upto_id = rows[-1][0]
+        # Appended while the summary was being written
+        await session.add_items([message("new-0"), message("new-1")])
+
+        await store.replace_items("s", upto_id, [message("summary"), message("old-3")])
+
+        assert contents(await session.get_items()) == ["summary", "old-3", "new-0", "new-1"]
+        ids = [row_id for row_id, _ in await store.get_items_with_ids("s")]
+        assert ids == sorted(ids)
+        await store.close()
+
+    run(scenario())
+
+
+def test_replace_items_cannot_grow_the_history(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db")
+        await store.add_items("s", [message("only")])
+        (row_id, _), = await store.get_items_with_ids("s")
+        try:
+            await store.replace_items("s", row_id, [message("a"), message("b")])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+        # The failed replacement was rolled back
+        assert contents(await store.get_items("s")) == ["only"]
+        await store.close()
+
+    run(scenario())
+
+
+def test_close_flushes_pending_writes(tmp_path):
+    path = tmp_path / "sessions.db"
+
+    async def write_then_close():
+        # Long flush interval: only close() can commit this append in time
+        store = await open_store(path, flush_interval=30)
+        append = asyncio.create_task(store.add_items("s", [message("pending")]))
+        await asyncio.sleep(0)
+        assert store._pending
+        await store.close()
+        await append
+
+    async def reopen():
+        store = await open_store(path)
+        assert contents(await store.get_items("s")) == ["pending"]
+        await store.close()
+
+    run(write_then_close())
+    run(reopen())
+
+
+def test_add_items_after_close_is_rejected(tmp_path):
+    async def scenario():
+        store = await open_store(tmp_path / "sessions.db")
+        await store.close()
+        try:
+            await store.add_items("s", [message("late")])
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("expected RuntimeError")
+
+    run(scenario())
+
+
+def test_expire_idle_sessions(tmp_path):
+    path = tmp_path / "sessions.db"
+
+    async def scenario():
+        store = await open_store(path, ttl_seconds=3600)
+        await store.add_items("idle", [message("old")])
+        await store.add_items("active", [message("recent")])
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = 'idle'", (time.time() - 7200,))
+
+        assert await store.expire_idle_sessions() == 1
+        assert await store.get_items("idle") == []
+        assert contents(await store.get_items("active")) == ["recent"]
+        assert await store.expire_idle_sessions() == 0
+        await store.close()
+
+    run(scenario())
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+
+from tests.conftest import run
+from langchain_core.documents import Document
+from index_versions import prepare_staging, publish
+from vector_store_manager import INDEX_RELOADS, VectorStoreManager
+
+
+class FakeHandle:
+    version = "v1"
+
+    def __init__(self):
+        self.in_flight = 0
+        self.retired = False
+
+
+class RecordingManager(VectorStoreManager):
+    """Serves a fake index and records which thread opened and searched it."""
+
+    def __init__(self, opened: threading.Event | None = None):
+        super().__init__("unused", "docs", embeddings=None, max_workers=2)
+        self.handle = FakeHandle()
+        self.opened = opened
+        self.threads: list[str] = []
+
+    def _current(self):
+        self.threads.append(threading.current_thread().name)
+        if self.opened is not None:
+            self.opened.wait(timeout=5)
+        return self.handle
+
+    async def _asearch_batch(self, index, queries, k, mode):
+        return [[query] for query in queries]
+
+
+def test_batch_search_acquires_off_the_event_loop():
+    manager = RecordingManager()
+    assert run(manager.asearch_batch(["a", "b"])) == [["a"], ["b"]]
+    assert manager.threads and all(name.startswith("doc-search") for name in manager.threads)
+    assert manager.handle.in_flight == 0
+
+
+def test_event_loop_keeps_running_while_the_index_opens():
+    opened = threading.Event()
+    manager = RecordingManager(opened)
+
+    async def scenario():
+        search = asyncio.create_task(manager.asearch_batch(["a"]))
+        # The loop is free to run other work while acquire() blocks in the executor
+        await asyncio.sleep(0.05)
+        assert not search.done()
+        opened.set()
+        return await search
+
+    assert run(scenario()) == [["a"]]
+    assert manager.handle.in_flight == 0
+
+
+def test_cancelled_batch_search_does_not_leak_its_pin():
+    opened = threading.Event()
+    manager = RecordingManager(opened)
+
+    async def scenario():
+        search = asyncio.create_task(manager.asearch_batch(["a"]))
+        await asyncio.sleep(0.05)
+        search.cancel()
+        await asyncio.sleep(0)
+        opened.set()
+        await asyncio.sleep(0.1)
+        return search
+
+    assert run(scenario()).cancelled()
+    assert manager.handle.in_flight == 0
+
+
+def test_current_version_is_resolved_off_the_event_loop():
+    manager = RecordingManager()
+    assert run(manager.acurrent_version()) == "v1"
+    assert manager.threads == ["doc-search_0"]
+
+
+class FakeEmbeddings:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    def embed_queries(self, texts):
+        if self.fail:
+            raise RuntimeError("embedding quota exceeded")
+        return [[float(len(text))] for text in texts]
+
+
+class VectorOnlyHandle(FakeHandle):
+    """No lexical index; the vector search for query 'b' fails."""
+
+    lexical = None
+    vectors = object()
+
+    def search_by_vector(self, vector, k):
+        if vector == [1.0]:
+            raise RuntimeError("chroma hiccup")
+        return [Document(page_content=f"doc for {vector[0]:g}", id=str(vector[0]))]
+
+
+class VectorOnlyManager(VectorStoreManager):
+    def __init__(self, embeddings):
+        super().__init__("unused", "docs", embeddings=embeddings, max_workers=2)
+        self.handle = VectorOnlyHandle()
+
+    def _current(self):
+        return self.handle
+
+
+def test_one_failed_vector_search_does_not_fail_the_batch():
+    manager = VectorOnlyManager(FakeEmbeddings())
+    results = run(manager.asearch_batch(["aa", "b", "ccc"], mode="vector"))
+    assert [[doc.page_content for doc in docs] for docs in results] == [["doc for 2"], [], ["doc for 3"]]
+    assert manager.handle.in_flight == 0
+
+
+def test_failed_batch_embedding_returns_empty_results():
+    manager = VectorOnlyManager(FakeEmbeddings(fail=True))
+    assert run(manager.asearch_batch(["aa", "b"], mode="vector")) == [[], []]
+
+
+def test_blocking_calls_run_on_the_search_executor():
+    manager = RecordingManager()
+    assert run(manager.arun(lambda a, b: (threading.current_thread().name, a + b), 1, 2)) == ("doc-search_0", 3)
+
+
+# ----------------------
+# Hot swap of published versions
+# ----------------------
+class SwappableHandle(FakeHandle):
+    def __init__(self, version):
+        super().__init__()
+        self.version = version
+        self.closed = False
+
+    def warm_up(self):
+        return 1
+
+    def close(self):
+        assert self.in_flight == 0
+        self.closed = True
+
+
+class SwappingManager(VectorStoreManager):
+    """Follows a real versioned root, with fake handles in place of Chroma."""
+
+    def __init__(self, root, broken_versions=()):
+        super().__init__(str(root), "docs", embeddings=None, reload_interval=0)
+        self.broken_versions = set(broken_versions)
+        self.opened: list[SwappableHandle] = []
+
+    def _open(self, version, directory):
+        if version in self.broken_versions:
+            raise RuntimeError(f"corrupt index {version}")
+        handle = SwappableHandle(version)
+        self.opened.append(handle)
+        return handle
+
+
+def publish_build(root) -> str:
+    return publish(str(root), prepare_staging(str(root)))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_swap_closes_the_old_index_only_after_its_searches_finish(tmp_path):
+    v1 = publish_build(tmp_path)
+    manager = SwappingManager(tmp_path)
+    in_flight = manager.acquire()
+    assert in_flight.version == v1
+
+    v2 = publish_build(tmp_path)
+    assert manager.current_version() == v1  # noticed; v2 loads in the background
+    wait_for(lambda: manager.version == v2)
+    old, new = manager.opened
+    assert old.retired and not old.closed
+
+    # New searches get the new version; the old one closes with its last search
+    second = manager.acquire()
+    assert second is new
+    manager.release(second)
+    manager.release(in_flight)
+    assert old.closed and not new.closed
+    assert INDEX_RELOADS.value(result="ok") >= 1
+
+
+def test_failed_load_keeps_serving_the_old_version(tmp_path):
+    v1 = publish_build(tmp_path)
+    errors = INDEX_RELOADS.value(result="error")
+    manager = SwappingManager(tmp_path)
+    assert manager.current_version() == v1
+
+    v2 = publish_build(tmp_path)
+    manager.broken_versions.add(v2)
+    manager.current_version()
+    wait_for(lambda: INDEX_RELOADS.value(result="error") == errors + 1)
+    wait_for(lambda: not manager._reloading)
+
+    handle = manager.acquire()
+    assert handle.version == v1 and not handle.retired
+    manager.release(handle)
+    assert not handle.closed
+
+    # A fixed build published later is picked up
+    v3 = publish_build(tmp_path)
+    manager.current_version()
+    wait_for(lambda: manager.version == v3)
+    assert [h.version for h in manager.opened] == [v1, v3]